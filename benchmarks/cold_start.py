@@ -0,0 +1,84 @@
+"""Time the optimizer's cold start from the database and from a snapshot.
+
+Fills a temporary database with random containers and items, most of
+them placed, then loads the model the two ways warm_optimizer can:
+initialize_from_db and load_snapshot. Each is run `rounds` times and the
+best time is reported. Both must stay under the one second budget.
+
+    python benchmarks/cold_start.py [items] [rounds]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from migrations import migrate
+from space_optimizer import SpaceOptimizer
+
+# Seconds warm_optimizer may take to have the model ready
+BUDGET = 1.0
+
+def fill(conn, count: int):
+    rng = random.Random(7)
+    containers = [(f"zone{index % 10}", f"cont{index}", 200.0, 200.0, 200.0)
+                  for index in range(max(count // 100, 1))]
+    conn.executemany("""INSERT INTO containers (zone, container_id, width_cm, depth_cm, height_cm)
+        VALUES (?, ?, ?, ?, ?)""", containers)
+    rows = []
+    for index in range(count):
+        placed = index % 10 != 0
+        # A 10 x 10 grid of 20 cm columns per container, one item per cell
+        cell = index % 100
+        rows.append((
+            f"{index:06d}", f"item {index}", rng.uniform(5, 19), rng.uniform(5, 19), rng.uniform(5, 19),
+            rng.uniform(0.1, 20), rng.randint(1, 100), f"2030-01-{index % 28 + 1:02d}", rng.randint(1, 50),
+            f"zone{index % 10}", "placed" if placed else "available",
+            f"cont{index // 100}" if placed else None,
+            20.0 * (cell % 10) if placed else None, 0.0 if placed else None, 20.0 * (cell // 10) if placed else None,
+        ))
+    conn.executemany("""INSERT INTO items (id, name, width, height, depth, weight, priority, expiry_date,
+        usage_limit, preferred_zone, status, container_id, x, y, z)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+    conn.commit()
+
+def best_of(rounds: int, load) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, "cold_start.db"))
+        try:
+            migrate(conn)
+            fill(conn, count)
+            optimizer = SpaceOptimizer()
+            from_db = best_of(rounds, lambda: optimizer.initialize_from_db(conn))
+        finally:
+            conn.close()
+
+        snapshot_path = os.path.join(directory, "cold_start.snapshot")
+        assert optimizer.save_snapshot(snapshot_path, 0, 0)
+        loaded = SpaceOptimizer()
+        from_snapshot = best_of(rounds, lambda: loaded.load_snapshot(snapshot_path, 0, 0))
+        assert loaded.items.keys() == optimizer.items.keys()
+
+    print(f"{count} items, {len(optimizer.containers)} containers")
+    print(f"initialize_from_db: {from_db:.2f}s")
+    print(f"load_snapshot:      {from_snapshot:.2f}s")
+    over = [name for name, seconds in (("database", from_db), ("snapshot", from_snapshot)) if seconds > BUDGET]
+    if over:
+        print(f"Over the {BUDGET:g}s budget: {', '.join(over)}")
+    sys.exit(1 if over else 0)
+
+if __name__ == "__main__":
+    main()
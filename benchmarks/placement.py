@@ -0,0 +1,70 @@
+"""Time item placement with and without the free space map.
+
+Places the same random items into a fresh container twice: once as the
+optimizer does, keeping the container's FreeSpaceMap up to date, and once
+with the map never built, the way placement worked before the map
+existed. Both runs must choose the same positions. The runs alternate
+and the best of `rounds` is reported for each, timings on a shared
+machine vary a lot.
+
+    python benchmarks/placement.py [items] [rounds] [container side in cm]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from space_optimizer import Container3D, Dimensions, FreeSpaceMap, ItemPlacement, rotate
+
+class ContainerWithoutMap(Container3D):
+    """Container3D whose free space map is never built or carved"""
+
+    @property
+    def free_space(self) -> FreeSpaceMap:
+        # An uncarved map lets every orientation through to the search
+        return FreeSpaceMap(self.dimensions.width, self.dimensions.height, self.dimensions.depth)
+
+def place_all(container: Container3D, items):
+    placements = []
+    start = time.perf_counter()
+    for index, (dimensions, priority) in enumerate(items):
+        # Every other item is placed by retrieval cost, like the API's engine
+        weight = 1.0 if index % 2 else None
+        found = container.find_placement(dimensions, priority, weight=weight)
+        if found is None:
+            placements.append(None)
+            continue
+        position, rotation = found
+        container.place_item(ItemPlacement(str(index), position, rotate(dimensions, rotation), rotation))
+        placements.append((position.x, position.y, position.z, rotation))
+    return time.perf_counter() - start, placements
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    side = float(sys.argv[3]) if len(sys.argv) > 3 else 200.0
+    rng = random.Random(7)
+    items = [
+        (Dimensions(rng.uniform(5, 40), rng.uniform(5, 40), rng.uniform(5, 40)), rng.randint(1, 10))
+        for _ in range(count)
+    ]
+
+    without_map = with_map = float("inf")
+    for _ in range(rounds):
+        elapsed, expected = place_all(ContainerWithoutMap("bench", Dimensions(side, side, side)), items)
+        without_map = min(without_map, elapsed)
+        container = Container3D("bench", Dimensions(side, side, side))
+        elapsed, placements = place_all(container, items)
+        with_map = min(with_map, elapsed)
+        assert placements == expected, "the free space map changed where items were placed"
+
+    placed = sum(1 for placement in placements if placement is not None)
+    print(f"{placed}/{count} items placed in a {side:g} cm cube")
+    print(f"without free space map: {without_map:.2f}s")
+    print(f"with free space map:    {with_map:.2f}s ({len(container.free_space.spaces)} spaces, "
+          f"{with_map / without_map:.2f}x)")
+
+if __name__ == "__main__":
+    main()
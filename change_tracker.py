@@ -0,0 +1,42 @@
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Tuple
+
+class ChangeCounters:
+    """In-memory change counters, one per table and one over all of them.
+
+    Every write path of the API bumps the tables it changed once it has
+    committed. Read endpoints derive their ETag from the counters of the
+    tables they read, so a conditional request is answered without
+    touching SQLite, and report the counters in X-Change-Version. The
+    counters start over with each process, the epoch in the ETags keeps
+    those of an earlier process from ever matching.
+    """
+
+    def __init__(self):
+        self.epoch = os.urandom(4).hex()
+        self.total = 0
+        self._tables: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str):
+        """Record a change to each of `tables`"""
+        with self._lock:
+            self.total += 1
+            for table in tables:
+                self._tables[table] += 1
+
+    def tag(self, *tables: str) -> Tuple[str, str]:
+        """Weak ETag that changes whenever one of `tables` does, and the
+        X-Change-Version value of the same moment, e.g.
+        "total=12, items=5, containers=3"
+        """
+        with self._lock:
+            total = self.total
+            versions = [self._tables.get(table, 0) for table in tables]
+        etag = f'W/"{self.epoch}-{"-".join(str(version) for version in versions)}"'
+        change_version = ", ".join([f"total={total}"] + [
+            f"{table}={version}" for table, version in zip(tables, versions)
+        ])
+        return etag, change_version
@@ -0,0 +1,128 @@
+import os
+import queue
+import sqlite3
+import threading
+from typing import Optional
+
+# Database location and connection pool settings
+DB_PATH = os.getenv("DB_PATH", "iss_cargo.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection that goes back to its pool when closed.
+
+    Call sites keep the usual get connection / try / finally close()
+    pattern, close() just hands the connection back for reuse.
+    """
+
+    pool: Optional["ConnectionPool"] = None
+    idle = False
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def close_connection(self):
+        """Really close the underlying SQLite connection"""
+        self.pool = None
+        super().close()
+
+class ConnectionPool:
+    """Fixed size pool of long-lived SQLite connections.
+
+    Connections are created lazily up to `size` and configured once with
+    WAL journaling (readers no longer block on writers), synchronous=NORMAL,
+    a larger page cache and memory-mapped I/O.
+    """
+
+    def __init__(self, path: str = DB_PATH, size: int = DB_POOL_SIZE,
+                 timeout: float = DB_POOL_TIMEOUT):
+        self.path = path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[PooledConnection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            factory=PooledConnection
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """Take an idle connection, opening a new one while below the pool size"""
+        try:
+            return self._checkout(self._idle.get_nowait())
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._checkout(self._idle.get(timeout=self.timeout))
+        except queue.Empty:
+            raise RuntimeError("Timed out waiting for a database connection")
+
+    @staticmethod
+    def _checkout(conn: PooledConnection) -> PooledConnection:
+        conn.idle = False
+        return conn
+
+    def release(self, conn: PooledConnection):
+        """Return a connection to the pool, rolling back anything left open"""
+        if conn.idle:
+            # Already returned, closing twice must not hand it out twice
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            # A broken connection is dropped and replaced on demand
+            with self._lock:
+                self._created -= 1
+            conn.close_connection()
+            return
+        conn.idle = True
+        self._idle.put(conn)
+
+    def close_all(self):
+        """Close every idle connection, e.g. on shutdown or before a reset"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+            conn.close_connection()
+
+db_pool = ConnectionPool()
@@ -18,7 +18,7 @@ const Placement = () => {
 
   const fetchItems = async () => {
     try {
-      const response = await axios.get('http://localhost:8000/api/items');
+      const response = await axios.get('http://localhost:8000/api/items?status=available');
       setItems(response.data.items.filter(item => item.status === 'available'));
       setLoading(false);
     } catch (err) {
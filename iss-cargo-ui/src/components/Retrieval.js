@@ -15,7 +15,7 @@ const Retrieval = () => {
 
   const fetchItems = async () => {
     try {
-      const response = await axios.get('http://localhost:8000/api/items');
+      const response = await axios.get('http://localhost:8000/api/items?status=placed');
       setItems(response.data.items.filter(item => item.status === 'placed'));
       setLoading(false);
     } catch (err) {
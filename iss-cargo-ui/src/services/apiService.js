@@ -83,6 +83,20 @@ const apiService = {
     }
   },
 
+  // Place many items across all containers in one call
+  placeItemsBatch: async ({ itemIds = null, allAvailable = false } = {}) => {
+    try {
+      const response = await api.post('/placement/batch', {
+        item_ids: itemIds,
+        all_available: allAvailable,
+      });
+      return response;
+    } catch (error) {
+      console.error('Error placing items:', error);
+      throw new Error(error.response?.data?.detail || 'Failed to place items');
+    }
+  },
+
   // Retrieve item from container
   retrieveItem: async (itemId) => {
     try {
@@ -105,6 +119,17 @@ const apiService = {
     }
   },
 
+  // Get the next items to expire
+  getExpiringItems: async (limit = 10) => {
+    try {
+      const response = await api.get('/items/expiring', { params: { limit } });
+      return response.items || [];
+    } catch (error) {
+      console.error('Error fetching expiring items:', error);
+      throw new Error(error.message || 'Failed to fetch expiring items');
+    }
+  },
+
   // Mark item as waste
   markAsWaste: async (itemId) => {
     try {
@@ -0,0 +1,230 @@
+import gzip
+import heapq
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import queries
+
+# Old log rows are moved out of SQLite into one gzip'd JSON lines segment
+# per day (logs-YYYY-MM-DD.jsonl.gz). Segments are only ever appended to,
+# every archival run adds a new gzip member at the end, and readers see
+# the members as one stream. segments.json keeps the id range of each
+# segment, so a page only opens the segments that can hold its rows, and
+# its length after the last complete append.
+
+INDEX_FILE = "segments.json"
+LOG_COLUMNS = ("id", "timestamp", "action", "item_id", "container_id", "details")
+
+def segment_name(timestamp: Optional[str]) -> str:
+    day = timestamp[:10] if timestamp else "undated"
+    return f"logs-{day}.jsonl.gz"
+
+class LogArchive:
+    """Append-only, compressed store for log rows that left the logs table"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # segment file name -> [min id, max id, row count, bytes]
+        self._segments: Optional[Dict[str, List[int]]] = None
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def segments(self) -> Dict[str, List[int]]:
+        """Id ranges of the segments, read from the index or rebuilt from the files"""
+        if self._segments is None:
+            try:
+                with open(self._path(INDEX_FILE)) as f:
+                    self._segments = json.load(f)
+            except FileNotFoundError:
+                self._segments = self._rebuild_index()
+        return self._segments
+
+    def _rebuild_index(self) -> Dict[str, List[int]]:
+        segments = {}
+        if not os.path.isdir(self.directory):
+            return segments
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith("logs-") and name.endswith(".jsonl.gz"):
+                ids = [row["id"] for row in self._read_segment(name)]
+                if ids:
+                    segments[name] = [min(ids), max(ids), len(ids), os.path.getsize(self._path(name))]
+        return segments
+
+    def _save_index(self):
+        # Written next to the old index and renamed over it, a crash never
+        # leaves a half written index behind
+        path = self._path(INDEX_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self._segments, f)
+        os.replace(path + ".tmp", path)
+
+    def _read_segment(self, name: str) -> List[dict]:
+        rows = []
+        try:
+            with gzip.open(self._path(name), "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        rows.append(json.loads(line))
+        except FileNotFoundError:
+            pass
+        except (EOFError, gzip.BadGzipFile, json.JSONDecodeError):
+            # A member cut short by a crash while it was appended, the
+            # next append cuts it off again
+            print(f"WARNING: Log segment {name} ends in a truncated member")
+        return rows
+
+    def append(self, rows: List[dict]):
+        """Add log rows to the segments of their days"""
+        if not rows:
+            return
+        by_segment: Dict[str, List[dict]] = {}
+        for row in rows:
+            by_segment.setdefault(segment_name(row.get("timestamp")), []).append(row)
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            segments = self.segments()
+            for name, segment_rows in by_segment.items():
+                data = "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in segment_rows)
+                entry = segments.get(name)
+                with open(self._path(name), "ab") as f:
+                    # Drop whatever an append that crashed before updating
+                    # the index left behind. Its rows were never deleted
+                    # from SQLite and are in this batch again.
+                    f.truncate(entry[3] if entry is not None else 0)
+                    f.write(gzip.compress(data.encode("utf-8")))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    size = f.tell()
+                ids = [row["id"] for row in segment_rows]
+                if entry is None:
+                    segments[name] = [min(ids), max(ids), len(ids), size]
+                else:
+                    entry[0] = min(entry[0], min(ids))
+                    entry[1] = max(entry[1], max(ids))
+                    entry[2] += len(ids)
+                    entry[3] = size
+            self._save_index()
+
+    def read(self, limit: int, cursor: Optional[int] = None, action: Optional[str] = None,
+             item_id: Optional[str] = None, container_id: Optional[str] = None,
+             start: Optional[str] = None, end: Optional[str] = None) -> List[dict]:
+        """Up to `limit` archived rows with id below `cursor`, newest first.
+
+        Takes the same filters as /api/logs. Segments are opened newest
+        first and only while they can still hold a row of the page.
+        """
+        # Timestamps are compared in SQLite's 'YYYY-MM-DD HH:MM:SS' form,
+        # like the filters of /api/logs. Rows archived before the logs
+        # table was normalized can still carry a T.
+        if start is not None:
+            start = start.replace("T", " ")
+        if end is not None:
+            end = end.replace("T", " ")
+
+        with self._lock:
+            segments = dict(self.segments())
+
+        candidates: List[Tuple[int, str]] = []
+        for name, (min_id, max_id, _, _) in segments.items():
+            if cursor is not None and min_id >= cursor:
+                continue
+            day = name[len("logs-"):-len(".jsonl.gz")]
+            if day != "undated":
+                # A day can only hold timestamps in [day, day + 1)
+                if start is not None and day < start[:10]:
+                    continue
+                if end is not None and day > end[:10]:
+                    continue
+            candidates.append((max_id, name))
+        candidates.sort(reverse=True)
+
+        # Smallest of the best `limit` ids found so far sits at the top
+        page: List[Tuple[int, dict]] = []
+        seen = set()
+        for max_id, name in candidates:
+            if len(page) >= limit and max_id < page[0][0]:
+                break
+            for row in self._read_segment(name):
+                row_id = row["id"]
+                # A run interrupted between writing a segment and deleting
+                # the rows can archive a row twice
+                if row_id in seen:
+                    continue
+                if cursor is not None and row_id >= cursor:
+                    continue
+                if ((action is not None and row.get("action") != action) or
+                        (item_id is not None and row.get("item_id") != item_id) or
+                        (container_id is not None and row.get("container_id") != container_id)):
+                    continue
+                timestamp = (row.get("timestamp") or "").replace("T", " ")
+                if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+                    continue
+                seen.add(row_id)
+                if len(page) < limit:
+                    heapq.heappush(page, (row_id, row))
+                elif row_id > page[0][0]:
+                    heapq.heapreplace(page, (row_id, row))
+        return [row for _, row in sorted(page, key=lambda entry: entry[0], reverse=True)]
+
+    def clear(self):
+        """Delete every segment"""
+        with self._lock:
+            for name in list(self.segments()):
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+            self._segments = {}
+            if os.path.isdir(self.directory):
+                self._save_index()
+
+def archive_logs(conn, archive: LogArchive, max_age_days: float = 0, max_rows: int = 0,
+                 batch_size: int = 1000) -> int:
+    """Move logs older than `max_age_days`, or beyond the newest `max_rows`,
+    into the archive. A limit of 0 is not applied.
+
+    Rows are copied to the segments and then deleted from SQLite one batch
+    at a time, each batch in its own short transaction, so writers are
+    never held up for long. Returns the number of rows archived.
+    """
+    conditions = []
+    params: List = []
+    if max_age_days > 0:
+        # Stored in log_timestamp's format, the bare column can use its index
+        conditions.append(queries.LOGS_UNTIL)
+        cutoff = datetime.now() - timedelta(days=max_age_days)
+        params.append(cutoff.strftime("%Y-%m-%d %H:%M:%S"))
+    if max_rows > 0:
+        row = conn.execute("SELECT id FROM logs ORDER BY id DESC LIMIT 1 OFFSET ?", (max_rows,)).fetchone()
+        if row is not None:
+            conditions.append("id <= ?")
+            params.append(row[0])
+    if not conditions:
+        return 0
+    where = " OR ".join(conditions)
+
+    archived = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT {', '.join(LOG_COLUMNS)} FROM logs WHERE id > ? AND ({where}) ORDER BY id LIMIT ?",
+            (last_id, *params, batch_size)
+        ).fetchall()
+        if not rows:
+            return archived
+        batch = [dict(zip(LOG_COLUMNS, row)) for row in rows]
+        archive.append(batch)
+        try:
+            conn.executemany("DELETE FROM logs WHERE id = ?", [(row["id"],) for row in batch])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        archived += len(batch)
+        last_id = batch[-1]["id"]
@@ -0,0 +1,122 @@
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+# Log rows are (timestamp, action, item_id, container_id, details)
+LogRow = Tuple[str, str, Optional[str], Optional[str], Optional[str]]
+
+def log_timestamp(moment: Optional[datetime] = None) -> str:
+    """Timestamp of a log row, e.g. '2025-04-06 12:00:00.123456'.
+
+    SQLite's CURRENT_TIMESTAMP format with the microseconds added. All
+    rows use it, so range filters compare the bare column and sort
+    correctly as text.
+    """
+    return (moment or datetime.now()).isoformat(sep=' ')
+
+INSERT_LOGS = """
+    INSERT INTO logs (timestamp, action, item_id, container_id, details)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+class LogWriter:
+    """Buffers log rows and inserts them in batches off the request path.
+
+    Endpoints append rows once they have committed and released their own
+    connection, flushing takes one from the pool. A background thread
+    writes whatever has collected every `flush_interval` seconds or as
+    soon as `batch_size` rows are waiting. Readers call
+    flush() first so they always see the rows logged before them. Rows
+    still buffered when the process dies are lost, with `flush_interval`
+    set to 0 every row is written before log() returns.
+    """
+
+    def __init__(self, pool, batch_size: int = 500, flush_interval: float = 0.5,
+                 on_log: Optional[Callable[[], None]] = None):
+        self.pool = pool
+        # Called whenever rows are queued, e.g. to invalidate cached reads
+        self.on_log = on_log
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._pending: List[LogRow] = []
+        self._condition = threading.Condition()
+        # Held while a batch is written, so flush() returns only once the
+        # rows taken by a concurrent flush are in the table as well
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def log(self, action: str, item_id: Optional[str] = None, container_id: Optional[str] = None,
+            details: Optional[str] = None, timestamp: Optional[str] = None):
+        self.log_many([(timestamp or log_timestamp(), action, item_id, container_id, details)])
+
+    def log_many(self, rows: List[LogRow]):
+        """Queue (timestamp, action, item_id, container_id, details) rows"""
+        if not rows:
+            return
+        # ISO timestamps, with a T, are stored in the log_timestamp format
+        rows = [row if 'T' not in row[0] else (row[0].replace('T', ' '), *row[1:]) for row in rows]
+        with self._condition:
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        if self.on_log is not None:
+            self.on_log()
+        if self._thread is None or self.flush_interval <= 0:
+            try:
+                self.flush()
+            except Exception as e:
+                # The rows stay queued for the next flush, the change that
+                # logged them has already committed
+                print(f"ERROR: Failed to write logs: {str(e)}")
+
+    def flush(self):
+        """Write every buffered row now"""
+        with self._write_lock:
+            with self._condition:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return
+            conn = self.pool.acquire()
+            try:
+                conn.executemany(INSERT_LOGS, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                # Put them back in front so the next flush retries them in order
+                with self._condition:
+                    self._pending[:0] = rows
+                raise
+            finally:
+                conn.close()
+
+    def start(self):
+        """Start the background flusher"""
+        if self._thread is not None or self.flush_interval <= 0:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background flusher and write what is left"""
+        thread = self._thread
+        if thread is not None:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify()
+            thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"ERROR: Failed to write logs: {str(e)}")
@@ -1,18 +1,35 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Path, Query
+from fastapi import FastAPI, HTTPException, UploadFile, File, Path, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel, validator
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, List, Dict, Tuple
+import asyncio
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import heapq
 from collections import defaultdict
 from dataclasses import dataclass
 from enum import Enum
+import codecs
 import csv
-import io
 import json
 import os
-from space_optimizer import SpaceOptimizer, Position, Dimensions, ItemPlacement, Container3D
+import time
+from concurrent.futures import ProcessPoolExecutor
+from database import DB_PATH, db_pool
+from migrations import (SCHEMA_VERSION, migrate, reset_database, find_full_scans, get_state_version,
+                        get_journal_epoch, bump_state_version, pause_journal, journal_table_replaced,
+                        WHOLE_TABLE)
+from space_optimizer import (SpaceOptimizer, Position, Dimensions, Container3D,
+                             MIN_X, MIN_Y, MIN_Z,
+                             find_position_in_snapshot, retrieval_weight, rotate, orientations,
+                             ROTATIONS, ContainerFit, evaluate_containers_in_snapshot)
+from retrieval_planner import RetrievalPlanner
+from log_writer import LogWriter, log_timestamp
+from log_archive import LogArchive, archive_logs
+from change_tracker import ChangeCounters
+import queries
 
 app = FastAPI()
 
@@ -27,50 +44,142 @@ app.add_middleware(
     max_age=3600,
 )
 
+# Placement search engine: "extreme_points" (default), "retrieval_cost" to
+# pick the extreme point that leaves the fewest weighted blockers, or the
+# legacy "grid" sweep
+PLACEMENT_ENGINE = os.getenv("PLACEMENT_ENGINE", "extreme_points")
+# Backend of the grid engine: "python" loop or "numpy" broadcast evaluation
+GRID_BACKEND = os.getenv("GRID_BACKEND", "python")
+
+# Worker processes for placement searches (0 runs them in the thread pool)
+PACKING_WORKERS = int(os.getenv("PACKING_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Maximum number of packing jobs running at the same time
+PACKING_CONCURRENCY = int(os.getenv("PACKING_CONCURRENCY", str(max(1, PACKING_WORKERS))))
+# Seconds between background expiry sweeps (0 disables them)
+EXPIRY_SWEEP_INTERVAL = float(os.getenv("EXPIRY_SWEEP_INTERVAL", "0"))
+# Drop and rebuild every table on startup instead of keeping the data
+RESET_DB_ON_STARTUP = os.getenv("RESET_DB_ON_STARTUP", "0") == "1"
+# Binary snapshot of the optimizer used for fast startup (empty disables it)
+OPTIMIZER_SNAPSHOT_PATH = os.getenv("OPTIMIZER_SNAPSHOT_PATH", f"{DB_PATH}.snapshot")
+# Rows inserted per executemany batch by the CSV imports
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Rejected rows listed in an import summary, the rest are only counted
+IMPORT_MAX_REJECTS = int(os.getenv("IMPORT_MAX_REJECTS", "100"))
+# Log rows inserted per batch, and seconds a row may wait in the buffer
+# before it is written (0 writes every row before the request returns)
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.5"))
+# Largest page /api/items and /api/containers return
+LIST_PAGE_MAX = int(os.getenv("LIST_PAGE_MAX", "5000"))
+# Most journal entries /api/changes returns at once
+CHANGES_PAGE_MAX = int(os.getenv("CHANGES_PAGE_MAX", "5000"))
+# Largest page /api/logs returns
+LOG_PAGE_MAX = int(os.getenv("LOG_PAGE_MAX", "1000"))
+# Logs older than this many days, or beyond the newest LOG_RETENTION_ROWS,
+# are moved to compressed daily segment files (0 keeps them in SQLite)
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", "0"))
+LOG_RETENTION_ROWS = int(os.getenv("LOG_RETENTION_ROWS", "0"))
+# Where the archived log segments are kept
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", f"{DB_PATH}.logs")
+# Rows moved per archival transaction
+LOG_ARCHIVE_BATCH_SIZE = int(os.getenv("LOG_ARCHIVE_BATCH_SIZE", "1000"))
+# Seconds between background archival runs when a retention limit is set
+LOG_ARCHIVE_INTERVAL = float(os.getenv("LOG_ARCHIVE_INTERVAL", "3600"))
+
 # Global variable to track current date
 current_date = datetime.now().date()
 
 # Initialize global space optimizer instance
 space_optimizer = SpaceOptimizer()
 
-# Add container layout cache
-container_layout_cache: Dict[str, Dict[str, Dict]] = {}
-
-def get_cached_container_layout(container_id: str) -> Optional[Dict[str, Dict]]:
-    """Get cached layout for a container"""
-    return container_layout_cache.get(container_id)
-
-def update_container_layout_cache(container_id: str, items: List[Dict]):
-    """Update the cache with current container layout"""
-    container_layout_cache[container_id] = {
-        item['id']: {
-            'x': item['x'],
-            'y': item['y'],
-            'z': item['z'],
-            'width': item['width'],
-            'height': item['height'],
-            'depth': item['depth']
-        }
-        for item in items
-    }
-
-def clear_container_layout_cache(container_id: str):
-    """Clear the cache for a container"""
-    if container_id in container_layout_cache:
-        del container_layout_cache[container_id]
+# Retrieval plans, with blocking graphs cached per container
+retrieval_planner = RetrievalPlanner()
+
+# Change counters per table, the ETags of the read endpoints
+changes = ChangeCounters()
+
+# Log rows are buffered and written in batches outside request transactions
+log_writer = LogWriter(db_pool, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL,
+                       on_log=lambda: changes.bump("logs"))
+
+# Logs past the retention limits, read back only when asked for
+log_archive = LogArchive(LOG_ARCHIVE_DIR)
+
+# Placement searches are CPU bound, so they run in a bounded process pool
+# and never on the event loop
+packing_pool: Optional[ProcessPoolExecutor] = None
+packing_semaphore = asyncio.Semaphore(PACKING_CONCURRENCY)
+
+# Timing of the last startup, reported by /api/optimizer/status
+startup_stats: Dict[str, float] = {}
+
+# Background task running the periodic expiry sweep
+expiry_sweep_task: Optional[asyncio.Task] = None
+
+# Background task moving old logs to the archive
+log_archive_task: Optional[asyncio.Task] = None
+
+# Background task writing the snapshot after a startup load from the database
+startup_snapshot_task: Optional[asyncio.Task] = None
+
+# Placements into the same container are serialized so that two searches
+# never hand out the same free space
+container_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+def get_packing_pool() -> Optional[ProcessPoolExecutor]:
+    """Start the packing process pool on first use"""
+    global packing_pool
+    if packing_pool is None and PACKING_WORKERS > 0:
+        packing_pool = ProcessPoolExecutor(max_workers=PACKING_WORKERS)
+    return packing_pool
+
+async def run_placement_search(container_id: str, dimensions: Dimensions,
+                               item_priority: int, item_weight: float = 1.0,
+                               allowed_rotations: Optional[int] = None) -> Optional[Tuple[Position, int]]:
+    """Search a (position, rotation) for an item without blocking the event loop"""
+    async with packing_semaphore:
+        snapshot = await run_in_threadpool(space_optimizer.snapshot_container, container_id,
+                                           dimensions, allowed_rotations)
+        if snapshot is None:
+            return None
+        pool = get_packing_pool()
+        if pool is None:
+            return await run_in_threadpool(
+                find_position_in_snapshot, snapshot, dimensions, item_priority,
+                PLACEMENT_ENGINE, GRID_BACKEND, item_weight
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            pool, find_position_in_snapshot, snapshot, dimensions, item_priority,
+            PLACEMENT_ENGINE, GRID_BACKEND, item_weight
+        )
 
 # Initialize space optimizer on startup
 @app.on_event("startup")
 async def startup_event():
     """Initialize the application on startup"""
+    global expiry_sweep_task, log_archive_task, startup_snapshot_task
+    conn = None
     try:
         print("DEBUG: Initializing application")
-        # Initialize database first
-        init_db()
-        # Then initialize space optimizer
+        started = time.perf_counter()
+        # Open the existing database, only rebuilding it on an explicit reset
+        init_db(reset=RESET_DB_ON_STARTUP)
+        log_writer.start()
+        # Then warm the space optimizer from its snapshot or the database
         conn = get_db()
-        space_optimizer.initialize_from_db(conn)
-        print("DEBUG: Application initialized successfully")
+        startup_stats["warmed_from"] = warm_optimizer(conn)
+        if startup_stats["warmed_from"] == "database" and OPTIMIZER_SNAPSHOT_PATH:
+            # For the next start, the model is ready without it
+            startup_snapshot_task = asyncio.create_task(save_startup_snapshot())
+        if EXPIRY_SWEEP_INTERVAL > 0:
+            expiry_sweep_task = asyncio.create_task(run_expiry_sweeps(EXPIRY_SWEEP_INTERVAL))
+        if (LOG_RETENTION_DAYS > 0 or LOG_RETENTION_ROWS > 0) and LOG_ARCHIVE_INTERVAL > 0:
+            log_archive_task = asyncio.create_task(run_log_archival(LOG_ARCHIVE_INTERVAL))
+        startup_stats["cold_start_seconds"] = time.perf_counter() - started
+        startup_stats["items_loaded"] = len(space_optimizer.items)
+        print(f"DEBUG: Application initialized in {startup_stats['cold_start_seconds']:.3f}s "
+              f"with {startup_stats['items_loaded']} items from the {startup_stats['warmed_from']}")
     except Exception as e:
         print(f"ERROR: Failed to initialize application: {str(e)}")
         raise
@@ -78,6 +187,33 @@ async def startup_event():
         if conn:
             conn.close()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and close the pooled database connections"""
+    global packing_pool, expiry_sweep_task, log_archive_task, startup_snapshot_task
+    if expiry_sweep_task is not None:
+        expiry_sweep_task.cancel()
+        expiry_sweep_task = None
+    if log_archive_task is not None:
+        log_archive_task.cancel()
+        log_archive_task = None
+    if startup_snapshot_task is not None:
+        # Both writes would go through the same temporary file
+        await startup_snapshot_task
+        startup_snapshot_task = None
+    try:
+        save_optimizer_snapshot()
+    except Exception as e:
+        print(f"ERROR: Failed to save optimizer snapshot: {str(e)}")
+    try:
+        log_writer.stop()
+    except Exception as e:
+        print(f"ERROR: Failed to write buffered logs: {str(e)}")
+    if packing_pool is not None:
+        packing_pool.shutdown(wait=False, cancel_futures=True)
+        packing_pool = None
+    db_pool.close_all()
+
 class Zone(str, Enum):
     CREW_QUARTERS = "Crew Quarters"
     AIRLOCK = "Airlock"
@@ -85,80 +221,57 @@ class Zone(str, Enum):
     MEDICAL_BAY = "Medical Bay"
     FOOD_STORAGE = "Food Storage"
 
-# Database connection function
+# Database connection function, connections come from a shared pool and
+# go back to it on close()
 def get_db():
-    conn = sqlite3.connect('iss_cargo.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def init_db():
+    return db_pool.acquire()
+
+def not_modified(request: Request, etag: str, change_version: str) -> Optional[Response]:
+    """A 304 response if the client already holds the version tagged `etag`"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # If-None-Match uses the weak comparison
+        if "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache",
+                                                      "X-Change-Version": change_version})
+    return None
+
+def set_etag(response: Response, etag: str, change_version: str):
+    # no-cache makes browsers revalidate with If-None-Match on every fetch
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Change-Version"] = change_version
+
+
+def commit_changes(conn, *tables: str):
+    """Commit a write transaction and bump the counters of the tables it changed"""
+    if "items" in tables or "containers" in tables:
+        # Lets the optimizer snapshot tell the database has moved on
+        bump_state_version(conn)
+    conn.commit()
+    changes.bump(*tables)
+
+
+def init_db(reset: bool = False):
     conn = get_db()
     cursor = conn.cursor()
 
     try:
         print("DEBUG: Starting database initialization")
 
-        # Drop existing tables to ensure clean initialization
-        print("DEBUG: Dropping existing tables")
-        cursor.execute("DROP TABLE IF EXISTS items")
-        cursor.execute("DROP TABLE IF EXISTS containers")
-        cursor.execute("DROP TABLE IF EXISTS system_settings")
-        cursor.execute("DROP TABLE IF EXISTS logs")
-
-        # Create containers table with schema matching CSV
-        print("DEBUG: Creating containers table")
-        cursor.execute('''CREATE TABLE IF NOT EXISTS containers (
-            zone TEXT,
-            container_id TEXT PRIMARY KEY,
-            width_cm REAL,
-            depth_cm REAL,
-            height_cm REAL,
-            current_load REAL DEFAULT 0,
-            name TEXT
-        )''')
-
-        # Create items table with all required columns
-        print("DEBUG: Creating items table")
-        cursor.execute('''CREATE TABLE IF NOT EXISTS items (
-            id TEXT PRIMARY KEY,
-            item_id TEXT UNIQUE,
-            name TEXT,
-            width REAL,
-            height REAL,
-            depth REAL,
-            weight REAL,
-            container_id TEXT,
-            x REAL,
-            y REAL,
-            z REAL,
-            rotation INTEGER DEFAULT 0,
-            status TEXT DEFAULT 'available',
-            usage_count INTEGER DEFAULT 0,
-            usage_limit INTEGER,
-            priority INTEGER,
-            expiry_date TEXT,
-            preferred_zone TEXT,
-            FOREIGN KEY (container_id) REFERENCES containers (container_id)
-        )''')
-
-        # Create system_settings table
-        print("DEBUG: Creating system_settings table")
-        cursor.execute('''CREATE TABLE IF NOT EXISTS system_settings (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )''')
-
-        # Create logs table
-        print("DEBUG: Creating logs table")
-        cursor.execute('''CREATE TABLE IF NOT EXISTS logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
-            action TEXT,
-            item_id TEXT,
-            container_id TEXT,
-            details TEXT
-        )''')
+        if reset:
+            print("DEBUG: Resetting database, dropping existing tables")
+            reset_database(conn)
+        else:
+            # Apply any schema migrations this database has not seen yet,
+            # existing data is kept across restarts
+            previous_version = migrate(conn)
+            print(f"DEBUG: Database schema version {previous_version} -> {SCHEMA_VERSION}")
+
+        # Warn about hot queries that no longer hit an index
+        for query, detail in find_full_scans(conn):
+            print(f"WARNING: Hot query uses a full table scan ({detail}): {query}")
 
         # Initialize system_settings if empty
         print("DEBUG: Initializing system_settings")
@@ -238,20 +351,68 @@ def setup_optimization_system():
         if conn:
             conn.close()
 
+def warm_optimizer(conn) -> str:
+    """Load the space optimizer, preferring a snapshot that is still current.
+
+    Returns where the model came from, "snapshot" or "database". After a
+    load from the database the caller writes a fresh snapshot for the next
+    start, see save_startup_snapshot.
+    """
+    state_version = get_state_version(conn)
+    if OPTIMIZER_SNAPSHOT_PATH and space_optimizer.load_snapshot(
+            OPTIMIZER_SNAPSHOT_PATH, state_version, SCHEMA_VERSION):
+        return "snapshot"
+
+    print("DEBUG: No current optimizer snapshot, loading from the database")
+    space_optimizer.initialize_from_db(conn)
+    return "database"
+
+async def save_startup_snapshot():
+    """Snapshot the model loaded at startup once the app is serving.
+
+    Writing it takes about half as long as the load, which would otherwise
+    count towards the cold start.
+    """
+    try:
+        await run_in_threadpool(save_optimizer_snapshot)
+    except Exception as e:
+        print(f"ERROR: Failed to save optimizer snapshot: {str(e)}")
+
+def save_optimizer_snapshot():
+    """Snapshot the optimizer, e.g. on shutdown once requests have drained"""
+    if not OPTIMIZER_SNAPSHOT_PATH:
+        return
+    conn = get_db()
+    try:
+        with space_optimizer.lock:
+            # The version is read under the lock, so it cannot move ahead of
+            # what the model reflects
+            state_version = get_state_version(conn)
+            if space_optimizer.save_snapshot(OPTIMIZER_SNAPSHOT_PATH, state_version, SCHEMA_VERSION):
+                print(f"DEBUG: Saved optimizer snapshot at state version {state_version}")
+    finally:
+        conn.close()
+
 # Utility function to reinitialize the space optimizer
-def reinitialize_optimizer():
-    """Reinitialize the space optimizer with fresh data from the database"""
+def reinitialize_optimizer(conn=None):
+    """Reinitialize the space optimizer with fresh data from the database.
+
+    Callers that already hold a pooled connection pass it in, taking a
+    second one could wait on the pool forever.
+    """
+    own_conn = None
     try:
         print("DEBUG: Reinitializing space optimizer")
-        conn = get_db()
+        if conn is None:
+            conn = own_conn = get_db()
         space_optimizer.initialize_from_db(conn)
         print("DEBUG: Space optimizer reinitialized successfully")
     except Exception as e:
         print(f"ERROR: Failed to reinitialize space optimizer: {str(e)}")
         raise
     finally:
-        if conn:
-            conn.close()
+        if own_conn:
+            own_conn.close()
 
 # Pydantic models
 class ItemBase(BaseModel):
@@ -280,6 +441,10 @@ class PlacementRequest(BaseModel):
             raise ValueError("container_id is required")
         return v
 
+class BatchPlacementRequest(BaseModel):
+    item_ids: Optional[List[str]] = None
+    all_available: bool = False
+
 class FastForwardRequest(BaseModel):
     days: int
 
@@ -290,521 +455,740 @@ class SetDateRequest(BaseModel):
 async def root():
     return {"message": "ISS Cargo System API", "status": "operational"}
 
+# Columns of each table, read once from the migrated schema
+table_columns: Dict[str, Tuple[str, ...]] = {}
+
+def get_table_columns(conn, table: str) -> Tuple[str, ...]:
+    columns = table_columns.get(table)
+    if columns is None:
+        columns = tuple(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+        table_columns[table] = columns
+    return columns
+
+def list_rows(table: str, key: str, fields: Optional[str], conditions: List[str], params: List,
+              limit: Optional[int], cursor: Optional[str], etag: str,
+              change_version: str) -> Response:
+    """One page of `table` ordered by `key`, as a JSON response.
+
+    SQLite renders every row as a JSON object itself (json_object), the
+    rows are joined straight from the cursor without building a dict per
+    row. `fields` is a comma separated list of the columns to return.
+    Without a limit every matching row is returned.
+    """
+    if limit is not None and (limit < 1 or limit > LIST_PAGE_MAX):
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {LIST_PAGE_MAX}")
+
+    conn = get_db()
+    try:
+        columns = get_table_columns(conn, table)
+        if fields:
+            selected = [field.strip() for field in fields.split(",") if field.strip()]
+            unknown = [field for field in selected if field not in columns]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        else:
+            selected = list(columns)
+
+        if cursor is not None:
+            params = params + [cursor]
+        rows = conn.execute(
+            queries.page_query(table, key, selected, conditions, limit, after_cursor=cursor is not None), params
+        ).fetchall()
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1][0]
+        body = (f'{{"{table}":[' + ",".join(row[1] for row in rows) +
+                f'],"next_cursor":{json.dumps(next_cursor)}}}')
+        response = Response(content=body, media_type="application/json")
+        set_etag(response, etag, change_version)
+        return response
+    finally:
+        conn.close()
+
 @app.get("/api/items")
-async def get_items():
-    """Get all items"""
+def get_items(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, fields: Optional[str] = None,
+              status: Optional[str] = None, container_id: Optional[str] = None,
+              zone: Optional[str] = None, priority_min: Optional[int] = None,
+              priority_max: Optional[int] = None, expiring_before: Optional[str] = None):
+    """Items ordered by id, one page at a time.
+
+    Pass the returned next_cursor as `cursor` for the following page.
+    `status` takes one or more comma separated statuses, `zone` matches
+    the zone of the container an item is in and `expiring_before` a date
+    (YYYY-MM-DD) the expiry date must be before.
+    """
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM items")
-        items = [dict(row) for row in cursor.fetchall()]
-        return {"items": items}
+        # Taken before the read, a write that races with it only makes the
+        # tag older than the data, never newer
+        etag, change_version = changes.tag("items", "containers")
+        cached = not_modified(request, etag, change_version)
+        if cached is not None:
+            return cached
+        conditions = []
+        params: List = []
+        if status:
+            statuses = [value.strip() for value in status.split(",") if value.strip()]
+            conditions.append(queries.items_with_status(len(statuses)))
+            params += statuses
+        if container_id is not None:
+            conditions.append(queries.ITEMS_IN_CONTAINER)
+            params.append(container_id)
+        if zone is not None:
+            conditions.append(queries.ITEMS_IN_ZONE)
+            params.append(zone)
+        if priority_min is not None:
+            conditions.append(queries.ITEMS_PRIORITY_MIN)
+            params.append(priority_min)
+        if priority_max is not None:
+            conditions.append(queries.ITEMS_PRIORITY_MAX)
+            params.append(priority_max)
+        if expiring_before is not None:
+            conditions.append(queries.ITEMS_EXPIRING_BEFORE)
+            params.append(expiring_before)
+        return list_rows("items", "id", fields, conditions, params, limit, cursor, etag, change_version)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
 
 @app.get("/api/containers")
-async def get_containers():
-    """Get all containers"""
+def get_containers(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None,
+                   fields: Optional[str] = None, zone: Optional[str] = None):
+    """Containers ordered by id, one page at a time, like /api/items"""
     try:
-        print("DEBUG: Getting containers")
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Get all containers
-        cursor.execute("SELECT * FROM containers")
-        containers = [dict(row) for row in cursor.fetchall()]
-        print(f"DEBUG: Returning {len(containers)} containers")
-        return {"containers": containers}
-        
+        etag, change_version = changes.tag("containers")
+        cached = not_modified(request, etag, change_version)
+        if cached is not None:
+            return cached
+        conditions = []
+        params: List = []
+        if zone is not None:
+            conditions.append(queries.CONTAINERS_IN_ZONE)
+            params.append(zone)
+        return list_rows("containers", "container_id", fields, conditions, params, limit, cursor, etag, change_version)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         print(f"ERROR: Failed to get containers: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/changes")
+def get_changes(request: Request, response: Response, since: int = 0, limit: int = 1000,
+                epoch: Optional[str] = None):
+    """Items, containers and logs changed after journal version `since`.
+
+    Returns the current rows of everything changed, the ids of deleted
+    items and containers, and the version and epoch to pass as `since`
+    and `epoch` next time. While `more` is set there are further changes
+    to fetch right away. `reset` means the journal was recreated since
+    `since` was handed out, its epoch differs, or an import replaced a
+    whole table after it, and the client has to load everything again.
+    """
+    conn = None
+    try:
+        if limit < 1 or limit > CHANGES_PAGE_MAX:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {CHANGES_PAGE_MAX}")
+        etag, change_version = changes.tag("items", "containers", "logs")
+        cached = not_modified(request, etag, change_version)
+        if cached is not None:
+            return cached
+
+        # Rows still in the write buffer are journaled once they are written
+        log_writer.flush()
+        conn = get_db()
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_journal'").fetchone()
+        current = row[0] if row is not None else 0
+        current_epoch = get_journal_epoch(conn)
+        entries = conn.execute(queries.JOURNAL_PAGE, (since, limit + 1)).fetchall()
+        # An import replacing a table journals it as one entry. Read after
+        # the page, so the page cannot hold rows of an import missed here.
+        replaced = conn.execute(queries.JOURNAL_LAST_REPLACED, (WHOLE_TABLE,)).fetchone()[0]
+        # A recreated journal numbers from 1 again, so `since` may well be
+        # in range. Clients that do not pass an epoch only notice when it
+        # is not.
+        if (epoch is not None and epoch != current_epoch) or since > current or (replaced or 0) > since:
+            set_etag(response, etag, change_version)
+            return {"version": max(current, replaced or 0), "epoch": current_epoch, "reset": True,
+                    "more": False, "items": [], "containers": [], "logs": [],
+                    "deleted": {"items": [], "containers": []}}
+        more = len(entries) > limit
+        entries = entries[:limit]
+
+        changed: Dict[str, List[str]] = defaultdict(list)
+        deleted: Dict[str, List[str]] = {"items": [], "containers": []}
+        for _, table, row_key, is_deleted in entries:
+            if is_deleted:
+                deleted[table].append(row_key)
+            else:
+                changed[table].append(row_key)
+
+        # Entries journaled after `current` was read may be on the page
+        version = entries[-1][0] if more else max(current, since, entries[-1][0] if entries else 0)
+        parts = [f'"version":{version}', f'"epoch":{json.dumps(current_epoch)}', '"reset":false',
+                 f'"more":{json.dumps(more)}', f'"deleted":{json.dumps(deleted)}']
+        for table, key in (("items", "id"), ("containers", "container_id"), ("logs", "id")):
+            # Rendered by SQLite like the /api/items pages
+            row_json = ", ".join(f"'{column}', {column}" for column in get_table_columns(conn, table))
+            rows = []
+            keys = changed.get(table, [])
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows += [row[0] for row in conn.execute(
+                    f"SELECT json_object({row_json}) FROM {table} WHERE {key} IN ({', '.join('?' * len(chunk))})",
+                    chunk)]
+            parts.append(f'"{table}":[' + ",".join(rows) + "]")
+        result = Response(content="{" + ",".join(parts) + "}", media_type="application/json")
+        set_etag(result, etag, change_version)
+        return result
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        print(f"Error fetching changes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
     finally:
         if conn:
             conn.close()
 
+def container_has_room(container: Container3D, dimensions: Dimensions,
+                       allowed_rotations: Optional[int]) -> bool:
+    with space_optimizer.lock:
+        return container.can_fit(dimensions, allowed_rotations)
+
 @app.post("/api/items/place")
 async def place_item(item_id: str, container_id: str):
     """Place an item in a container"""
-    conn = None
     try:
-        # Get database connection
-        conn = get_db()
-        cursor = conn.cursor()
-        
         # Check if item exists and is available
-        cursor.execute("""
-            SELECT id, status, container_id, expiry_date, usage_count, usage_limit, priority
-            FROM items
-            WHERE id = ?
-        """, (item_id,))
-        item = cursor.fetchone()
+        item = space_optimizer.items.get(item_id)
         if not item:
             raise HTTPException(status_code=404, detail="Item not found")
         
-        if item[1] == "placed":
+        if item.status == "placed":
             raise HTTPException(status_code=400, detail="Item is already placed in a container")
             
         # Check if container exists
-        cursor.execute("""
-            SELECT container_id, width_cm, height_cm, depth_cm
-            FROM containers
-            WHERE container_id = ?
-        """, (container_id,))
-        container = cursor.fetchone()
+        container = space_optimizer.containers.get(container_id)
         if not container:
             raise HTTPException(status_code=404, detail="Container not found")
             
-        # Get item dimensions
-        cursor.execute("""
-            SELECT width, height, depth
-            FROM items
-            WHERE id = ?
-        """, (item_id,))
-        item_dimensions = cursor.fetchone()
-        if not item_dimensions:
-            raise HTTPException(status_code=404, detail="Item dimensions not found")
-        
-        dimensions = Dimensions(float(item_dimensions[0]), float(item_dimensions[1]), float(item_dimensions[2]))
+        dimensions = item.dimensions
 
-        # Check if item fits in container
-        if (dimensions.width > float(container[1]) or
-            dimensions.height > float(container[2]) or
-            dimensions.depth > float(container[3])):
+        # Check if item fits in container in any orientation it allows
+        if not any(oriented.width <= container.dimensions.width and
+                   oriented.height <= container.dimensions.height and
+                   oriented.depth <= container.dimensions.depth
+                   for _, oriented in orientations(dimensions, item.allowed_rotations)):
             raise HTTPException(status_code=400, detail="Item is too large for container")
 
-        # Get all items currently in the container
-        cursor.execute("""
-            SELECT x, y, z, width, height, depth, priority
-            FROM items
-            WHERE container_id = ? AND status = 'placed'
-            ORDER BY priority DESC
-        """, (container_id,))
-        placed_items = cursor.fetchall()
-
-        # Try to use cached layout first
-        cached_layout = get_cached_container_layout(container_id)
-        if cached_layout:
-            # Check if the cached layout matches current state
-            cursor.execute("""
-                SELECT id, x, y, z, width, height, depth
-                FROM items
-                WHERE container_id = ? AND status = 'placed'
-            """, (container_id,))
-            current_items = cursor.fetchall()
-            current_layout = {
-                str(item[0]): {
-                    'x': item[1],
-                    'y': item[2],
-                    'z': item[3],
-                    'width': item[4],
-                    'height': item[5],
-                    'depth': item[6]
-                }
-                for item in current_items
-            }
-            
-            if current_layout == cached_layout:
-                # Use cached layout for position search
-                best_position = find_position_with_cache(
-                    dimensions,
-                    cached_layout,
-                    float(container[1]),
-                    float(container[2]),
-                    float(container[3]),
-                    item[5]  # item priority
-                )
-            else:
-                # Cache is outdated, clear it
-                clear_container_layout_cache(container_id)
-                best_position = find_position(
-                    dimensions,
-                    placed_items,
-                    float(container[1]),
-                    float(container[2]),
-                    float(container[3]),
-                    item[5]  # item priority
-                )
-        else:
-            # No cache, find position normally
-            best_position = find_position(
-                dimensions,
-                placed_items,
-                float(container[1]),
-                float(container[2]),
-                float(container[3]),
-                item[5]  # item priority
+        # Full containers are turned down from their free space map
+        # before any search is started. The map may have to be built and
+        # the lock may be held by a batch placement, so not on the event loop.
+        has_room = await run_in_threadpool(container_has_room, container, dimensions, item.allowed_rotations)
+        if not has_room:
+            raise HTTPException(status_code=400, detail="No free space in container large enough for item")
+
+        async with container_locks[container_id]:
+            found = await run_placement_search(
+                container_id, dimensions, item.priority,
+                retrieval_weight(item.priority, item.uses_left),
+                item.allowed_rotations
             )
 
-        if best_position is None:
-            raise HTTPException(status_code=400, detail="No valid position found in container")
+            if found is None:
+                raise HTTPException(status_code=400, detail="No valid position found in container")
 
-        # Update item record with the found position
-        cursor.execute("""
-            UPDATE items 
-            SET container_id = ?, x = ?, y = ?, z = ?, status = 'placed'
-            WHERE id = ?
-        """, (container_id, best_position.x, best_position.y, best_position.z, item_id))
+            best_position, rotation = found
+            return await run_in_threadpool(commit_placement, item_id, container_id, best_position, rotation)
 
-        # Update container load
-        cursor.execute("""
-            UPDATE containers 
-            SET current_load = current_load + (
-                SELECT weight FROM items WHERE id = ?
-            )
-            WHERE container_id = ?
-        """, (item_id, container_id))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"Error placing item: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to place item: {str(e)}")
 
-        # Update cache with new layout
-        cursor.execute("""
-            SELECT id, x, y, z, width, height, depth
-            FROM items
-            WHERE container_id = ? AND status = 'placed'
-        """, (container_id,))
-        current_items = cursor.fetchall()
-        update_container_layout_cache(container_id, [
-            {
-                'id': item[0],
-                'x': item[1],
-                'y': item[2],
-                'z': item[3],
-                'width': item[4],
-                'height': item[5],
-                'depth': item[6]
-            }
-            for item in current_items
-        ])
+def placement_details(position: Position, rotation: int) -> str:
+    """Log text for a placement"""
+    details = f"Placed at position ({position.x}, {position.y}, {position.z})"
+    if rotation:
+        details += f" with rotation {rotation}"
+    return details
 
-        # Log the placement
-        cursor.execute("""
-            INSERT INTO logs (timestamp, action, item_id, container_id, details)
-            VALUES (?, 'place', ?, ?, ?)
-        """, (datetime.now().isoformat(), item_id, container_id, 
-              f"Placed at position ({best_position.x}, {best_position.y}, {best_position.z})"))
-        
-        conn.commit()
+def commit_placement(item_id: str, container_id: str, best_position: Position,
+                     rotation: int = 0) -> Dict:
+    """Write a placement found by the search to the database and the in-memory model"""
+    conn = None
+    try:
+        # Connection before the optimizer lock, the order every write path uses
+        conn = get_db()
+        cursor = conn.cursor()
+        with space_optimizer.lock:
+            # The model may have changed while the search was running
+            item = space_optimizer.items.get(item_id)
+            container = space_optimizer.containers.get(container_id)
+            if not item or not container:
+                raise HTTPException(status_code=404, detail="Item or container no longer exists")
+            if item.status == "placed":
+                raise HTTPException(status_code=400, detail="Item is already placed in a container")
+            if not container.fits_at(best_position, rotate(item.dimensions, rotation)):
+                raise HTTPException(status_code=409, detail="Container changed during placement, please retry")
+
+            # Update item record with the found position and orientation
+            cursor.execute("""
+                UPDATE items 
+                SET container_id = ?, x = ?, y = ?, z = ?, rotation = ?, status = 'placed'
+                WHERE id = ?
+            """, (container_id, best_position.x, best_position.y, best_position.z, rotation, item_id))
+
+            # Update container load
+            cursor.execute("""
+                UPDATE containers 
+                SET current_load = current_load + ?
+                WHERE container_id = ?
+            """, (item.weight, container_id))
+
+            commit_changes(conn, "items", "containers")
+
+            # Keep the in-memory model and its spatial index in sync
+            space_optimizer.place_item(item_id, container_id, best_position, rotation=rotation)
         
         # Get updated item and container data
-        cursor.execute("SELECT * FROM items WHERE id = ?", (item_id,))
+        cursor.execute(queries.ITEM_BY_ID, (item_id,))
         updated_item = cursor.fetchone()
-        cursor.execute("SELECT * FROM containers WHERE container_id = ?", (container_id,))
+        cursor.execute(queries.CONTAINER_BY_ID, (container_id,))
         updated_container = cursor.fetchone()
+    finally:
+        if conn:
+            conn.close()
+
+    # Logged once the connection is back in the pool, the writer may need it
+    log_writer.log('place', item_id, container_id, placement_details(best_position, rotation))
+
+    return {
+        "message": "Item placed successfully",
+        "item": dict(updated_item),
+        "container": dict(updated_container)
+    }
+
+def collect_container_candidates(item_id: str) -> Dict:
+    """Containers with room for an item, split by zone, from their free space maps"""
+    with space_optimizer.lock:
+        item = space_optimizer.items.get(item_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+        if item.status == "placed":
+            raise HTTPException(status_code=400, detail="Item is already placed in a container")
+
+        preferred: List[str] = []
+        others: List[str] = []
+        tightness: Dict[str, float] = {}
+        zones: Dict[str, Optional[str]] = {}
+        for container_id, container in space_optimizer.containers.items():
+            best_fit = container.best_fit(item.dimensions, item.allowed_rotations)
+            if best_fit is None:
+                continue
+            tightness[container_id] = best_fit
+            zones[container_id] = container.zone
+            if item.preferred_zone and container.zone == item.preferred_zone:
+                preferred.append(container_id)
+            else:
+                others.append(container_id)
+        preferred.sort(key=tightness.get)
+        others.sort(key=tightness.get)
+
+        return {
+            "dimensions": item.dimensions,
+            "priority": item.priority,
+            "weight": retrieval_weight(item.priority, item.uses_left),
+            "allowed_rotations": item.allowed_rotations,
+            "preferred_zone": item.preferred_zone,
+            "preferred": preferred,
+            "others": others,
+            "tightness": tightness,
+            "zones": zones,
+            "rejected": len(space_optimizer.containers) - len(tightness)
+        }
+
+async def run_container_evaluation(container_ids: List[str], candidates: Dict) -> List[ContainerFit]:
+    """Evaluate an item against containers, split over the packing workers"""
+    if not container_ids:
+        return []
+    jobs = min(len(container_ids), max(1, PACKING_CONCURRENCY))
+    chunks = [container_ids[i::jobs] for i in range(jobs)]
+
+    async def evaluate(chunk: List[str]) -> List[ContainerFit]:
+        async with packing_semaphore:
+            snapshot = await run_in_threadpool(space_optimizer.snapshot_containers, chunk,
+                                               candidates["dimensions"], candidates["allowed_rotations"])
+            args = (evaluate_containers_in_snapshot, snapshot, candidates["dimensions"],
+                    candidates["priority"], PLACEMENT_ENGINE, GRID_BACKEND, candidates["weight"])
+            pool = get_packing_pool()
+            if pool is None:
+                return await run_in_threadpool(*args)
+            return await asyncio.get_running_loop().run_in_executor(pool, *args)
+
+    results = await asyncio.gather(*(evaluate(chunk) for chunk in chunks))
+    return [fit for fits in results for fit in fits]
+
+@app.get("/api/items/{item_id}/recommend-containers")
+async def recommend_containers(item_id: str, k: int = 5):
+    """Rank the containers an item could be placed in"""
+    try:
+        if k < 1:
+            raise HTTPException(status_code=400, detail="k must be at least 1")
+
+        # Containers without an empty space large enough are never searched
+        candidates = await run_in_threadpool(collect_container_candidates, item_id)
+
+        # The preferred zone is searched first, the other containers only
+        # when it cannot provide k positions. Containers are searched in
+        # growing waves, snuggest fit first: once k positions are free to
+        # retrieve no container further down the list can rank above them.
+        fits: List[ContainerFit] = []
+        evaluated = 0
+        for group in (candidates["preferred"], candidates["others"]):
+            if len(fits) >= k:
+                break
+            needed = k - len(fits)
+            start = 0
+            wave = max(k, PACKING_CONCURRENCY) * 2
+            while start < len(group) and needed > 0:
+                batch = group[start:start + wave]
+                batch_fits = await run_container_evaluation(batch, candidates)
+                fits += batch_fits
+                evaluated += len(batch)
+                needed -= sum(1 for fit in batch_fits if fit.retrieval_cost == 0 and fit.retrieval_steps == 0)
+                start += wave
+                wave *= 2
+
+        # Preferred zone, then cheapest to retrieve, then the snuggest fit
+        preferred = set(candidates["preferred"])
+        tightness = candidates["tightness"]
+        ranked = heapq.nsmallest(k, fits, key=lambda fit: (
+            fit.container_id not in preferred, fit.retrieval_cost, fit.retrieval_steps,
+            tightness[fit.container_id], fit.container_id
+        ))
+
+        zones = candidates["zones"]
 
-        # Create response dictionaries with proper column names
-        item_dict = {}
-        container_dict = {}
-        
-        # Get column names for items table
-        cursor.execute("PRAGMA table_info(items)")
-        item_columns = [col[1] for col in cursor.fetchall()]
-        
-        # Get column names for containers table
-        cursor.execute("PRAGMA table_info(containers)")
-        container_columns = [col[1] for col in cursor.fetchall()]
-        
-        # Map values to column names
-        for idx, col in enumerate(item_columns):
-            item_dict[col] = updated_item[idx]
-            
-        for idx, col in enumerate(container_columns):
-            container_dict[col] = updated_container[idx]
-        
         return {
-            "message": "Item placed successfully",
-            "item": item_dict,
-            "container": container_dict
+            "item_id": item_id,
+            "preferred_zone": candidates["preferred_zone"],
+            "containers_evaluated": evaluated,
+            "containers_rejected": candidates["rejected"],
+            "recommendations": [
+                {
+                    "container_id": fit.container_id,
+                    "zone": zones[fit.container_id],
+                    "in_preferred_zone": fit.container_id in preferred,
+                    "position": {"x": fit.position.x, "y": fit.position.y, "z": fit.position.z},
+                    "rotation": fit.rotation,
+                    "retrieval_steps": fit.retrieval_steps,
+                    "retrieval_cost": fit.retrieval_cost,
+                    "free_volume": fit.free_volume
+                }
+                for fit in ranked
+            ]
         }
 
     except HTTPException as e:
         raise e
     except Exception as e:
-        print(f"Error placing item: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to place item: {str(e)}")
+        print(f"Error recommending containers: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to recommend containers: {str(e)}")
+
+@app.post("/api/placement/batch")
+async def place_items_batch(request: BatchPlacementRequest):
+    """Place many items across all containers in one call"""
+    if not request.all_available and not request.item_ids:
+        raise HTTPException(status_code=400, detail="Provide item_ids or set all_available")
+
+    # Hold every container lock so that no single placement interleaves
+    # with the batch, locks are always taken in container id order
+    locks = [container_locks[container_id] for container_id in sorted(space_optimizer.containers)]
+    for lock in locks:
+        await lock.acquire()
+    try:
+        async with packing_semaphore:
+            return await run_in_threadpool(run_batch_placement, request)
     finally:
-        if conn:
-            conn.close()
-
-def find_position_with_cache(dimensions: Dimensions, cached_layout: Dict[str, Dict], 
-                           container_width: float, container_height: float, container_depth: float,
-                           item_priority: int) -> Optional[Position]:
-    """Find a position using cached layout"""
-    # Convert cached layout to list of placed items
-    placed_items = []
-    for item_data in cached_layout.values():
-        placed_items.append((
-            item_data['x'],
-            item_data['y'],
-            item_data['z'],
-            item_data['width'],
-            item_data['height'],
-            item_data['depth'],
-            item_priority  # Use same priority as new item for consistency
-        ))
-    
-    return find_position(dimensions, placed_items, container_width, container_height, container_depth, item_priority)
-
-def find_position(dimensions: Dimensions, placed_items: List[Tuple], 
-                 container_width: float, container_height: float, container_depth: float,
-                 item_priority: int) -> Optional[Position]:
-    """Find a position for an item in a container"""
-    # Start from the front corner (min x,y,z) for high priority items, back corner for low priority
-    best_position = None
-    min_distance = float('inf')
-
-    # Increase step size from 0.5cm to 2cm for faster placement
-    STEP_SIZE = 2.0  # cm
-
-    # Determine search direction based on priority
-    # Higher priority items (lower numbers) start from the front
-    # Lower priority items (higher numbers) start from the back
-    x_range = range(0, int((container_width - dimensions.width) / STEP_SIZE) + 1) if item_priority <= 3 else range(int((container_width - dimensions.width) / STEP_SIZE), -1, -1)
-    y_range = range(0, int((container_height - dimensions.height) / STEP_SIZE) + 1) if item_priority <= 3 else range(int((container_height - dimensions.height) / STEP_SIZE), -1, -1)
-    z_range = range(0, int((container_depth - dimensions.depth) / STEP_SIZE) + 1) if item_priority <= 3 else range(int((container_depth - dimensions.depth) / STEP_SIZE), -1, -1)
-
-    # Try positions
-    for x in x_range:
-        for y in y_range:
-            for z in z_range:
-                # Convert to actual coordinates using new step size
-                actual_x = x * STEP_SIZE
-                actual_y = y * STEP_SIZE
-                actual_z = z * STEP_SIZE
-
-                # Check if position is valid
-                position_valid = True
-                has_support = False
-
-                # Check for overlaps with other items
-                for placed_item in placed_items:
-                    if (actual_x < placed_item[0] + placed_item[3] and
-                        actual_x + dimensions.width > placed_item[0] and
-                        actual_y < placed_item[1] + placed_item[4] and
-                        actual_y + dimensions.height > placed_item[1] and
-                        actual_z < placed_item[2] + placed_item[5] and
-                        actual_z + dimensions.depth > placed_item[2]):
-                        position_valid = False
-                        break
-
-                    # Check for support behind the item
-                    if item_priority > 3:  # Only check support for lower priority items
-                        # Check if there's an item or wall behind
-                        if (abs(actual_z + dimensions.depth - placed_item[2]) < STEP_SIZE and  # Item is right behind
-                            actual_x < placed_item[0] + placed_item[3] and
-                            actual_x + dimensions.width > placed_item[0] and
-                            actual_y < placed_item[1] + placed_item[4] and
-                            actual_y + dimensions.height > placed_item[1]):
-                            has_support = True
-                            break
-
-                # For lower priority items, require support unless at the back wall
-                if item_priority > 3 and not has_support and actual_z + dimensions.depth < container_depth - STEP_SIZE:
-                    position_valid = False
-
-                if position_valid:
-                    # Calculate distance to target (front for high priority, back for low priority)
-                    if item_priority <= 3:
-                        # Distance to front for high priority items
-                        distance = (actual_x**2 + actual_y**2 + actual_z**2)**0.5
-                    else:
-                        # Distance to back for low priority items
-                        distance = (
-                            (container_width - (actual_x + dimensions.width))**2 +
-                            (container_height - (actual_y + dimensions.height))**2 +
-                            (container_depth - (actual_z + dimensions.depth))**2
-                        )**0.5
-
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_position = Position(actual_x, actual_y, actual_z)
+        for lock in reversed(locks):
+            lock.release()
 
-    return best_position
-
-@app.get("/api/items/retrieval_info")
-async def get_retrieval_info(item_id: str):
-    """Get information about how to retrieve an item"""
+def run_batch_placement(request: BatchPlacementRequest) -> Dict:
+    """Pack the requested items in memory and commit the plan in one transaction"""
     conn = None
     try:
-        # Get database connection
         conn = get_db()
         cursor = conn.cursor()
-        
-        # Check if item exists and is placed
-        cursor.execute("""
-            SELECT id, container_id, x, y, z, status
-            FROM items
-            WHERE id = ?
-        """, (item_id,))
-        item = cursor.fetchone()
-        if not item:
-            raise HTTPException(status_code=404, detail="Item not found")
-        
-        if item[5] != "placed":
-            raise HTTPException(status_code=400, detail="Item is not placed in any container")
-            
-        container_id = item[1]
-        position = Position(float(item[2]), float(item[3]), float(item[4]))
+        with space_optimizer.lock:
+            # Collect the items to place
+            unplaced = []
+            if request.all_available:
+                item_ids = [
+                    item_id for item_id, item in space_optimizer.items.items()
+                    if item.status == 'available'
+                ]
+            else:
+                item_ids = []
+                for item_id in request.item_ids:
+                    item = space_optimizer.items.get(item_id)
+                    if item is None:
+                        unplaced.append({"item_id": item_id, "reason": "Item not found"})
+                    elif item.status != 'available':
+                        unplaced.append({"item_id": item_id, "reason": f"Item is {item.status}"})
+                    else:
+                        item_ids.append(item_id)
+
+            # Pack everything in memory against the live layout
+            placements, not_fitting = space_optimizer.pack_items([
+                (
+                    item_id,
+                    space_optimizer.items[item_id].dimensions,
+                    space_optimizer.items[item_id].priority,
+                    space_optimizer.items[item_id].preferred_zone
+                )
+                for item_id in item_ids
+            ], engine=PLACEMENT_ENGINE)
+            unplaced.extend(
+                {"item_id": item_id, "reason": "No valid position found in any container"}
+                for item_id in not_fitting
+            )
 
-        # Initialize space optimizer if needed
-        if not space_optimizer.containers:
-            space_optimizer.initialize_from_db(conn)
+            # Commit every position in a single transaction
+            timestamp = log_timestamp()
+            load_by_container: Dict[str, float] = defaultdict(float)
+            for item_id, container_id, position, rotation in placements:
+                load_by_container[container_id] += space_optimizer.items[item_id].weight
 
-        # Get container dimensions
-        cursor.execute("""
-            SELECT width_cm, height_cm, depth_cm
-            FROM containers
-            WHERE container_id = ?
-        """, (container_id,))
-        container = cursor.fetchone()
-        if not container:
-            raise HTTPException(status_code=404, detail="Container not found")
+            try:
+                cursor.executemany("""
+                    UPDATE items 
+                    SET container_id = ?, x = ?, y = ?, z = ?, rotation = ?, status = 'placed'
+                    WHERE id = ?
+                """, [
+                    (container_id, position.x, position.y, position.z, rotation, item_id)
+                    for item_id, container_id, position, rotation in placements
+                ])
+                cursor.executemany("""
+                    UPDATE containers 
+                    SET current_load = current_load + ?
+                    WHERE container_id = ?
+                """, [(load, container_id) for container_id, load in load_by_container.items()])
+                commit_changes(conn, "items", "containers")
+            except Exception:
+                # Undo the in-memory placements so the model matches the database
+                for item_id, _, _, _ in placements:
+                    space_optimizer.remove_item(item_id, status='available')
+                raise
 
-        # Get item dimensions
-        cursor.execute("""
-            SELECT width, height, depth
-            FROM items
-            WHERE id = ?
-        """, (item_id,))
-        item_dimensions = cursor.fetchone()
-        if not item_dimensions:
-            raise HTTPException(status_code=404, detail="Item dimensions not found")
-
-        dimensions = Dimensions(float(item_dimensions[0]), float(item_dimensions[1]), float(item_dimensions[2]))
-
-        # Create item placement
-        placement = ItemPlacement(item_id, position, dimensions)
-
-        # Get blocking items
-        blocking_items = []
-        for other_id, other_placement in space_optimizer.containers[container_id].items.items():
-            if other_id != item_id:
-                other_min, other_max = other_placement.get_bounds()
-                item_min, item_max = placement.get_bounds()
-                
-                # Check if item is above or in front of target
-                if (other_min.y >= item_max.y and  # Above
-                    other_min.x < item_max.x and other_max.x > item_min.x and
-                    other_min.z < item_max.z and other_max.z > item_min.z):
-                    blocking_items.append(other_id)
-                elif (other_min.z < item_max.z and  # In front
-                    other_min.x < item_max.x and other_max.x > item_min.x and
-                    other_min.y < item_max.y and other_max.y > item_min.y):
-                    blocking_items.append(other_id)
-
-        # Get details of blocking items
-        blocking_items_details = []
-        for blocking_id in blocking_items:
-            cursor.execute("""
-                SELECT id, name, container_id, x, y, z
-                FROM items
-                WHERE id = ?
-            """, (blocking_id,))
-            blocking_item = cursor.fetchone()
-            if blocking_item:
-                blocking_items_details.append({
-                    "id": blocking_item[0],
-                    "name": blocking_item[1],
-                    "container_id": blocking_item[2],
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"Error in batch placement: {str(e)}")
+        if conn:
+            conn.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to place items: {str(e)}")
+    finally:
+        if conn:
+            conn.close()
+
+    log_writer.log_many([
+        (timestamp, 'place', item_id, container_id, placement_details(position, rotation))
+        for item_id, container_id, position, rotation in placements
+    ])
+
+    return {
+        "message": f"Placed {len(placements)} items, {len(unplaced)} could not be placed",
+        "placements": [
+            {
+                "item_id": item_id,
+                "container_id": container_id,
+                "position": {"x": position.x, "y": position.y, "z": position.z},
+                "rotation": rotation
+            }
+            for item_id, container_id, position, rotation in placements
+        ],
+        "unplaced": unplaced
+    }
+
+@app.get("/api/items/retrieval_info")
+def get_retrieval_info(item_id: str):
+    """Get information about how to retrieve an item"""
+    try:
+        with space_optimizer.lock:
+            # Check if item exists and is placed
+            item = space_optimizer.items.get(item_id)
+            if not item:
+                raise HTTPException(status_code=404, detail="Item not found")
+
+            if item.status != "placed" or item.container_id is None:
+                raise HTTPException(status_code=400, detail="Item is not placed in any container")
+
+            container_id = item.container_id
+            container_3d = space_optimizer.containers.get(container_id)
+            if not container_3d:
+                raise HTTPException(status_code=404, detail="Container not found")
+
+            # Blockers and their removal order come from the container's
+            # cached blocking graph
+            plan = retrieval_planner.plan(container_3d, item_id)
+            store = container_3d.items
+            data = store.data
+
+            def describe(other_id: str) -> dict:
+                other = store.offsets[other_id]
+                other_info = space_optimizer.items.get(other_id)
+                return {
+                    "id": other_id,
+                    "name": other_info.name if other_info else None,
+                    "container_id": container_id,
                     "position": {
-                        "x": blocking_item[3],
-                        "y": blocking_item[4],
-                        "z": blocking_item[5]
+                        "x": data[other + MIN_X],
+                        "y": data[other + MIN_Y],
+                        "z": data[other + MIN_Z]
                     }
-                })
-        
-        return {
-            "item_id": item_id,
-            "container_id": container_id,
-            "position": {
-                "x": position.x,
-                "y": position.y,
-                "z": position.z
-            },
-            "blocking_items": blocking_items_details
-        }
+                }
+
+            # Blocking items are listed in the order they have to come out
+            blocking_items_details = [describe(other_id) for other_id in plan.removals]
+            target = describe(item_id)
+
+            return {
+                "item_id": item_id,
+                "container_id": container_id,
+                "position": target["position"],
+                "blocking_items": blocking_items_details,
+                "retrieval_steps": plan.retrieval_steps,
+                "steps": [
+                    {"step": number, "action": action, "item_id": step_id,
+                     "name": getattr(space_optimizer.items.get(step_id), "name", None)}
+                    for number, (action, step_id) in enumerate(plan.steps(), 1)
+                ]
+            }
 
     except HTTPException as e:
         raise e
     except Exception as e:
         print(f"Error getting retrieval info: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
+
+def build_space_info_layout(container: Container3D) -> dict:
+    """The parts of /api/containers/space-info that only change with the layout"""
+    # Get items in container
+    placements = sorted(
+        container.items.values(),
+        key=lambda p: (p.position.z, p.position.x, p.position.y)
+    )
+    items = []
+    for placement in placements:
+        info = space_optimizer.items.get(placement.item_id)
+        items.append({
+            "id": placement.item_id,
+            "name": info.name if info else None,
+            "container_id": container.container_id,
+            "x": placement.position.x,
+            "y": placement.position.y,
+            "z": placement.position.z,
+            "width": placement.dimensions.width,
+            "height": placement.dimensions.height,
+            "depth": placement.dimensions.depth,
+            "weight": info.weight if info else None,
+            "priority": info.priority if info else None,
+            "status": info.status if info else None,
+            "blockers": container.blocker_counts.get(placement.item_id, 0)
+        })
+
+    used_volume = sum(
+        placement.dimensions.get_volume()
+        for placement in placements
+    )
+    largest = container.free_space.largest_space()
+    return {
+        "items": items,
+        "used_volume": used_volume,
+        # Biggest empty box an item could go into
+        "largest_free_space": {
+            "x": largest[0],
+            "y": largest[1],
+            "z": largest[2],
+            "width": largest[3] - largest[0],
+            "height": largest[4] - largest[1],
+            "depth": largest[5] - largest[2]
+        } if largest else None
+    }
 
 @app.get("/api/containers/space-info/{container_id}")
-async def get_container_space_info(container_id: str):
+def get_container_space_info(container_id: str):
     """Get detailed information about container space usage"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Get container information
-        cursor.execute("SELECT * FROM containers WHERE container_id = ?", (container_id,))
-        container = cursor.fetchone()
-        if not container:
-            raise HTTPException(status_code=404, detail="Container not found")
-            
-        # Get items in container
-        cursor.execute("""
-            SELECT * FROM items 
-            WHERE container_id = ? 
-            ORDER BY z ASC, x ASC, y ASC
-        """, (container_id,))
-        
-        items = [dict(row) for row in cursor.fetchall()]
-        
-        # Calculate space usage
-        total_volume = container['width_cm'] * container['depth_cm'] * container['height_cm']
-        used_volume = sum(
-            item['width'] * item['depth'] * item['height']
-            for item in items
-        )
-        usage_percentage = (used_volume / total_volume) * 100
-        
-        return {
-            "container_id": container_id,
-            "container_name": container['name'],
-            "dimensions": {
-                "width": container['width_cm'],
-                "depth": container['depth_cm'],
-                "height": container['height_cm']
-            },
-            "total_volume": total_volume,
-            "used_volume": used_volume,
-            "usage_percentage": usage_percentage,
-            "items": items,
-            "current_load": container['current_load']
-        }
+        with space_optimizer.lock:
+            # Get container information
+            container = space_optimizer.containers.get(container_id)
+            if not container:
+                raise HTTPException(status_code=404, detail="Container not found")
+
+            # Blocker counts are kept up to date once they have been built
+            container.refresh_blocking()
+            # Rebuilt only when the container has changed since the last call
+            layout = space_optimizer.layouts.get(container, "space_info", build_space_info_layout)
+
+            # Calculate space usage
+            total_volume = container.dimensions.get_volume()
+            used_volume = layout["used_volume"]
+            usage_percentage = (used_volume / total_volume) * 100
+
+            return {
+                "container_id": container_id,
+                "container_name": container.name,
+                "dimensions": {
+                    "width": container.dimensions.width,
+                    "depth": container.dimensions.depth,
+                    "height": container.dimensions.height
+                },
+                "total_volume": total_volume,
+                "used_volume": used_volume,
+                "usage_percentage": usage_percentage,
+                "items": layout["items"],
+                "current_load": container.current_load,
+                # Follows the items' remaining uses, which do not change the layout
+                "retrieval_cost": container.retrieval_cost,
+                "free_volume": total_volume - used_volume,
+                "largest_free_space": layout["largest_free_space"]
+            }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/items/expiring")
+def get_expiring_items(limit: int = 10):
+    """Next items to expire, soonest first"""
+    try:
+        if limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be at least 1")
+        return {"items": get_upcoming_expiries(limit)}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
 
 @app.get("/api/items/waste")
-async def get_waste_items():
+def get_waste_items(request: Request, response: Response):
+    conn = None
     try:
+        etag, change_version = changes.tag("items")
+        cached = not_modified(request, etag, change_version)
+        if cached is not None:
+            return cached
         conn = get_db()
         cursor = conn.cursor()
         
         # Get only items that are explicitly marked as waste
-        cursor.execute("""
-            SELECT * FROM items 
-            WHERE status = 'waste'
-        """)
+        cursor.execute(queries.WASTE_ITEMS)
         waste_items = [dict(row) for row in cursor.fetchall()]
-        
-        # Log the waste check
-        cursor.execute("""
-            INSERT INTO logs (action, details)
-            VALUES (?, ?)
-        """, ('waste-check', f"Found {len(waste_items)} items marked as waste"))
-        
-        conn.commit()
-        return {"waste_items": waste_items}
     except Exception as e:
         print(f"Error checking waste items: {str(e)}")
         if conn:
@@ -814,17 +1198,22 @@ async def get_waste_items():
         if conn:
             conn.close()
 
+    # Log the waste check
+    log_writer.log('waste-check', details=f"Found {len(waste_items)} items marked as waste")
+    set_etag(response, etag, change_version)
+    return {"waste_items": waste_items}
+
 @app.post("/api/items/waste/{item_id}")
-async def mark_as_waste(item_id: int):
+def mark_as_waste(item_id: str):
+    conn = None
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
         # Check if item exists
-        cursor.execute("SELECT * FROM items WHERE id = ?", (item_id,))
-        item = cursor.fetchone()
+        item = space_optimizer.items.get(item_id)
         if not item:
             raise HTTPException(status_code=404, detail="Item not found")
+
+        conn = get_db()
+        cursor = conn.cursor()
             
         # Update item status
         cursor.execute("""
@@ -832,23 +1221,23 @@ async def mark_as_waste(item_id: int):
             SET status = 'waste', container_id = NULL 
             WHERE id = ?
         """, (item_id,))
+
+        # Release the item's weight from its container
+        if item.container_id is not None:
+            cursor.execute("""
+                UPDATE containers 
+                SET current_load = current_load - ?
+                WHERE container_id = ?
+            """, (item.weight, item.container_id))
         
-        # Log the action
-        cursor.execute("""
-            INSERT INTO logs (action, item_id, details)
-            VALUES (?, ?, ?)
-        """, ('mark-waste', item_id, f"Item {item_id} marked as waste"))
-        
-        conn.commit()
+        commit_changes(conn, "items", "containers")
+        space_optimizer.remove_item(item_id, status='waste')
         
         # Get updated item data
-        cursor.execute("SELECT * FROM items WHERE id = ?", (item_id,))
+        cursor.execute(queries.ITEM_BY_ID, (item_id,))
         updated_item = dict(cursor.fetchone())
-        
-        return {
-            "message": "Item marked as waste successfully",
-            "item": updated_item
-        }
+    except HTTPException as he:
+        raise he
     except Exception as e:
         print(f"Error marking item as waste: {str(e)}")
         if conn:
@@ -858,30 +1247,92 @@ async def mark_as_waste(item_id: int):
         if conn:
             conn.close()
 
+    # Log the action
+    log_writer.log('mark-waste', item_id, details=f"Item {item_id} marked as waste")
+
+    return {
+        "message": "Item marked as waste successfully",
+        "item": updated_item
+    }
+
 @app.get("/api/logs")
-async def get_logs():
+def get_logs(request: Request, response: Response, limit: int = 50, cursor: Optional[int] = None,
+             action: Optional[str] = None, item_id: Optional[str] = None,
+             container_id: Optional[str] = None,
+             start: Optional[str] = None, end: Optional[str] = None,
+             include_archived: bool = False):
+    """Logs newest first, one page at a time.
+
+    Pass the returned next_cursor as `cursor` to get the following page.
+    Pages are keyed on the log id, so rows logged in between never shift
+    or repeat them. `start` and `end` bound the timestamp, e.g.
+    2025-04-06 or 2025-04-06T12:00:00, the end is exclusive. With
+    `include_archived` the pages continue into the archived segments.
+    """
+    conn = None
     try:
+        if limit < 1 or limit > LOG_PAGE_MAX:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {LOG_PAGE_MAX}")
+
+        conditions = []
+        params: List = []
+        if cursor is not None:
+            conditions.append(queries.LOGS_BEFORE_CURSOR)
+            params.append(cursor)
+        for column, value in zip(queries.LOG_FILTER_COLUMNS, (action, item_id, container_id)):
+            if value is not None:
+                conditions.append(queries.log_filter(column))
+                params.append(value)
+        # Timestamps are stored in log_timestamp's 'YYYY-MM-DD HH:MM:SS' form,
+        # ISO bounds are brought to it so the bare column can use its index
+        if start is not None:
+            conditions.append(queries.LOGS_FROM)
+            params.append(start.replace('T', ' '))
+        if end is not None:
+            conditions.append(queries.LOGS_UNTIL)
+            params.append(end.replace('T', ' '))
+
+        etag, change_version = changes.tag("logs")
+        cached = not_modified(request, etag, change_version)
+        if cached is not None:
+            return cached
+        # Rows still in the write buffer belong on the first page
+        log_writer.flush()
         conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM logs ORDER BY timestamp DESC LIMIT 50")
-        logs = [dict(row) for row in cursor.fetchall()]
-        return {"logs": logs}
+        rows = conn.execute(queries.logs_page_query(conditions), (*params, limit + 1)).fetchall()
+        rows = [dict(row) for row in rows]
+        if include_archived:
+            archived = log_archive.read(limit + 1, cursor, action, item_id, container_id, start, end)
+            # A row can be in both while an archival run is deleting it
+            merged = {row["id"]: row for row in archived}
+            merged.update((row["id"], row) for row in rows)
+            rows = heapq.nlargest(limit + 1, merged.values(), key=lambda row: row["id"])
+        logs = rows[:limit]
+        set_etag(response, etag, change_version)
+        return {
+            "logs": logs,
+            "next_cursor": logs[-1]["id"] if len(rows) > limit else None
+        }
+    except HTTPException as he:
+        raise he
     except Exception as e:
         print(f"Error fetching logs: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        conn.close()
+        if conn:
+            conn.close()
 
 @app.post("/api/items/retrieve")
-async def retrieve_item(item_id: str = Query(..., description="The ID of the item to retrieve")):
+def retrieve_item(item_id: str = Query(..., description="The ID of the item to retrieve")):
     """Retrieve an item from its container"""
+    conn = None
     try:
         print(f"DEBUG: Retrieving item with ID: {item_id}")
         conn = get_db()
         cursor = conn.cursor()
         
         # Check if item exists and is placed
-        cursor.execute("SELECT * FROM items WHERE item_id = ? OR id = ?", (item_id, item_id))
+        cursor.execute(queries.ITEM_BY_ITEM_ID_OR_ID, (item_id, item_id))
         item = cursor.fetchone()
         print(f"DEBUG: Found item: {dict(item) if item else None}")
         if not item:
@@ -891,7 +1342,7 @@ async def retrieve_item(item_id: str = Query(..., description="The ID of the ite
             
         # Get container information
         container_id = item['container_id']
-        cursor.execute("SELECT * FROM containers WHERE container_id = ?", (container_id,))
+        cursor.execute(queries.CONTAINER_BY_ID, (container_id,))
         container = cursor.fetchone()
         print(f"DEBUG: Found container: {dict(container) if container else None}")
         
@@ -916,33 +1367,21 @@ async def retrieve_item(item_id: str = Query(..., description="The ID of the ite
         # Update container load
         cursor.execute("""
             UPDATE containers 
-            SET current_load = current_load - 1 
+            SET current_load = current_load - ?
             WHERE container_id = ?
-        """, (container_id,))
+        """, (item['weight'] or 0, container_id))
         
-        # Log the action
-        cursor.execute("""
-            INSERT INTO logs (action, item_id, container_id, details)
-            VALUES (?, ?, ?, ?)
-        """, ('retrieve', item_id, container_id, 
-              f"Retrieved item {item_id} from container {container_id}"))
-        
-        conn.commit()
+        commit_changes(conn, "items", "containers")
+        space_optimizer.remove_item(str(item['id']), status='available')
+        if item['usage_limit'] is not None:
+            space_optimizer.set_uses_left(str(item['id']), item['usage_limit'] - new_usage_count)
         
         # Get updated data
-        cursor.execute("SELECT * FROM items WHERE item_id = ? OR id = ?", (item_id, item_id))
+        cursor.execute(queries.ITEM_BY_ITEM_ID_OR_ID, (item_id, item_id))
         updated_item = dict(cursor.fetchone())
-        cursor.execute("SELECT * FROM containers WHERE container_id = ?", (container_id,))
+        cursor.execute(queries.CONTAINER_BY_ID, (container_id,))
         updated_container = dict(cursor.fetchone())
         
-        print(f"DEBUG: Returning updated item: {updated_item}")
-        print(f"DEBUG: Returning updated container: {updated_container}")
-        
-        return {
-            "message": "Item retrieved successfully",
-            "item": updated_item,
-            "container": updated_container
-        }
     except HTTPException as he:
         print(f"DEBUG: HTTP Exception in retrieve_item: {str(he)}")
         if conn:
@@ -957,14 +1396,73 @@ async def retrieve_item(item_id: str = Query(..., description="The ID of the ite
         if conn:
             conn.close()
 
+    # Log the action
+    log_writer.log('retrieve', item_id, container_id,
+                   f"Retrieved item {item_id} from container {container_id}")
+
+    print(f"DEBUG: Returning updated item: {updated_item}")
+    print(f"DEBUG: Returning updated container: {updated_container}")
+    
+    return {
+        "message": "Item retrieved successfully",
+        "item": updated_item,
+        "container": updated_container
+    }
+
+def run_archival() -> int:
+    """Move logs past the retention limits to the archive"""
+    conn = get_db()
+    try:
+        archived = archive_logs(conn, log_archive, LOG_RETENTION_DAYS, LOG_RETENTION_ROWS,
+                                LOG_ARCHIVE_BATCH_SIZE)
+        if archived:
+            changes.bump("logs")
+            print(f"DEBUG: Archived {archived} log rows to {LOG_ARCHIVE_DIR}")
+        return archived
+    finally:
+        conn.close()
+
+async def run_log_archival(interval: float):
+    """Archive old logs every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(run_archival)
+        except Exception as e:
+            print(f"ERROR: Scheduled log archival failed: {str(e)}")
+
+@app.post("/api/logs/archive")
+def archive_old_logs():
+    """Apply the log retention limits now instead of waiting for the next run"""
+    try:
+        if LOG_RETENTION_DAYS <= 0 and LOG_RETENTION_ROWS <= 0:
+            raise HTTPException(status_code=400, detail="No log retention limit is configured")
+        log_writer.flush()
+        return {"archived": run_archival()}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        print(f"Error archiving logs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/api/logs/clear")
-async def clear_logs():
-    """Clear all logs from the database"""
+def clear_logs():
+    """Clear all logs from the database and the archive"""
+    conn = None
     try:
+        # Buffered rows were logged before the clear and go with the rest
+        log_writer.flush()
         conn = get_db()
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM logs")
-        conn.commit()
+        # In batches, so other writers get the database in between
+        while True:
+            cursor.execute("DELETE FROM logs WHERE id IN (SELECT id FROM logs LIMIT ?)",
+                           (LOG_ARCHIVE_BATCH_SIZE,))
+            conn.commit()
+            if cursor.rowcount < LOG_ARCHIVE_BATCH_SIZE:
+                break
+        log_archive.clear()
+        changes.bump("logs")
         return {"message": "All logs cleared successfully"}
     except Exception as e:
         print(f"Error clearing logs: {str(e)}")
@@ -976,9 +1474,14 @@ async def clear_logs():
             conn.close()
 
 @app.get("/api/current-date")
-async def get_system_date():
+def get_system_date(request: Request, response: Response):
     try:
+        etag, change_version = changes.tag("system_settings")
+        cached = not_modified(request, etag, change_version)
+        if cached is not None:
+            return cached
         current_date = get_current_date()
+        set_etag(response, etag, change_version)
         return {
             "current_date": current_date.isoformat()
         }
@@ -986,9 +1489,11 @@ async def get_system_date():
         print(f"Error getting current date: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def get_current_date():
+def get_current_date(conn=None):
     """Get the current system date from database"""
-    conn = get_db()
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db()
     cursor = conn.cursor()
     try:
         cursor.execute('SELECT value FROM system_settings WHERE key = "current_date"')
@@ -998,7 +1503,7 @@ def get_current_date():
             current_date = datetime.now().date()
             cursor.execute('INSERT INTO system_settings (key, value) VALUES (?, ?)',
                          ('current_date', current_date.isoformat()))
-            conn.commit()
+            commit_changes(conn, "system_settings")
             return current_date
             
         date_str = result['value']
@@ -1008,11 +1513,14 @@ def get_current_date():
         # Return today's date as fallback
         return datetime.now().date()
     finally:
-        conn.close()
+        if own_conn:
+            conn.close()
 
-def set_current_date(new_date):
+def set_current_date(new_date, conn=None):
     """Set the current system date in database"""
-    conn = get_db()
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db()
     cursor = conn.cursor()
     try:
         cursor.execute('UPDATE system_settings SET value = ? WHERE key = "current_date"',
@@ -1020,98 +1528,138 @@ def set_current_date(new_date):
         if cursor.rowcount == 0:
             cursor.execute('INSERT INTO system_settings (key, value) VALUES (?, ?)',
                          ('current_date', new_date.isoformat()))
-        conn.commit()
+        commit_changes(conn, "system_settings")
     except Exception as e:
         print(f"DEBUG: Error setting current date: {str(e)}")
         conn.rollback()
         raise
     finally:
-        conn.close()
+        if own_conn:
+            conn.close()
+
+def sweep_expired_items(current_date=None) -> List[str]:
+    """Mark every item that expired before the current date as waste.
 
-def check_item_expiry(item_id):
-    """Check if an item is expired based on current system date"""
+    The expired items are popped from the optimizer's expiry queue, so only
+    the items that actually expire are touched. The container load
+    adjustment and the status updates are written in one transaction, the
+    log entries are queued once the connection is released. Returns the
+    ids of the items that expired. It is used by the time simulation
+    endpoints and by the periodic background sweep.
+    """
     conn = get_db()
     cursor = conn.cursor()
     try:
-        cursor.execute("""
-            SELECT id, name, expiry_date, status
-            FROM items
-            WHERE id = ? AND status != 'waste'
-        """, (item_id,))
-        item = cursor.fetchone()
-        
-        if not item or not item['expiry_date']:
-            return False
-            
-        expiry_date = datetime.strptime(item['expiry_date'].split('T')[0], "%Y-%m-%d").date()
-        current_date = get_current_date()
-        
-        if current_date > expiry_date:
-            # Mark as waste and log
-            cursor.execute("""
-                UPDATE items
-                SET status = 'waste',
-                    container_id = NULL,
-                    x = NULL,
-                    y = NULL,
-                    z = NULL,
-                    rotation = NULL
-                WHERE id = ?
-            """, (item_id,))
-            
-            cursor.execute("""
-                INSERT INTO logs (item_id, action, timestamp, details)
-                VALUES (?, ?, ?, ?)
-            """, (item_id, "Item expired", datetime.now().isoformat(),
-                 f"Item {item['name']} (ID: {item_id}) expired on {current_date.isoformat()}"))
-            
-            conn.commit()
-            return True
-        return False
+        if current_date is None:
+            current_date = get_current_date(conn)
+        today = current_date.isoformat()
+
+        with space_optimizer.lock:
+            expired_items = space_optimizer.expiry.pop_expired(today)
+            if not expired_items:
+                return []
+
+            try:
+                timestamp = log_timestamp()
+                released = defaultdict(float)
+                log_rows = []
+                for item_id in expired_items:
+                    info = space_optimizer.items[item_id]
+                    if info.container_id is not None:
+                        released[info.container_id] += info.weight
+                    log_rows.append((timestamp, 'Item expired', item_id, info.container_id,
+                                     f"Item {info.name} (ID: {item_id}) expired on {today}"))
+
+                # Release the weight of expired items still sitting in containers
+                cursor.executemany("""
+                    UPDATE containers
+                    SET current_load = current_load - ?
+                    WHERE container_id = ?
+                """, [(weight, container_id) for container_id, weight in released.items()])
+
+                cursor.executemany("""
+                    UPDATE items
+                    SET status = 'waste',
+                        container_id = NULL,
+                        x = NULL,
+                        y = NULL,
+                        z = NULL,
+                        rotation = NULL
+                    WHERE id = ?
+                """, [(item_id,) for item_id in expired_items])
+
+                commit_changes(conn, "items", "containers")
+            except Exception:
+                # Put the items back so the next sweep picks them up again
+                for item_id in expired_items:
+                    space_optimizer.expiry.push(item_id, space_optimizer.items[item_id].expiry_date)
+                raise
+
+            for item_id in expired_items:
+                space_optimizer.remove_item(item_id, status='waste')
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         conn.close()
 
+    log_writer.log_many(log_rows)
+    return expired_items
+
+def get_upcoming_expiries(limit: int = 10) -> List[dict]:
+    """The next `limit` items to expire, read from the expiry queue"""
+    with space_optimizer.lock:
+        upcoming = []
+        for expiry_date, item_id in space_optimizer.expiry.peek(limit):
+            info = space_optimizer.items[item_id]
+            upcoming.append({
+                "id": item_id,
+                "name": info.name,
+                "expiry_date": expiry_date,
+                "status": info.status,
+                "container_id": info.container_id
+            })
+        return upcoming
+
+async def run_expiry_sweeps(interval: float):
+    """Sweep expired items every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            expired_items = await run_in_threadpool(sweep_expired_items)
+            if expired_items:
+                print(f"DEBUG: Scheduled sweep marked {len(expired_items)} expired items as waste")
+        except Exception as e:
+            print(f"ERROR: Scheduled expiry sweep failed: {str(e)}")
+
 @app.post("/api/fast-forward")
-async def fast_forward(request: FastForwardRequest):
+def fast_forward(request: FastForwardRequest):
     try:
         print(f"Received fast-forward request for {request.days} days")
-        current_date = get_current_date()
-        new_date = current_date + timedelta(days=request.days)
-        set_current_date(new_date)
-        print(f"Updated current_date to: {new_date}")
-        
-        # Check for expired items
         conn = get_db()
-        cursor = conn.cursor()
         
         try:
-            # Get all non-waste items with expiry dates
-            cursor.execute("""
-                SELECT id
-                FROM items
-                WHERE expiry_date IS NOT NULL AND status != 'waste'
-            """)
-            items = cursor.fetchall()
-            print(f"Found {len(items)} items to check for expiration")
-            
-            expired_items = []
-            for item in items:
-                if check_item_expiry(item['id']):
-                    expired_items.append(item['id'])
-            
-            print(f"Found {len(expired_items)} expired items")
-            return {
-                "new_date": new_date.isoformat(),
-                "expired_items": expired_items
-            }
+            current_date = get_current_date(conn)
+            new_date = current_date + timedelta(days=request.days)
+            set_current_date(new_date, conn)
+            print(f"Updated current_date to: {new_date}")
         finally:
             conn.close()
+
+        # Mark everything that expired by the new date as waste
+        expired_items = sweep_expired_items(new_date)
+        
+        print(f"Found {len(expired_items)} expired items")
+        return {
+            "new_date": new_date.isoformat(),
+            "expired_items": expired_items
+        }
     except Exception as e:
         print(f"Error in fast-forward endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fast forward time: {str(e)}")
 
 @app.post("/api/set-date")
-async def set_date(request: SetDateRequest):
+def set_date(request: SetDateRequest):
     try:
         print(f"DEBUG: Attempting to set date to {request.date}")
         conn = get_db()
@@ -1149,19 +1697,13 @@ async def set_date(request: SetDateRequest):
                         rotation = NULL,
                         usage_count = 0
                 """)
-                
-                cursor.execute("""
-                    INSERT INTO logs (action, details)
-                    VALUES (?, ?)
-                """, ('reset-items', 'Reset all items to original state due to date reset to 2025-04-06'))
+                cursor.execute("UPDATE containers SET current_load = 0")
             
-            conn.commit()
+            commit_changes(conn, "system_settings", "items", "containers")
             print(f"DEBUG: Successfully set date to {new_date}")
-            
-            return {
-                "message": "Date set successfully",
-                "new_date": new_date.isoformat()
-            }
+
+            if request.date == '2025-04-06':
+                reinitialize_optimizer(conn)
             
         except Exception as e:
             print(f"DEBUG: Database error: {str(e)}")
@@ -1169,6 +1711,19 @@ async def set_date(request: SetDateRequest):
             raise
         finally:
             conn.close()
+
+        if request.date == '2025-04-06':
+            log_writer.log('reset-items', details='Reset all items to original state due to date reset to 2025-04-06')
+            expired_items = []
+        else:
+            # Anything that expired by the new date becomes waste
+            expired_items = sweep_expired_items(new_date)
+        
+        return {
+            "message": "Date set successfully",
+            "new_date": new_date.isoformat(),
+            "expired_items": expired_items
+        }
             
     except HTTPException as he:
         print(f"DEBUG: HTTP Exception: {str(he)}")
@@ -1177,124 +1732,223 @@ async def set_date(request: SetDateRequest):
         print(f"DEBUG: Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to set date: {str(e)}")
 
+class ImportSummary:
+    """Progress and rejected rows of a streaming CSV import"""
+
+    def __init__(self):
+        self.rows_processed = 0
+        self.rows_inserted = 0
+        self.rows_skipped = 0
+        self.batches = 0
+        self.rejected = 0
+        self.rejects: List[dict] = []
+
+    def reject(self, row_number: int, row_id: Optional[str], reason: str):
+        self.rejected += 1
+        if len(self.rejects) < IMPORT_MAX_REJECTS:
+            self.rejects.append({"row": row_number, "id": row_id, "reason": reason})
+
+    def to_dict(self) -> dict:
+        return {
+            "rows_processed": self.rows_processed,
+            "rows_inserted": self.rows_inserted,
+            "rows_skipped": self.rows_skipped,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "rejects": self.rejects
+        }
+
+def read_csv_upload(file: UploadFile) -> csv.DictReader:
+    """Parse an uploaded CSV incrementally from its spooled file"""
+    file.file.seek(0)
+    return csv.DictReader(codecs.iterdecode(file.file, 'utf-8'))
+
+def insert_batch(cursor, insert_sql: str, batch: List[Tuple[int, str, tuple]],
+                 summary: ImportSummary):
+    """Insert one batch with executemany.
+
+    The batch runs under a savepoint. If any row violates a constraint the
+    savepoint is rolled back and the batch is retried row by row, so only
+    the offending rows are rejected.
+    """
+    cursor.execute("SAVEPOINT import_batch")
+    try:
+        cursor.executemany(insert_sql, [values for _, _, values in batch])
+        summary.rows_inserted += len(batch)
+    except sqlite3.Error:
+        cursor.execute("ROLLBACK TO import_batch")
+        for row_number, row_id, values in batch:
+            try:
+                cursor.execute(insert_sql, values)
+                summary.rows_inserted += 1
+            except sqlite3.Error as e:
+                summary.reject(row_number, row_id, str(e))
+    cursor.execute("RELEASE import_batch")
+    summary.batches += 1
+
+def import_csv_rows(cursor, reader: csv.DictReader, insert_sql: str, parse_row,
+                    id_field: str, batch_size: int = IMPORT_BATCH_SIZE) -> ImportSummary:
+    """Stream CSV rows into the database in executemany batches.
+
+    `parse_row` turns a CSV row into the insert parameters. It returns None
+    for rows that should be skipped and raises KeyError or ValueError for
+    rows that are rejected.
+    """
+    summary = ImportSummary()
+    batch = []
+    # Row 1 is the header
+    for row_number, row in enumerate(reader, start=2):
+        summary.rows_processed += 1
+        try:
+            values = parse_row(row)
+        except (KeyError, TypeError, ValueError) as e:
+            summary.reject(row_number, row.get(id_field), f"Invalid row: {e}")
+            continue
+        if values is None:
+            summary.rows_skipped += 1
+            continue
+
+        batch.append((row_number, row.get(id_field), values))
+        if len(batch) >= batch_size:
+            insert_batch(cursor, insert_sql, batch, summary)
+            batch = []
+            print(f"DEBUG: Imported {summary.rows_inserted} of {summary.rows_processed} rows so far")
+
+    if batch:
+        insert_batch(cursor, insert_sql, batch, summary)
+    return summary
+
+def parse_container_row(row: dict) -> Optional[tuple]:
+    # Waste containers are preserved, not imported
+    if row['zone'] == 'Waste_Storage':
+        return None
+    return (
+        row['zone'],
+        row['container_id'],
+        float(row['width_cm']),
+        float(row['depth_cm']),
+        float(row['height_cm'])
+    )
+
+def parse_allowed_rotations(value: Optional[str]) -> Optional[int]:
+    """Bit mask of the rotations listed in a CSV cell, e.g. "0 1".
+
+    An empty or missing cell allows every rotation.
+    """
+    if not value or not value.strip():
+        return None
+    mask = 0
+    for rotation in value.split():
+        rotation = int(rotation)
+        if not 0 <= rotation < len(ROTATIONS):
+            raise ValueError(f"Unknown rotation {rotation}")
+        mask |= 1 << rotation
+    return mask
+
+def parse_item_row(row: dict) -> tuple:
+    expiry_date = row['expiry_date']
+    # Handle N/A expiry dates
+    if expiry_date == 'N/A':
+        expiry_date = None
+    else:
+        # fromisoformat is a lot faster than strptime on large manifests
+        expiry_date = date.fromisoformat(expiry_date).isoformat()
+    return (
+        row['item_id'],  # Use item_id as the primary key
+        row['name'],
+        float(row['width_cm']),
+        float(row['height_cm']),
+        float(row['depth_cm']),
+        float(row['mass_kg']),
+        int(row['priority']),
+        expiry_date,
+        int(row['usage_limit']),
+        row['preferred_zone'],
+        parse_allowed_rotations(row.get('allowed_rotations'))
+    )
+
 @app.post("/api/import/containers")
-async def import_containers(file: UploadFile = File(...)):
+def import_containers(file: UploadFile = File(...), batch_size: int = IMPORT_BATCH_SIZE):
+    conn = None
     try:
         print("DEBUG: Starting container import process")
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="File must be a CSV")
-            
-        # Read CSV file
-        print("DEBUG: Reading CSV file")
-        contents = await file.read()
-        csv_data = contents.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(csv_data))
-        
-        # Process each row
-        containers_added = 0
+        if batch_size < 1:
+            raise HTTPException(status_code=400, detail="batch_size must be at least 1")
+
+        csv_reader = read_csv_upload(file)
         conn = get_db()
         cursor = conn.cursor()
         
         try:
+            # The table is replaced, it is journaled as a whole below
+            # instead of row by row
+            pause_journal(conn, "containers")
+
             # Clear existing containers except waste containers
             print("DEBUG: Clearing existing containers (preserving waste containers)")
             cursor.execute("DELETE FROM containers WHERE zone != 'Waste_Storage'")
             
-            print("DEBUG: Starting to process CSV rows")
-            for row in csv_reader:
-                try:
-                    print(f"DEBUG: Processing row: {row}")
-                    # Skip if this is a waste container (preserve existing ones)
-                    if row['zone'] == 'Waste_Storage':
-                        print(f"DEBUG: Skipping waste container {row['container_id']}")
-                        continue
-
-                    # Validate required fields
-                    required_fields = ['zone', 'container_id', 'width_cm', 'depth_cm', 'height_cm']
-                    if not all(field in row for field in required_fields):
-                        missing_fields = [field for field in required_fields if field not in row]
-                        print(f"DEBUG: Missing required fields: {', '.join(missing_fields)}")
-                        print(f"DEBUG: Available fields: {list(row.keys())}")
-                        continue
-                        
-                    # Convert numeric fields
-                    try:
-                        width = float(row['width_cm'])
-                        depth = float(row['depth_cm'])
-                        height = float(row['height_cm'])
-                    except ValueError as ve:
-                        print(f"DEBUG: Error converting dimensions: {ve}")
-                        print(f"DEBUG: width_cm={row['width_cm']}, depth_cm={row['depth_cm']}, height_cm={row['height_cm']}")
-                        continue
-                    
-                    print(f"DEBUG: Importing container - ID: {row['container_id']}, Zone: {row['zone']}")
-                    print(f"DEBUG: Dimensions - Width: {width}, Depth: {depth}, Height: {height}")
-                    
-                    # Add container to database
-                    try:
-                        cursor.execute('''
-                            INSERT INTO containers (zone, container_id, width_cm, depth_cm, height_cm, current_load)
-                            VALUES (?, ?, ?, ?, ?, 0)
-                        ''', (row['zone'], row['container_id'], width, depth, height))
-                        containers_added += 1
-                        print(f"DEBUG: Successfully added container {row['container_id']}")
-                    except sqlite3.Error as sqle:
-                        print(f"DEBUG: Database error while inserting container: {sqle}")
-                        continue
-                    
-                except Exception as row_error:
-                    print(f"DEBUG: Error processing container row: {row_error}")
-                    print(f"DEBUG: Row data: {row}")
-                    continue
+            summary = import_csv_rows(cursor, csv_reader, '''
+                INSERT INTO containers (zone, container_id, width_cm, depth_cm, height_cm, current_load)
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', parse_container_row, 'container_id', batch_size)
+            journal_table_replaced(conn, "containers")
                     
-            conn.commit()
-            print(f"DEBUG: Successfully imported {containers_added} containers")
+            commit_changes(conn, "containers")
+            containers_added = summary.rows_inserted
+            print(f"DEBUG: Successfully imported {containers_added} containers, rejected {summary.rejected} rows")
             
             # Reinitialize the optimization system to include new containers
             print("DEBUG: Reinitializing optimization system")
-            reinitialize_optimizer()
+            reinitialize_optimizer(conn)
             
             return {
                 "message": f"Successfully imported {containers_added} containers",
-                "containers_added": containers_added
+                "containers_added": containers_added,
+                **summary.to_dict()
             }
             
         except Exception as process_error:
             print(f"DEBUG: Error during container processing: {process_error}")
+            conn.rollback()
             raise
-        finally:
-            conn.close()
             
+    except HTTPException as he:
+        raise he
     except Exception as e:
         print(f"DEBUG: Error in import_containers: {str(e)}")
         print(f"DEBUG: Error type: {type(e)}")
         import traceback
         print(f"DEBUG: Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn:
+            conn.close()
 
 @app.post("/api/import/items")
-async def import_items(file: UploadFile = File(...)):
+def import_items(file: UploadFile = File(...), batch_size: int = IMPORT_BATCH_SIZE):
     conn = None
     try:
         print("DEBUG: Starting items import process")
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="File must be a CSV")
-            
-        # Read CSV file
-        print("DEBUG: Reading CSV file")
-        contents = await file.read()
-        csv_data = contents.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(csv_data))
-        
-        # Process all rows
-        items_added = 0
+        if batch_size < 1:
+            raise HTTPException(status_code=400, detail="batch_size must be at least 1")
+
+        csv_reader = read_csv_upload(file)
         conn = get_db()
         cursor = conn.cursor()
         
         try:
+            # The items are replaced, they are journaled as a whole below
+            pause_journal(conn, "items")
+
             # First, clear existing items
             print("DEBUG: Clearing existing items")
             cursor.execute("DELETE FROM items")
+            cursor.execute("UPDATE containers SET current_load = 0")
             
             # Prepare the insert statement
             insert_sql = '''
@@ -1309,60 +1963,30 @@ async def import_items(file: UploadFile = File(...)):
                     expiry_date,
                     usage_limit,
                     preferred_zone,
+                    allowed_rotations,
                     status,
                     usage_count
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'available', 0)
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'available', 0)
             '''
             
             print("DEBUG: Starting to process items")
-            for row in csv_reader:
-                try:
-                    # Map CSV columns to database fields using exact column names from CSV
-                    item_id = row['item_id']
-                    name = row['name']
-                    width = float(row['width_cm'])
-                    height = float(row['height_cm'])
-                    depth = float(row['depth_cm'])
-                    mass = float(row['mass_kg'])
-                    priority = int(row['priority'])
-                    expiry_date = row['expiry_date']
-                    usage_limit = int(row['usage_limit'])
-                    preferred_zone = row['preferred_zone']
-                    
-                    # Handle N/A expiry dates
-                    if expiry_date == 'N/A':
-                        expiry_date = None
-                    else:
-                        # Parse expiry date
-                        expiry_date = datetime.strptime(expiry_date, '%Y-%m-%d').date()
-                    
-                    # Insert item into database
-                    cursor.execute(insert_sql, (
-                        item_id,  # Use item_id as the primary key
-                        name,
-                        width,
-                        height,
-                        depth,
-                        mass,
-                        priority,
-                        expiry_date,
-                        usage_limit,
-                        preferred_zone
-                    ))
-                    items_added += 1
-                    
-                    if items_added % 100 == 0:
-                        print(f"DEBUG: Imported {items_added} items so far")
-                    
-                except Exception as e:
-                    print(f"DEBUG: Error processing item {row.get('item_id', 'unknown')}: {str(e)}")
-                    continue
+            summary = import_csv_rows(cursor, csv_reader, insert_sql, parse_item_row,
+                                      'item_id', batch_size)
+            journal_table_replaced(conn, "items")
             
             # Commit all changes at once
-            conn.commit()
-            print(f"DEBUG: Successfully imported {items_added} items")
+            commit_changes(conn, "items", "containers")
+            items_added = summary.rows_inserted
+            print(f"DEBUG: Successfully imported {items_added} items, rejected {summary.rejected} rows")
+
+            # Load the new inventory into the space optimizer
+            reinitialize_optimizer(conn)
             
-            return {"message": f"Successfully imported {items_added} items"}
+            return {
+                "message": f"Successfully imported {items_added} items",
+                "items_added": items_added,
+                **summary.to_dict()
+            }
             
         except Exception as e:
             if conn:
@@ -1378,41 +2002,51 @@ async def import_items(file: UploadFile = File(...)):
         if conn:
             conn.close()
 
+def build_status_layout(container: Container3D) -> dict:
+    """A container's entry in /api/optimizer/status"""
+    return {
+        "container_id": container.container_id,
+        "dimensions": {
+            "width": container.dimensions.width,
+            "depth": container.dimensions.depth,
+            "height": container.dimensions.height
+        },
+        "items_count": len(container.items),
+        "items": [
+            {
+                "item_id": item.item_id,
+                "position": {
+                    "x": item.position.x,
+                    "y": item.position.y,
+                    "z": item.position.z
+                },
+                "rotation": item.rotation
+            }
+            for item in container.items.values()
+        ]
+    }
+
 @app.get("/api/optimizer/status")
-async def get_optimizer_status():
+def get_optimizer_status():
     """Get the current status of the space optimizer"""
     try:
-        # Count items and containers
-        container_info = []
-        for container_id, container in space_optimizer.containers.items():
-            container_info.append({
-                "container_id": container_id,
-                "dimensions": {
-                    "width": container.dimensions.width,
-                    "depth": container.dimensions.depth,
-                    "height": container.dimensions.height
-                },
-                "items_count": len(container.items),
-                "items": [
-                    {
-                        "item_id": item.item_id,
-                        "position": {
-                            "x": item.position.x,
-                            "y": item.position.y,
-                            "z": item.position.z
-                        },
-                        "rotation": item.rotation
-                    }
-                    for item in container.items
-                ]
-            })
+        with space_optimizer.lock:
+            # Count items and containers
+            # Only containers that changed since the last call are rebuilt
+            container_info = [
+                space_optimizer.layouts.get(container, "status", build_status_layout)
+                for container in space_optimizer.containers.values()
+            ]
 
-        return {
-            "status": "active" if space_optimizer.containers else "not_initialized",
-            "containers_count": len(space_optimizer.containers),
-            "items_count": len(space_optimizer.items),
-            "containers": container_info
-        }
+            return {
+                "status": "active" if space_optimizer.containers else "not_initialized",
+                "containers_count": len(space_optimizer.containers),
+                "items_count": len(space_optimizer.items),
+                "placed_items_count": sum(len(c.items) for c in space_optimizer.containers.values()),
+                "cold_start_seconds": startup_stats.get("cold_start_seconds"),
+                "warmed_from": startup_stats.get("warmed_from"),
+                "containers": container_info
+            }
     except Exception as e:
         print(f"ERROR: Failed to get optimizer status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
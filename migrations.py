@@ -0,0 +1,363 @@
+import sqlite3
+import sys
+from typing import Callable, List, Tuple
+
+import queries
+
+# Each migration moves the schema one version forward. The version a
+# database is at is kept in SQLite's user_version pragma, so startup only
+# runs the steps it has not seen yet instead of recreating the tables.
+
+def create_base_schema(cursor):
+    """Version 1, the tables the API has always used"""
+    # Create containers table with schema matching CSV
+    cursor.execute('''CREATE TABLE IF NOT EXISTS containers (
+        zone TEXT,
+        container_id TEXT PRIMARY KEY,
+        width_cm REAL,
+        depth_cm REAL,
+        height_cm REAL,
+        current_load REAL DEFAULT 0,
+        name TEXT
+    )''')
+
+    # Create items table with all required columns
+    cursor.execute('''CREATE TABLE IF NOT EXISTS items (
+        id TEXT PRIMARY KEY,
+        item_id TEXT UNIQUE,
+        name TEXT,
+        width REAL,
+        height REAL,
+        depth REAL,
+        weight REAL,
+        container_id TEXT,
+        x REAL,
+        y REAL,
+        z REAL,
+        rotation INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'available',
+        usage_count INTEGER DEFAULT 0,
+        usage_limit INTEGER,
+        priority INTEGER,
+        expiry_date TEXT,
+        preferred_zone TEXT,
+        FOREIGN KEY (container_id) REFERENCES containers (container_id)
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS system_settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+        action TEXT,
+        item_id TEXT,
+        container_id TEXT,
+        details TEXT
+    )''')
+
+def create_hot_query_indexes(cursor):
+    """Version 2, indexes for the predicates the API filters and sorts on"""
+    # Items in a container, optionally by status
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_items_container_status
+        ON items (container_id, status)''')
+    # Waste listing only ever looks at a small slice of the table
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_items_waste
+        ON items (id) WHERE status = 'waste'""")
+    # Expiry lookups skip items that are already waste
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_items_expiry
+        ON items (expiry_date) WHERE status != 'waste'""")
+    # Logs are read newest first
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_logs_timestamp
+        ON logs (timestamp)''')
+
+def track_state_version(cursor):
+    """Version 3, a counter bumped by every change to items or containers"""
+    # Lets a saved optimizer snapshot tell whether the database has changed
+    # since it was written, whoever made the change
+    cursor.execute("INSERT OR IGNORE INTO system_settings (key, value) VALUES ('state_version', '0')")
+    for table in ("items", "containers"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_state_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE system_settings
+                    SET value = CAST(value AS INTEGER) + 1
+                    WHERE key = 'state_version';
+                END""")
+
+def add_allowed_rotations(cursor):
+    """Version 4, the orientations each item may be placed in"""
+    # Bit mask over space_optimizer.ROTATIONS, NULL allows all six
+    cursor.execute("ALTER TABLE items ADD COLUMN allowed_rotations INTEGER")
+
+def create_log_filter_indexes(cursor):
+    """Version 5, indexes for paging through logs filtered by action, item or container"""
+    # Pages are read newest first by id, each filter walks its own index
+    # in that order instead of scanning the whole table
+    for column in ("action", "item_id", "container_id"):
+        cursor.execute(f"""CREATE INDEX IF NOT EXISTS idx_logs_{column}
+            ON logs ({column}, id)""")
+
+# Tables whose changes are journaled, with the column identifying a row
+JOURNALED_TABLES = (("items", "id"), ("containers", "container_id"), ("logs", "id"))
+
+# system_settings key, followed by a table name, set while a bulk write
+# replaces the table, see pause_journal
+JOURNAL_PAUSED_KEY = "journal_paused:"
+
+# row_key of the single journal entry standing for a whole table
+WHOLE_TABLE = "*"
+
+def create_change_journal(cursor):
+    """Version 6, a journal of the rows changed in items, containers and logs"""
+    # One entry per row, replaced with a new seq on every change, so the
+    # journal stays as large as the tables and any older seq still finds
+    # every row changed after it. Deleted items and containers keep an
+    # entry flagged as deleted.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS change_journal (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_key TEXT NOT NULL,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (table_name, row_key)
+    )""")
+    for table, key in JOURNALED_TABLES:
+        # Rows that exist already count as changed once
+        cursor.execute(f"""INSERT OR IGNORE INTO change_journal (table_name, row_key)
+            SELECT '{table}', {key} FROM {table} ORDER BY rowid""")
+    create_journal_triggers(cursor)
+
+def create_journal_triggers(cursor):
+    """Triggers writing the change journal, unless it is paused for the table"""
+    for table, key in JOURNALED_TABLES:
+        # row_key is TEXT, log ids are integers: compared uncast the
+        # UNIQUE index cannot be used and every change scans the journal
+        events = [("INSERT", f"CAST(NEW.{key} AS TEXT)", 0)]
+        if table != "logs":
+            events += [("UPDATE", f"CAST(NEW.{key} AS TEXT)", 0), ("DELETE", f"CAST(OLD.{key} AS TEXT)", 1)]
+        for event, row_key, deleted in events:
+            cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_journal
+                AFTER {event} ON {table}
+                WHEN NOT EXISTS (SELECT 1 FROM system_settings WHERE key = '{JOURNAL_PAUSED_KEY}{table}')
+                BEGIN
+                    INSERT OR REPLACE INTO change_journal (table_name, row_key, deleted)
+                    VALUES ('{table}', {row_key}, {deleted});
+                END""")
+    # Logs are only ever deleted by clearing or archiving them, which
+    # clients do not need to replay
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS logs_delete_journal
+        AFTER DELETE ON logs
+        BEGIN
+            DELETE FROM change_journal WHERE table_name = 'logs' AND row_key = CAST(OLD.id AS TEXT);
+        END""")
+
+def recreate_journal_triggers(cursor):
+    """Version 7, journal triggers that look entries up through the index"""
+    # The version 6 triggers compared row_key with the integer log id
+    for table, _ in JOURNALED_TABLES:
+        for event in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table}_{event}_journal")
+    create_journal_triggers(cursor)
+
+def add_journal_epoch(cursor):
+    """Version 8, an id of the change journal that is new whenever the journal is"""
+    # Journal seqs start over from 1 when reset_database drops the journal.
+    # A client holding a seq of the old journal tells by the epoch it was
+    # handed with it, not by comparing seqs.
+    cursor.execute("""INSERT OR IGNORE INTO system_settings (key, value)
+        VALUES ('journal_epoch', lower(hex(randomblob(8))))""")
+
+def drop_state_version_triggers(cursor):
+    """Version 9, state_version bumped once per write transaction instead of per row"""
+    # The version 3 triggers ran an extra UPDATE for every row a statement
+    # touched, which made bulk imports and clearing the items table several
+    # times slower. Writers call bump_state_version before committing.
+    for table in ("items", "containers"):
+        for event in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table}_{event}_state_version")
+
+def create_pausable_journal_triggers(cursor):
+    """Version 10, journal triggers a bulk write can pause"""
+    # Replacing the items with an import journaled every deleted and
+    # inserted row, most of the time the import took
+    for table, _ in JOURNALED_TABLES:
+        for event in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table}_{event}_journal")
+    create_journal_triggers(cursor)
+
+def normalize_log_timestamps(cursor):
+    """Version 11, every log timestamp in 'YYYY-MM-DD HH:MM:SS' form"""
+    # The API wrote ISO timestamps, 'YYYY-MM-DDTHH:MM:SS', next to rows
+    # with SQLite's default. Range filters had to wrap the column to
+    # compare both, which kept them off idx_logs_timestamp.
+    cursor.execute("UPDATE logs SET timestamp = replace(timestamp, 'T', ' ') WHERE instr(timestamp, 'T') > 0")
+
+def create_item_filter_indexes(cursor):
+    """Version 12, indexes for the status and zone filters of /api/items"""
+    # A page of one status walks its slice in id order instead of every item
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_items_status
+        ON items (status, id)""")
+    # The zone filter looks up the zone's containers, /api/containers pages
+    # through them in id order
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_containers_zone
+        ON containers (zone, container_id)""")
+    # Waste is one status among the others now, and expiry is tracked in
+    # memory, no query reads these any more
+    cursor.execute("DROP INDEX IF EXISTS idx_items_waste")
+    cursor.execute("DROP INDEX IF EXISTS idx_items_expiry")
+
+MIGRATIONS: List[Tuple[int, Callable]] = [
+    (1, create_base_schema),
+    (2, create_hot_query_indexes),
+    (3, track_state_version),
+    (4, add_allowed_rotations),
+    (5, create_log_filter_indexes),
+    (6, create_change_journal),
+    (7, recreate_journal_triggers),
+    (8, add_journal_epoch),
+    (9, drop_state_version_triggers),
+    (10, create_pausable_journal_triggers),
+    (11, normalize_log_timestamps),
+    (12, create_item_filter_indexes),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Queries on the hot paths of the API, none of them may need a full scan
+HOT_QUERIES: List[Tuple[str, tuple]] = [
+    (queries.ITEM_BY_ID, ('1',)),
+    (queries.ITEM_BY_ITEM_ID_OR_ID, ('1', '1')),
+    (queries.CONTAINER_BY_ID, ('c',)),
+    (queries.WASTE_ITEMS, ()),
+    # Pages of /api/items and /api/containers as list_rows builds them
+    (queries.page_query("items", "id", ("id",), [queries.items_with_status(1)], 50, after_cursor=True),
+     ('placed', '1')),
+    (queries.page_query("items", "id", ("id",), [queries.items_with_status(2)], 50), ('placed', 'waste')),
+    (queries.page_query("items", "id", ("id",), [queries.ITEMS_IN_CONTAINER], 50), ('c',)),
+    (queries.page_query("items", "id", ("id",), [queries.ITEMS_IN_ZONE], 50), ('z',)),
+    (queries.page_query("containers", "container_id", ("container_id",), [queries.CONTAINERS_IN_ZONE], 50,
+                        after_cursor=True), ('z', 'c')),
+    (queries.JOURNAL_PAGE, (0, 1001)),
+    # Lookup of the journal triggers, e.g. when a log row is deleted
+    ("DELETE FROM change_journal WHERE table_name = 'logs' AND row_key = CAST(? AS TEXT)", (1,)),
+    # Whole-table entries of the imports, see journal_table_replaced
+    (queries.JOURNAL_LAST_REPLACED, ('*',)),
+    (queries.JOURNAL_CLEAR_TABLE, ('items',)),
+    # Pages of /api/logs as get_logs builds them, the range on idx_logs_timestamp
+    (queries.logs_page_query([queries.LOGS_BEFORE_CURSOR]), (100, 51)),
+    *((queries.logs_page_query([queries.log_filter(column), queries.LOGS_BEFORE_CURSOR]), ('x', 100, 51))
+      for column in queries.LOG_FILTER_COLUMNS),
+    (queries.logs_page_query([queries.LOGS_FROM, queries.LOGS_UNTIL]), ('2025-04-06', '2025-04-07', 51)),
+]
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def get_state_version(conn) -> int:
+    """Current value of the items/containers change counter"""
+    row = conn.execute("SELECT value FROM system_settings WHERE key = 'state_version'").fetchone()
+    return int(row[0]) if row is not None else 0
+
+def bump_state_version(conn):
+    """Count a change to items or containers.
+
+    Called once by every transaction writing either table, before it
+    commits, so the bump is part of the same transaction.
+    """
+    conn.execute("""UPDATE system_settings SET value = CAST(value AS INTEGER) + 1
+        WHERE key = 'state_version'""")
+
+def pause_journal(conn, table: str):
+    """Stop journaling the rows of `table` for the rest of the transaction.
+
+    For writes that replace the whole table, e.g. an import. Only the
+    transaction setting it sees the flag, journal_table_replaced ends
+    the pause before the transaction commits.
+    """
+    conn.execute("INSERT OR REPLACE INTO system_settings (key, value) VALUES (?, '1')",
+                 (JOURNAL_PAUSED_KEY + table,))
+
+def journal_table_replaced(conn, table: str):
+    """Journal a paused bulk write as one entry for the whole table.
+
+    The table's row entries are dropped, a client older than the new
+    entry has to load the table again anyway.
+    """
+    conn.execute(queries.JOURNAL_CLEAR_TABLE, (table,))
+    conn.execute("INSERT INTO change_journal (table_name, row_key) VALUES (?, ?)", (table, WHOLE_TABLE))
+    conn.execute("DELETE FROM system_settings WHERE key = ?", (JOURNAL_PAUSED_KEY + table,))
+
+def get_journal_epoch(conn) -> str:
+    """Id of the current change journal, see add_journal_epoch"""
+    row = conn.execute("SELECT value FROM system_settings WHERE key = 'journal_epoch'").fetchone()
+    return row[0] if row is not None else ""
+
+def migrate(conn) -> int:
+    """Bring the database up to SCHEMA_VERSION, returning the version it had"""
+    version = get_schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {version} is newer than this code ({SCHEMA_VERSION})")
+
+    cursor = conn.cursor()
+    for target, step in MIGRATIONS:
+        if target <= version:
+            continue
+        print(f"DEBUG: Migrating database schema to version {target}: {step.__doc__}")
+        try:
+            step(cursor)
+            # Pragmas do not take parameters
+            cursor.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return version
+
+def reset_database(conn):
+    """Drop every table and rebuild the schema from scratch.
+
+    Only used for an explicit reset, normal startups call migrate() and
+    keep the existing data. Migrating the empty database generates a new
+    journal epoch, so clients of the dropped journal are told to reload.
+    """
+    cursor = conn.cursor()
+    try:
+        for table in ("items", "containers", "system_settings", "logs", "change_journal"):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute("PRAGMA user_version = 0")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    migrate(conn)
+
+def find_full_scans(conn) -> List[Tuple[str, str]]:
+    """Run EXPLAIN QUERY PLAN on every hot query.
+
+    Returns (query, plan step) for each query that falls back to scanning
+    a whole table instead of using an index.
+    """
+    full_scans = []
+    for query, params in HOT_QUERIES:
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params):
+            detail = row[3]
+            if detail.startswith("SCAN") and " USING " not in detail:
+                full_scans.append((query, detail))
+    return full_scans
+
+if __name__ == "__main__":
+    # Migrate a database and check its query plans, e.g. in CI:
+    #   python migrations.py iss_cargo.db
+    conn = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else "iss_cargo.db")
+    try:
+        previous = migrate(conn)
+        print(f"Schema version {previous} -> {get_schema_version(conn)}")
+        full_scans = find_full_scans(conn)
+        for query, detail in full_scans:
+            print(f"Full table scan: {query}\n    {detail}")
+        sys.exit(1 if full_scans else 0)
+    finally:
+        conn.close()
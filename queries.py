@@ -0,0 +1,72 @@
+"""SQL of the API's hot queries.
+
+main.py builds its queries from these strings and migrations.HOT_QUERIES
+checks the query plans of the same text, so a filter changed here is
+checked the way it runs.
+"""
+from typing import List, Optional, Sequence
+
+ITEM_BY_ID = "SELECT * FROM items WHERE id = ?"
+# Items are looked up by either id when retrieving or moving them
+ITEM_BY_ITEM_ID_OR_ID = "SELECT * FROM items WHERE item_id = ? OR id = ?"
+CONTAINER_BY_ID = "SELECT * FROM containers WHERE container_id = ?"
+WASTE_ITEMS = "SELECT * FROM items WHERE status = 'waste'"
+
+JOURNAL_PAGE = """
+    SELECT seq, table_name, row_key, deleted FROM change_journal
+    WHERE seq > ? ORDER BY seq LIMIT ?
+"""
+# Latest whole-table entry of an import, see migrations.journal_table_replaced
+JOURNAL_LAST_REPLACED = """
+    SELECT MAX(seq) FROM change_journal
+    WHERE table_name IN ('items', 'containers', 'logs') AND row_key = ?
+"""
+# Drops a table's entries when an import journals it as one
+JOURNAL_CLEAR_TABLE = "DELETE FROM change_journal WHERE table_name = ?"
+
+# Filters of /api/items
+ITEMS_IN_CONTAINER = "container_id = ?"
+ITEMS_IN_ZONE = "container_id IN (SELECT container_id FROM containers WHERE zone = ?)"
+ITEMS_PRIORITY_MIN = "priority >= ?"
+ITEMS_PRIORITY_MAX = "priority <= ?"
+ITEMS_EXPIRING_BEFORE = "expiry_date < ?"
+
+# Filter of /api/containers
+CONTAINERS_IN_ZONE = "zone = ?"
+
+# Filters of /api/logs. Timestamps are all stored in log_writer's
+# log_timestamp format, the bounds compare the bare column.
+LOGS_BEFORE_CURSOR = "id < ?"
+LOGS_FROM = "timestamp >= ?"
+LOGS_UNTIL = "timestamp < ?"
+LOG_FILTER_COLUMNS = ("action", "item_id", "container_id")
+
+def items_with_status(count: int) -> str:
+    """Filter on `count` statuses, one parameter each"""
+    return f"status IN ({', '.join('?' * count)})"
+
+def log_filter(column: str) -> str:
+    """Filter on one of LOG_FILTER_COLUMNS"""
+    return f"{column} = ?"
+
+def where(conditions: Sequence[str], joiner: str = " AND ") -> str:
+    return f"WHERE {joiner.join(conditions)}" if conditions else ""
+
+def page_query(table: str, key: str, columns: Sequence[str], conditions: List[str],
+               limit: Optional[int], after_cursor: bool = False) -> str:
+    """One page of `table` ordered by `key`, each row as (key, JSON object).
+
+    With `after_cursor` the page starts after a key passed as the last
+    parameter. One more row than `limit` is read to tell whether another
+    page follows.
+    """
+    if after_cursor:
+        conditions = conditions + [f"{key} > ?"]
+    page = f"LIMIT {int(limit) + 1}" if limit is not None else ""
+    # Column names come from the schema, never from the request
+    row_json = ", ".join(f"'{column}', {column}" for column in columns)
+    return f"SELECT {key}, json_object({row_json}) FROM {table} {where(conditions)} ORDER BY {key} {page}"
+
+def logs_page_query(conditions: List[str]) -> str:
+    """Logs newest first, the page size is the last parameter"""
+    return f"SELECT * FROM logs {where(conditions)} ORDER BY id DESC LIMIT ?"
@@ -0,0 +1,108 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from space_optimizer import Container3D, MIN_Z
+
+# Items come out through the open face of a container (z = 0). An item is
+# blocked by every item that overlaps the path it slides along on the way
+# out, and those items may in turn be blocked by others closer to the face.
+
+class BlockingGraph:
+    """Blocking DAG of one container at a given container version.
+
+    Edges point from an item to the items directly between it and the open
+    face. A blocker always starts closer to the face than the item it
+    blocks, so the graph has no cycles. Edges are found with the container's
+    spatial index the first time an item is asked about and kept until the
+    container changes.
+    """
+
+    def __init__(self, container: Container3D):
+        self.container = container
+        self.version = container.version
+        self._direct: Dict[str, List[str]] = {}
+        self._closure: Dict[str, List[str]] = {}
+
+    def is_current(self, container: Container3D) -> bool:
+        return self.container is container and self.version == container.version
+
+    def direct_blockers(self, item_id: str) -> List[str]:
+        """Items overlapping the path of `item_id` out of the open face"""
+        blockers = self._direct.get(item_id)
+        if blockers is None:
+            blockers = self.container.blockers_of(item_id)
+            self._direct[item_id] = blockers
+        return blockers
+
+    def removal_order(self, item_id: str) -> List[str]:
+        """Every item that has to be moved before `item_id` can come out.
+
+        This is the transitive closure of the blockers, nothing outside it
+        has to move, ordered so each item is free when its turn comes: the
+        closest to the open face first.
+        """
+        order = self._closure.get(item_id)
+        if order is not None:
+            return order
+
+        seen = set()
+        stack = list(self.direct_blockers(item_id))
+        while stack:
+            other_id = stack.pop()
+            if other_id in seen:
+                continue
+            seen.add(other_id)
+            stack.extend(self.direct_blockers(other_id))
+
+        # Every blocker starts strictly closer to the face than what it
+        # blocks, so sorting by depth is a valid topological order
+        store = self.container.items
+        data = store.data
+        offsets = store.offsets
+        order = sorted(seen, key=lambda other_id: (data[offsets[other_id] + MIN_Z], other_id))
+        self._closure[item_id] = order
+        return order
+
+@dataclass
+class RetrievalPlan:
+    item_id: str
+    container_id: str
+    # Items to take out, in order, before the target is free
+    removals: List[str] = field(default_factory=list)
+
+    @property
+    def retrieval_steps(self) -> int:
+        """Number of items the crew has to move besides the target"""
+        return len(self.removals)
+
+    def steps(self) -> List[Tuple[str, str]]:
+        """(action, item_id) pairs: remove the blockers, retrieve the target
+        and put the blockers back in reverse order"""
+        return ([("remove", other_id) for other_id in self.removals] +
+                [("retrieve", self.item_id)] +
+                [("place_back", other_id) for other_id in reversed(self.removals)])
+
+class RetrievalPlanner:
+    """Computes retrieval plans, keeping one blocking graph per container.
+
+    Callers must hold the optimizer lock, the graphs read the containers'
+    placement arrays directly.
+    """
+
+    def __init__(self):
+        self._graphs: Dict[str, BlockingGraph] = {}
+
+    def graph(self, container: Container3D) -> BlockingGraph:
+        """The container's blocking graph, rebuilt only after it changed"""
+        graph = self._graphs.get(container.container_id)
+        if graph is None or not graph.is_current(container):
+            graph = BlockingGraph(container)
+            self._graphs[container.container_id] = graph
+        return graph
+
+    def plan(self, container: Container3D, item_id: str) -> RetrievalPlan:
+        return RetrievalPlan(
+            item_id=item_id,
+            container_id=container.container_id,
+            removals=list(self.graph(container).removal_order(item_id))
+        )
@@ -1,9 +1,47 @@
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from datetime import datetime
+from collections import defaultdict
+import gc
+import heapq
+import math
+import mmap
+import os
+import pickle
 import sqlite3
+import struct
+import sys
+import threading
+from array import array
 from dataclasses import dataclass
+from itertools import product
+from operator import itemgetter, sub
 
-@dataclass
+try:
+    import numpy as np
+except ImportError:  # Only needed by the vectorized grid backend
+    np = None
+
+# Grid resolution of the legacy sweep, also used as the contact tolerance
+# when deciding whether a low priority item is supported from behind
+STEP_SIZE = 2.0  # cm
+
+# Items with a priority number at or below this are kept near the front
+# (origin) of a container, everything else is pushed towards the back
+HIGH_PRIORITY_THRESHOLD = 3
+
+# Upper bound on candidate x item pairs evaluated at once by the
+# vectorized grid backend, keeps the boolean matrices at a few MB
+GRID_CHUNK_PAIRS = 4_000_000
+
+# Edge length of a spatial index cell
+INDEX_CELL_SIZE = 25.0  # cm
+
+# Empty spaces thinner than this are not kept in a container's free space
+# map. Slivers left between misaligned items make up a large part of the
+# spaces and no real item fits in them.
+MIN_FREE_SPACE_SIDE = 1.0  # cm
+
+@dataclass(slots=True)
 class Position:
     x: float
     y: float
@@ -12,7 +50,7 @@ class Position:
     def __str__(self):
         return f"Position(x={self.x}, y={self.y}, z={self.z})"
 
-@dataclass
+@dataclass(slots=True)
 class Dimensions:
     width: float
     height: float
@@ -25,10 +63,13 @@ class Dimensions:
         return f"Dimensions(width={self.width}, height={self.height}, depth={self.depth})"
 
 class ItemPlacement:
-    def __init__(self, item_id: str, position: Position, dimensions: Dimensions):
+    __slots__ = ('item_id', 'position', 'dimensions', 'rotation')
+
+    def __init__(self, item_id: str, position: Position, dimensions: Dimensions, rotation: int = 0):
         self.item_id = item_id
         self.position = position
         self.dimensions = dimensions
+        self.rotation = rotation
 
     def get_bounds(self) -> Tuple[Position, Position]:
         """Returns (min_point, max_point) representing the item's bounds"""
@@ -44,70 +85,1761 @@ class ItemPlacement:
         )
         return (min_point, max_point)
 
+Box = Tuple[float, float, float, float, float, float]
+
+# Axis-aligned orientations of an item. Rotation r lays the item's
+# (width, height, depth) along (x, y, z) in the order ROTATIONS[r], 0 is the
+# orientation the item was declared in. A set of allowed rotations is a bit
+# mask with bit r set for every rotation r.
+ROTATIONS = ((0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0))
+ALL_ROTATIONS = (1 << len(ROTATIONS)) - 1
+
+def rotate(dimensions: Dimensions, rotation: int) -> Dimensions:
+    """Dimensions of an item along (x, y, z) in the given rotation"""
+    if not rotation:
+        return dimensions
+    sides = (dimensions.width, dimensions.height, dimensions.depth)
+    order = ROTATIONS[rotation]
+    return Dimensions(sides[order[0]], sides[order[1]], sides[order[2]])
+
+def orientations(dimensions: Dimensions, allowed_rotations: Optional[int] = None
+                 ) -> List[Tuple[int, Dimensions]]:
+    """The distinct (rotation, dimensions) an item may be placed in.
+
+    `allowed_rotations` is a bit mask, None allows all six. Rotations giving
+    the same box as an earlier one are skipped, a cube only has one.
+    """
+    if allowed_rotations is None:
+        allowed_rotations = ALL_ROTATIONS
+    result = []
+    seen = set()
+    for rotation in range(len(ROTATIONS)):
+        if not allowed_rotations & (1 << rotation):
+            continue
+        oriented = rotate(dimensions, rotation)
+        sides = (oriented.width, oriented.height, oriented.depth)
+        if sides not in seen:
+            seen.add(sides)
+            result.append((rotation, oriented))
+    return result
+
+# Layout of one placement row in PlacementStore.data: the bounds first, so
+# data[offset:offset + 6] is the same (min_x, ..., max_z) tuple as a Box
+MIN_X, MIN_Y, MIN_Z, MAX_X, MAX_Y, MAX_Z, WIDTH, HEIGHT, DEPTH = range(9)
+PLACEMENT_ROW = 9
+
+class PlacementStore:
+    """Struct-of-arrays storage of the placements in one container.
+
+    Every placement is a row of PLACEMENT_ROW floats in `data`, found
+    through `offsets` (item_id -> index of the row's first float). Hot
+    paths read bounds straight from `data` without creating objects.
+    It also behaves like the old item_id -> ItemPlacement dict, building
+    ItemPlacement views on access, so existing callers keep working.
+    """
+
+    def __init__(self):
+        self.data = array('d')
+        self.rotations = array('i')
+        self.offsets: Dict[str, int] = {}
+        self._free: List[int] = []
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, item_id) -> bool:
+        return item_id in self.offsets
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+    def __getitem__(self, item_id: str) -> ItemPlacement:
+        return self.placement(self.offsets[item_id], item_id)
+
+    def get(self, item_id: str, default=None) -> Optional[ItemPlacement]:
+        offset = self.offsets.get(item_id)
+        return default if offset is None else self.placement(offset, item_id)
+
+    def keys(self):
+        return self.offsets.keys()
+
+    def values(self) -> Iterable[ItemPlacement]:
+        return (self.placement(offset, item_id) for item_id, offset in self.offsets.items())
+
+    def items(self) -> Iterable[Tuple[str, ItemPlacement]]:
+        return ((item_id, self.placement(offset, item_id)) for item_id, offset in self.offsets.items())
+
+    def add(self, item_id: str, x: float, y: float, z: float,
+            width: float, height: float, depth: float, rotation: int = 0) -> int:
+        """Store a placement, overwriting the item's row if it has one, and return its offset"""
+        offset = self.offsets.get(item_id)
+        if offset is None:
+            if self._free:
+                offset = self._free.pop()
+            else:
+                offset = len(self.data)
+                self.data.extend(EMPTY_ROW)
+                self.rotations.append(0)
+            self.offsets[item_id] = offset
+        data = self.data
+        data[offset + MIN_X] = x
+        data[offset + MIN_Y] = y
+        data[offset + MIN_Z] = z
+        data[offset + MAX_X] = x + width
+        data[offset + MAX_Y] = y + height
+        data[offset + MAX_Z] = z + depth
+        data[offset + WIDTH] = width
+        data[offset + HEIGHT] = height
+        data[offset + DEPTH] = depth
+        self.rotations[offset // PLACEMENT_ROW] = rotation
+        return offset
+
+    def extend(self, rows: Iterable[Tuple[str, float, float, float, float, float, float, int]]):
+        """Append (item_id, x, y, z, width, height, depth, rotation) rows of
+        items that are not stored yet, in one go instead of an add() each"""
+        offsets = self.offsets
+        offset = len(self.data)
+        floats: List[float] = []
+        rotations: List[int] = []
+        for item_id, x, y, z, width, height, depth, rotation in rows:
+            offsets[item_id] = offset
+            offset += PLACEMENT_ROW
+            floats += (x, y, z, x + width, y + height, z + depth, width, height, depth)
+            rotations.append(rotation)
+        self.data.extend(floats)
+        self.rotations.extend(rotations)
+
+    def discard(self, item_id: str) -> bool:
+        """Drop an item's row, which is reused by the next add"""
+        offset = self.offsets.pop(item_id, None)
+        if offset is None:
+            return False
+        self._free.append(offset)
+        return True
+
+    def box(self, offset: int) -> Box:
+        data = self.data
+        return (data[offset], data[offset + 1], data[offset + 2],
+                data[offset + 3], data[offset + 4], data[offset + 5])
+
+    def placement(self, offset: int, item_id: str) -> ItemPlacement:
+        """Object view of a row"""
+        data = self.data
+        return ItemPlacement(
+            item_id,
+            Position(data[offset + MIN_X], data[offset + MIN_Y], data[offset + MIN_Z]),
+            Dimensions(data[offset + WIDTH], data[offset + HEIGHT], data[offset + DEPTH]),
+            self.rotations[offset // PLACEMENT_ROW]
+        )
+
+EMPTY_ROW = array('d', [0.0] * PLACEMENT_ROW)
+
+class SpatialIndex:
+    """Uniform grid hash over the boxes placed in a container.
+
+    Every box is registered in each cell it covers, so an AABB query only
+    looks at the boxes sharing a cell with the query instead of all boxes.
+    The bounds themselves are read from the container's PlacementStore.
+    """
+
+    def __init__(self, store: PlacementStore, cell_size: float = INDEX_CELL_SIZE):
+        self.store = store
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int, int], Set[str]] = defaultdict(set)
+
+    def __len__(self):
+        return len(self.store)
+
+    def _cell_range(self, low: float, high: float) -> range:
+        # Boxes are half-open, so a box ending exactly on a cell boundary
+        # does not occupy the next cell
+        size = self.cell_size
+        first = max(0, math.floor(low / size))
+        last = max(first, math.ceil(high / size) - 1)
+        return range(first, last + 1)
+
+    def _cells(self, box: Box) -> Iterable[Tuple[int, int, int]]:
+        cell_range = self._cell_range
+        return product(cell_range(box[0], box[3]), cell_range(box[1], box[4]), cell_range(box[2], box[5]))
+
+    def insert(self, item_id: str):
+        """Register an item already stored in the PlacementStore"""
+        for cell in self._cells(self.store.box(self.store.offsets[item_id])):
+            self.cells[cell].add(item_id)
+
+    def remove(self, item_id: str):
+        """Unregister an item, before it is dropped from the PlacementStore"""
+        offset = self.store.offsets.get(item_id)
+        if offset is None:
+            return
+        for cell in self._cells(self.store.box(offset)):
+            members = self.cells.get(cell)
+            if members is not None:
+                members.discard(item_id)
+                if not members:
+                    del self.cells[cell]
+
+    def _candidates(self, box: Box) -> Set[str]:
+        candidates: Set[str] = set()
+        for cell in self._cells(box):
+            members = self.cells.get(cell)
+            if members:
+                candidates.update(members)
+        return candidates
+
+    def query(self, min_point: Position, max_point: Position) -> List[str]:
+        """Return the ids of all boxes whose interior intersects the AABB"""
+        return self.query_box((min_point.x, min_point.y, min_point.z, max_point.x, max_point.y, max_point.z))
+
+    def query_box(self, box: Box) -> List[str]:
+        offsets = self.store.offsets
+        return [
+            item_id for item_id in self._candidates(box)
+            if self._intersects(offsets[item_id], box)
+        ]
+
+    def intersects_any(self, min_point: Position, max_point: Position) -> bool:
+        """Check whether any box intersects the AABB"""
+        box = (min_point.x, min_point.y, min_point.z, max_point.x, max_point.y, max_point.z)
+        offsets = self.store.offsets
+        checked: Set[str] = set()
+        for cell in self._cells(box):
+            for item_id in self.cells.get(cell, ()):
+                if item_id in checked:
+                    continue
+                checked.add(item_id)
+                if self._intersects(offsets[item_id], box):
+                    return True
+        return False
+
+    def touching_face(self, min_point: Position, max_point: Position, axis: int,
+                      upper: bool, tolerance: float = STEP_SIZE) -> List[str]:
+        """Return the boxes touching one face of the AABB.
+
+        `axis` is 0, 1 or 2 for x, y or z and `upper` selects the max face
+        (True) or the min face (False). A box touches the face when its
+        opposite face lies within `tolerance` of it and the two boxes
+        overlap on the other two axes.
+        """
+        low = [min_point.x, min_point.y, min_point.z]
+        high = [max_point.x, max_point.y, max_point.z]
+        face = high[axis] if upper else low[axis]
+        slab_low = list(low)
+        slab_high = list(high)
+        slab_low[axis] = face - tolerance
+        slab_high[axis] = face + tolerance
+        slab = (slab_low[0], slab_low[1], slab_low[2], slab_high[0], slab_high[1], slab_high[2])
+
+        data = self.store.data
+        offsets = self.store.offsets
+        touching = []
+        for item_id in self._candidates(slab):
+            offset = offsets[item_id]
+            # The opposite face of the other box is its min face when we
+            # look at our max face, and vice versa
+            other_face = data[offset + axis] if upper else data[offset + axis + 3]
+            if abs(other_face - face) >= tolerance:
+                continue
+            if all(
+                low[a] < data[offset + a + 3] and high[a] > data[offset + a]
+                for a in range(3) if a != axis
+            ):
+                touching.append(item_id)
+        return touching
+
+    def _intersects(self, offset: int, b: Box) -> bool:
+        a = self.store.data
+        return (a[offset] < b[3] and a[offset + 3] > b[0] and
+                a[offset + 1] < b[4] and a[offset + 4] > b[1] and
+                a[offset + 2] < b[5] and a[offset + 5] > b[2])
+
+class FreeSpaceMap:
+    """Maximal empty spaces of a container.
+
+    Every empty region of the container lies inside at least one of the
+    `spaces`, boxes that cannot grow in any direction without hitting an
+    item or a wall. An item therefore fits somewhere in the container
+    exactly when one orientation of it fits inside one of the spaces.
+    `max_sides` holds the longest space along each axis, so most items
+    that cannot fit are rejected without looking at the spaces at all.
+    Spaces thinner than MIN_FREE_SPACE_SIDE are dropped, everything cut
+    from them would be as thin, so the map stays exact for items that are
+    not thinner than that. Thinner items are always let through to the
+    search.
+    """
+
+    def __init__(self, width: float, height: float, depth: float):
+        self.size = (width, height, depth)
+        self.spaces: List[Box] = [(0.0, 0.0, 0.0, width, height, depth)]
+        self.max_sides = (width, height, depth)
+
+    def add_box(self, box: Box):
+        """Carve a newly placed box out of the spaces it overlaps"""
+        min_x, min_y, min_z, max_x, max_y, max_z = box
+        spaces = self.spaces
+        # Spaces overlapping or touching the box. The overlapped ones are
+        # cut, only the touching ones can contain a piece of them.
+        near = [
+            space for space in spaces
+            if space[0] <= max_x and space[3] >= min_x and space[1] <= max_y and
+            space[4] >= min_y and space[2] <= max_z and space[5] >= min_z
+        ]
+        cut = [
+            space for space in near
+            if space[0] < max_x and space[3] > min_x and space[1] < max_y and
+            space[4] > min_y and space[2] < max_z and space[5] > min_z
+        ]
+        if not cut:
+            return
+        touching = [
+            space for space in near
+            if not (space[0] < max_x and space[3] > min_x and space[1] < max_y and
+                    space[4] > min_y and space[2] < max_z and space[5] > min_z)
+        ]
+        kept = [
+            space for space in spaces
+            if not (space[0] < max_x and space[3] > min_x and space[1] < max_y and
+                    space[4] > min_y and space[2] < max_z and space[5] > min_z)
+        ]
+
+        # What is left of the cut spaces on each of the six sides of the
+        # box, with the coordinate of the face each piece ends at. Pieces
+        # thinner than MIN_FREE_SPACE_SIDE are not kept.
+        min_side = MIN_FREE_SPACE_SIDE
+        faces = (min_x, max_x, min_y, max_y, min_z, max_z)
+        pieces: Tuple[List[Box], ...] = ([], [], [], [], [], [])
+        # Pieces are never longer than their space, the longest sides only
+        # have to be looked up again when a space that had one is cut
+        max_width, max_height, max_depth = self.max_sides
+        cut_longest = False
+        for s_min_x, s_min_y, s_min_z, s_max_x, s_max_y, s_max_z in cut:
+            if (s_max_x - s_min_x == max_width or s_max_y - s_min_y == max_height or
+                    s_max_z - s_min_z == max_depth):
+                cut_longest = True
+            if min_x - s_min_x >= min_side:
+                pieces[0].append((s_min_x, s_min_y, s_min_z, min_x, s_max_y, s_max_z))
+            if s_max_x - max_x >= min_side:
+                pieces[1].append((max_x, s_min_y, s_min_z, s_max_x, s_max_y, s_max_z))
+            if min_y - s_min_y >= min_side:
+                pieces[2].append((s_min_x, s_min_y, s_min_z, s_max_x, min_y, s_max_z))
+            if s_max_y - max_y >= min_side:
+                pieces[3].append((s_min_x, max_y, s_min_z, s_max_x, s_max_y, s_max_z))
+            if min_z - s_min_z >= min_side:
+                pieces[4].append((s_min_x, s_min_y, s_min_z, s_max_x, s_max_y, min_z))
+            if s_max_z - max_z >= min_side:
+                pieces[5].append((s_min_x, s_min_y, max_z, s_max_x, s_max_y, s_max_z))
+
+        # A piece keeps the extent of its space across the box, so anything
+        # containing it must stop at the same face of the box: either a
+        # piece from the same side or an untouched space ending there.
+        # Untouched spaces cannot be inside a piece, its space was maximal.
+        for side, side_pieces in enumerate(pieces):
+            if not side_pieces:
+                continue
+            # The face coordinate is the piece's max on even sides, min on odd
+            axis = side // 2
+            face_index = axis + (3 if side % 2 == 0 else 0)
+            face = faces[side]
+            # A piece spans its space on the other two axes, which overlaps
+            # the box there, so anything containing it overlaps the box too
+            a, b = (axis + 1) % 3, (axis + 2) % 3
+            low_a, high_a, low_b, high_b = box[a], box[a + 3], box[b], box[b + 3]
+            containers = [
+                space for space in touching
+                if space[face_index] == face and space[a] < high_a and space[a + 3] > low_a
+                and space[b] < high_b and space[b + 3] > low_b
+            ]
+            # Largest first, a piece can only be inside a larger one, and one
+            # inside a dropped piece is inside whatever dropped that piece
+            accepted: List[Box] = []
+            for piece in sorted(set(side_pieces), key=_box_volume, reverse=True):
+                if any(_box_contains(other, piece) for other in containers):
+                    continue
+                p_min_x, p_min_y, p_min_z, p_max_x, p_max_y, p_max_z = piece
+                # _box_contains inlined into a plain loop, this is the
+                # innermost loop of every placement
+                for o in accepted:
+                    if (o[0] <= p_min_x and o[1] <= p_min_y and o[2] <= p_min_z and
+                            o[3] >= p_max_x and o[4] >= p_max_y and o[5] >= p_max_z):
+                        break
+                else:
+                    accepted.append(piece)
+            kept.extend(accepted)
+        if cut_longest:
+            self._set_spaces(kept)
+        else:
+            self.spaces = kept
+
+    def remove_box(self, box: Box, boxes: Iterable[Box]):
+        """Give the space of a removed box back, `boxes` are those still placed.
+
+        A maximal space of the new layout that does not overlap the freed
+        box was empty before and so was already a maximal space. Only the
+        spaces overlapping the box have to be found: they come out of
+        carving the remaining boxes from the whole container while
+        dropping, after every cut, the spaces that no longer overlap the
+        freed box, as nothing cut from them can overlap it again. Old
+        spaces that grew into one of the new spaces are dropped.
+        """
+        local = FreeSpaceMap(*self.size)
+        for other in boxes:
+            local.add_box(other)
+            local.spaces = [space for space in local.spaces if _box_overlaps(space, box)]
+            if not local.spaces:
+                break
+        grown = local.spaces
+        kept = [space for space in self.spaces
+                if not any(_box_contains(new, space) for new in grown if new != space)]
+        kept.extend(new for new in grown if new not in kept)
+        self._set_spaces(kept)
+
+    def _set_spaces(self, spaces: List[Box]):
+        self.spaces = spaces
+        self.max_sides = tuple(
+            max(map(sub, map(itemgetter(axis + 3), spaces), map(itemgetter(axis), spaces)), default=0.0)
+            for axis in range(3)
+        )
+
+    def fits(self, dimensions: Dimensions) -> bool:
+        """Whether a box of these dimensions fits in one of the spaces"""
+        width, height, depth = dimensions.width, dimensions.height, dimensions.depth
+        if min(width, height, depth) < MIN_FREE_SPACE_SIDE:
+            return True
+        max_width, max_height, max_depth = self.max_sides
+        if width > max_width or height > max_height or depth > max_depth:
+            return False
+        return any(
+            space[3] - space[0] >= width and space[4] - space[1] >= height and space[5] - space[2] >= depth
+            for space in self.spaces
+        )
+
+    def best_fit(self, dimensions: Dimensions) -> Optional[float]:
+        """Volume of the smallest space a box of these dimensions fits in"""
+        width, height, depth = dimensions.width, dimensions.height, dimensions.depth
+        if min(width, height, depth) < MIN_FREE_SPACE_SIDE:
+            # It may fit in a sliver the map does not keep, rank it last
+            return math.inf
+        max_width, max_height, max_depth = self.max_sides
+        if width > max_width or height > max_height or depth > max_depth:
+            return None
+        return min((
+            (space[3] - space[0]) * (space[4] - space[1]) * (space[5] - space[2])
+            for space in self.spaces
+            if space[3] - space[0] >= width and space[4] - space[1] >= height and space[5] - space[2] >= depth
+        ), default=None)
+
+    def largest_space(self) -> Optional[Box]:
+        """The space with the largest volume"""
+        return max(self.spaces, default=None,
+                   key=lambda space: (space[3] - space[0]) * (space[4] - space[1]) * (space[5] - space[2]))
+
+def _box_overlaps(a: Box, b: Box) -> bool:
+    return (a[0] < b[3] and a[3] > b[0] and a[1] < b[4] and a[4] > b[1] and
+            a[2] < b[5] and a[5] > b[2])
+
+def _box_volume(box: Box) -> float:
+    return (box[3] - box[0]) * (box[4] - box[1]) * (box[5] - box[2])
+
+def _box_contains(outer: Box, inner: Box) -> bool:
+    return (outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] <= inner[2] and
+            outer[3] >= inner[3] and outer[4] >= inner[4] and outer[5] >= inner[5])
+
 class Container3D:
-    def __init__(self, container_id: str, dimensions: Dimensions):
+    def __init__(self, container_id: str, dimensions: Dimensions, zone: Optional[str] = None):
         self.container_id = container_id
         self.dimensions = dimensions
-        self.items: Dict[str, ItemPlacement] = {}
+        self.zone = zone
+        self.name: Optional[str] = None
+        self.current_load = 0.0
+        self.items = PlacementStore()
+        # Total volume of the placed items
+        self.used_volume = 0.0
+        # Built from the items on first use, see `index`
+        self._index: Optional[SpatialIndex] = None
+        # Extreme points: candidate min corners for front placement and
+        # candidate max corners for back placement
+        self.front_points: Set[Tuple[float, float, float]] = set()
+        self.back_points: Set[Tuple[float, float, float]] = set()
+        self._reset_extreme_points()
+        # Set when the points no longer match the items, they are rebuilt
+        # on the next search instead of after every change
+        self.points_stale = False
+        # Bumped on every change to the items, so derived data such as the
+        # retrieval planner's blocking graph knows when to rebuild
+        self.version = 0
+        # Retrieval cost of every item (see retrieval_weight), the number of
+        # items directly between it and the open face, and the sum of both
+        # products over the container. The counts are built on first use
+        # and then kept up to date by every place and remove.
+        self.retrieval_weights: Dict[str, float] = {}
+        self.blocker_counts: Dict[str, int] = {}
+        self.retrieval_cost = 0.0
+        self.blocking_stale = True
+        # Empty spaces, built on first use and then updated by every place
+        # and remove (see FreeSpaceMap.add_box and remove_box)
+        self._free_space: Optional[FreeSpaceMap] = None
 
     def can_place_item(self, item_placement: ItemPlacement) -> bool:
         """Check if an item can be placed at the specified position"""
-        min_point, max_point = item_placement.get_bounds()
-        
-        # Check container bounds
-        if (min_point.x < 0 or max_point.x > self.dimensions.width or
-            min_point.y < 0 or max_point.y > self.dimensions.height or
-            min_point.z < 0 or max_point.z > self.dimensions.depth):
-            return False
-
-        return True
+        position = item_placement.position
+        return self._fits_inside(position.x, position.y, position.z, item_placement.dimensions)
 
     def place_item(self, item_placement: ItemPlacement) -> bool:
         """Place an item in the container if possible"""
-        if self.can_place_item(item_placement):
-            self.items[item_placement.item_id] = item_placement
+        if not self.can_place_item(item_placement):
+            return False
+        item_id = item_placement.item_id
+        if item_id in self.items:
+            self.remove_item(item_id)
+        position, dimensions = item_placement.position, item_placement.dimensions
+        offset = self.items.add(item_id, position.x, position.y, position.z,
+                                dimensions.width, dimensions.height, dimensions.depth,
+                                item_placement.rotation)
+        self.used_volume += dimensions.width * dimensions.height * dimensions.depth
+        if self._free_space is not None:
+            self._free_space.add_box(self.items.box(offset))
+        if self._index is not None:
+            self._index.insert(item_id)
+        if not self.points_stale:
+            self._add_extreme_points(offset)
+        if not self.blocking_stale:
+            blockers = self.blockers_of(item_id)
+            self.blocker_counts[item_id] = len(blockers)
+            self.retrieval_cost += self.retrieval_weights.get(item_id, 1.0) * len(blockers)
+            for other_id in self.blocked_by(item_id):
+                self.blocker_counts[other_id] += 1
+                self.retrieval_cost += self.retrieval_weights.get(other_id, 1.0)
+        self.version += 1
+        return True
+
+    def load_items(self, rows: Iterable[Tuple[str, float, float, float, float, float, float, int]]):
+        """Bulk load stored (item_id, x, y, z, width, height, depth, rotation)
+        placements, with the dimensions already rotated.
+
+        The spatial index and the extreme points are left to be built by
+        the first query on this container, so loading many containers
+        stays cheap.
+        """
+        store = self.items
+        rows = list(rows)
+        if store.offsets.keys().isdisjoint([row[0] for row in rows]):
+            store.extend(rows)
+        else:
+            # Rows of stored items are overwritten in place
+            for row in rows:
+                store.add(*row)
+        self.used_volume += sum([width * height * depth for _, _, _, _, width, height, depth, _ in rows])
+        self._free_space = None
+        self._index = None
+        self.points_stale = True
+        self.blocking_stale = True
+        self.version += 1
+
+    def search_state(self, dimensions: Dimensions, allowed_rotations: Optional[int] = None) -> tuple:
+        """What a search for an item needs of this container, for a worker.
+
+        Only flat arrays are sent: the placed boxes, the retrieval weights
+        and the extreme points, which are built here and kept for the next
+        search. The worker rebuilds the spatial index from the boxes. The
+        free space map stays here, it is applied by narrowing the item's
+        rotations to those it can hold. See from_search_state.
+        """
+        self.refresh_extreme_points()
+        store = self.items
+        item_ids = list(store.offsets)
+        data = array('d')
+        for offset in store.offsets.values():
+            data += store.data[offset:offset + PLACEMENT_ROW]
+        weights = self.retrieval_weights
+        free_space = self.free_space
+        rotations = 0
+        for rotation, oriented in orientations(dimensions, allowed_rotations):
+            if free_space.fits(oriented):
+                rotations |= 1 << rotation
+        return (self.container_id, self.zone,
+                (self.dimensions.width, self.dimensions.height, self.dimensions.depth),
+                self.used_volume, item_ids, data.tobytes(),
+                array('d', [weights.get(item_id, 1.0) for item_id in item_ids]).tobytes(),
+                array('d', [value for point in self.front_points for value in point]).tobytes(),
+                array('d', [value for point in self.back_points for value in point]).tobytes(),
+                rotations)
+
+    @classmethod
+    def from_search_state(cls, state: tuple) -> Tuple["Container3D", int]:
+        """Rebuild a container from search_state, with the rotations to search"""
+        (container_id, zone, (width, height, depth), used_volume, item_ids, data, weights,
+         front_points, back_points, rotations) = state
+        container = cls(container_id, Dimensions(width, height, depth), zone)
+        store = container.items
+        store.data.frombytes(data)
+        # Searches never read the rotations of placed items
+        store.rotations = array('i', bytes(store.rotations.itemsize * len(item_ids)))
+        store.offsets = dict(zip(item_ids, range(0, len(store.data), PLACEMENT_ROW)))
+        container.used_volume = used_volume
+        container.retrieval_weights = dict(zip(item_ids, array('d', weights)))
+        points = array('d', front_points)
+        container.front_points = set(zip(points[0::3], points[1::3], points[2::3]))
+        points = array('d', back_points)
+        container.back_points = set(zip(points[0::3], points[1::3], points[2::3]))
+        # The map has been applied to `rotations`, an uncarved one lets
+        # every orientation that fits the container through
+        container._free_space = FreeSpaceMap(width, height, depth)
+        container.version = 1
+        return container, rotations
+
+    @property
+    def index(self) -> SpatialIndex:
+        """Spatial index over the placed items, built on first use"""
+        if self._index is None:
+            index = SpatialIndex(self.items)
+            for item_id in self.items.offsets:
+                index.insert(item_id)
+            self._index = index
+        return self._index
+
+    def remove_item(self, item_id: str) -> Optional[ItemPlacement]:
+        """Remove an item from the container, returning its placement"""
+        placement = self.items.get(item_id)
+        if placement is not None:
+            if not self.blocking_stale:
+                self.retrieval_cost -= (self.retrieval_weights.get(item_id, 1.0) *
+                                        self.blocker_counts.pop(item_id))
+                for other_id in self.blocked_by(item_id):
+                    self.blocker_counts[other_id] -= 1
+                    self.retrieval_cost -= self.retrieval_weights.get(other_id, 1.0)
+            self.retrieval_weights.pop(item_id, None)
+            self.used_volume -= placement.dimensions.get_volume()
+            if self._index is not None:
+                self._index.remove(item_id)
+            store = self.items
+            box = store.box(store.offsets[item_id])
+            store.discard(item_id)
+            if self._free_space is not None:
+                self._free_space.remove_box(box, (store.box(offset) for offset in store.offsets.values()))
+            # Points generated by the removed box may no longer be corners,
+            # and points it covered may be free again, so rebuild the set
+            self.points_stale = True
+            self.version += 1
+        return placement
+
+    def blockers_of(self, item_id: str) -> List[str]:
+        """Items between `item_id` and the open face (z = 0), which have to
+        come out before it can"""
+        data = self.items.data
+        offset = self.items.offsets[item_id]
+        return self.index.query_box((data[offset + MIN_X], data[offset + MIN_Y], 0.0,
+                                     data[offset + MAX_X], data[offset + MAX_Y], data[offset + MIN_Z]))
+
+    def blocked_by(self, item_id: str) -> List[str]:
+        """Items behind `item_id` whose way out it blocks"""
+        data = self.items.data
+        offset = self.items.offsets[item_id]
+        return self.index.query_box((data[offset + MIN_X], data[offset + MIN_Y], data[offset + MAX_Z],
+                                     data[offset + MAX_X], data[offset + MAX_Y], self.dimensions.depth))
+
+    def set_retrieval_weight(self, item_id: str, weight: float):
+        """Record how costly it is to have `item_id` blocked"""
+        if not self.blocking_stale and item_id in self.blocker_counts:
+            self.retrieval_cost += ((weight - self.retrieval_weights.get(item_id, 1.0)) *
+                                    self.blocker_counts[item_id])
+        self.retrieval_weights[item_id] = weight
+
+    def refresh_blocking(self):
+        """Count the blockers of every item if that has not been done yet"""
+        if self.blocking_stale:
+            weights = self.retrieval_weights
+            counts = {item_id: len(self.blockers_of(item_id)) for item_id in self.items.offsets}
+            self.blocker_counts = counts
+            self.retrieval_cost = sum(weights.get(item_id, 1.0) * count for item_id, count in counts.items())
+            self.blocking_stale = False
+
+    def placement_cost(self, x: float, y: float, z: float, dimensions: Dimensions,
+                       weight: float, limit: float = math.inf) -> float:
+        """Retrieval cost a box at (x, y, z) would add to the container.
+
+        That is its own weight for every item in front of it, plus the
+        weight of every item behind it that it would block. Returns as
+        soon as the cost reaches `limit`.
+        """
+        max_x, max_y = x + dimensions.width, y + dimensions.height
+        cost = weight * len(self.index.query_box((x, y, 0.0, max_x, max_y, z)))
+        if cost >= limit:
+            return cost
+        weights = self.retrieval_weights
+        for other_id in self.index.query_box((x, y, z + dimensions.depth, max_x, max_y, self.dimensions.depth)):
+            cost += weights.get(other_id, 1.0)
+        return cost
+
+    def refresh_extreme_points(self):
+        """Rebuild the extreme points if the items changed since they were built"""
+        if self.points_stale:
+            self._reset_extreme_points()
+            for offset in self.items.offsets.values():
+                self._add_extreme_points(offset)
+            self.points_stale = False
+
+    def _reset_extreme_points(self):
+        self.front_points = {(0.0, 0.0, 0.0)}
+        self.back_points = {(self.dimensions.width, self.dimensions.height, self.dimensions.depth)}
+
+    def _add_extreme_points(self, offset: int):
+        """Add the corners produced by a newly placed box and drop covered points"""
+        data = self.items.data
+        min_x, min_y, min_z = data[offset + MIN_X], data[offset + MIN_Y], data[offset + MIN_Z]
+        max_x, max_y, max_z = data[offset + MAX_X], data[offset + MAX_Y], data[offset + MAX_Z]
+        width, height, depth = self.dimensions.width, self.dimensions.height, self.dimensions.depth
+
+        # Corners touching the box on its far faces, plus their projections
+        # onto the walls, are where the next box can start
+        self.front_points.update([
+            (max_x, min_y, min_z),
+            (min_x, max_y, min_z),
+            (min_x, min_y, max_z),
+            (max_x, 0.0, min_z),
+            (max_x, min_y, 0.0),
+            (0.0, max_y, min_z),
+            (min_x, max_y, 0.0),
+            (0.0, min_y, max_z),
+            (min_x, 0.0, max_z),
+        ])
+        # Mirror image for boxes packed from the back corner: these are
+        # corners where the next box can end
+        self.back_points.update([
+            (min_x, max_y, max_z),
+            (max_x, min_y, max_z),
+            (max_x, max_y, min_z),
+            (min_x, height, max_z),
+            (min_x, max_y, depth),
+            (width, min_y, max_z),
+            (max_x, min_y, depth),
+            (width, max_y, min_z),
+            (max_x, height, min_z),
+        ])
+
+        self.front_points = {
+            p for p in self.front_points
+            if not (min_x <= p[0] < max_x and min_y <= p[1] < max_y and min_z <= p[2] < max_z)
+        }
+        self.back_points = {
+            p for p in self.back_points
+            if not (min_x < p[0] <= max_x and min_y < p[1] <= max_y and min_z < p[2] <= max_z)
+        }
+
+    @property
+    def free_space(self) -> FreeSpaceMap:
+        """Maximal empty spaces of the container, built on first use"""
+        if self._free_space is None:
+            free_space = FreeSpaceMap(self.dimensions.width, self.dimensions.height, self.dimensions.depth)
+            store = self.items
+            for offset in store.offsets.values():
+                free_space.add_box(store.box(offset))
+            self._free_space = free_space
+        return self._free_space
+
+    def can_fit(self, dimensions: Dimensions, allowed_rotations: Optional[int] = None) -> bool:
+        """Whether the item fits anywhere in the container in an allowed
+        orientation, without searching for a position"""
+        if dimensions.get_volume() > self.dimensions.get_volume() - self.used_volume:
+            return False
+        free_space = self.free_space
+        return any(free_space.fits(oriented) for _, oriented in orientations(dimensions, allowed_rotations))
+
+    def best_fit(self, dimensions: Dimensions, allowed_rotations: Optional[int] = None) -> Optional[float]:
+        """Volume of the tightest empty space the item fits in, None if it
+        does not fit. Lower is a snugger fit."""
+        if dimensions.get_volume() > self.dimensions.get_volume() - self.used_volume:
+            return None
+        free_space = self.free_space
+        return min((
+            volume for volume in (free_space.best_fit(oriented)
+                                  for _, oriented in orientations(dimensions, allowed_rotations))
+            if volume is not None
+        ), default=None)
+
+    def fits_at(self, position: Position, dimensions: Dimensions) -> bool:
+        """Check that a box at `position` is inside the container and overlaps nothing"""
+        return (self._fits_inside(position.x, position.y, position.z, dimensions) and
+                not self._overlaps_any(position.x, position.y, position.z, dimensions))
+
+    def _overlaps_any(self, x: float, y: float, z: float, dimensions: Dimensions) -> bool:
+        return self.index.intersects_any(
+            Position(x, y, z),
+            Position(x + dimensions.width, y + dimensions.height, z + dimensions.depth)
+        )
+
+    def _has_support_behind(self, x: float, y: float, z: float, dimensions: Dimensions) -> bool:
+        """Low priority items must rest against the back wall or another item"""
+        if z + dimensions.depth >= self.dimensions.depth - STEP_SIZE:
             return True
-        return False
+        return bool(self.index.touching_face(
+            Position(x, y, z),
+            Position(x + dimensions.width, y + dimensions.height, z + dimensions.depth),
+            axis=2,
+            upper=True
+        ))
+
+    def _fits_inside(self, x: float, y: float, z: float, dimensions: Dimensions) -> bool:
+        return (x >= 0 and y >= 0 and z >= 0 and
+                x + dimensions.width <= self.dimensions.width and
+                y + dimensions.height <= self.dimensions.height and
+                z + dimensions.depth <= self.dimensions.depth)
+
+    def find_position(self, dimensions: Dimensions, item_priority: int) -> Optional[Position]:
+        """Find a position for an item by testing only the extreme points.
+
+        High priority items (priority <= 3) go as close to the front corner
+        (origin) as possible; lower priority items go as close to the back
+        corner as possible and must be supported from behind.
+        """
+        return self._search_corner(dimensions, item_priority)[1]
+
+    def _search_corner(self, dimensions: Dimensions, item_priority: int,
+                       best_key: Optional[tuple] = None) -> Tuple[Optional[tuple], Optional[Position]]:
+        """find_position returning (key, position), only looking for points
+        with a key below `best_key`"""
+        self.refresh_extreme_points()
+        front = item_priority <= HIGH_PRIORITY_THRESHOLD
+
+        candidates = []
+        if front:
+            for x, y, z in self.front_points:
+                if not self._fits_inside(x, y, z, dimensions):
+                    continue
+                key = ((x**2 + y**2 + z**2)**0.5, x, y, z)
+                if best_key is None or key < best_key:
+                    candidates.append((key, x, y, z))
+        else:
+            width, height, depth = self.dimensions.width, self.dimensions.height, self.dimensions.depth
+            for max_x, max_y, max_z in self.back_points:
+                x = max_x - dimensions.width
+                y = max_y - dimensions.height
+                z = max_z - dimensions.depth
+                if not self._fits_inside(x, y, z, dimensions):
+                    continue
+                key = ((
+                    (width - max_x)**2 +
+                    (height - max_y)**2 +
+                    (depth - max_z)**2
+                )**0.5, -x, -y, -z)
+                if best_key is None or key < best_key:
+                    candidates.append((key, x, y, z))
+
+        # In key order the first free point is the best one, so most points
+        # never need an overlap test
+        candidates.sort()
+        for key, x, y, z in candidates:
+            if self._overlaps_any(x, y, z, dimensions):
+                continue
+            if not front and not self._has_support_behind(x, y, z, dimensions):
+                continue
+            return key, Position(x, y, z)
+        return best_key, None
+
+    def find_position_by_retrieval_cost(self, dimensions: Dimensions, item_priority: int,
+                                        weight: float = 1.0) -> Optional[Position]:
+        """Find the extreme point where the item adds the least retrieval cost.
+
+        `weight` is the item's own retrieval_weight. Both kinds of extreme
+        points are candidates; back points keep the support rule. Ties go
+        to the point closest to the corner find_position would pick for
+        this priority, candidates are tried in that order so the search
+        stops at the first free spot that blocks nothing and is blocked by
+        nothing.
+        """
+        return self._search_retrieval_cost(dimensions, item_priority, weight)[1]
+
+    def _search_retrieval_cost(self, dimensions: Dimensions, item_priority: int, weight: float,
+                               best_cost: float = math.inf) -> Tuple[float, Optional[Position]]:
+        """find_position_by_retrieval_cost returning (cost, position), only
+        looking for points cheaper than `best_cost`"""
+        self.refresh_extreme_points()
+        width, height, depth = self.dimensions.width, self.dimensions.height, self.dimensions.depth
+        front = item_priority <= HIGH_PRIORITY_THRESHOLD
+
+        candidates = []
+        for points, from_back in ((self.front_points, False), (self.back_points, True)):
+            for px, py, pz in points:
+                if from_back:
+                    x, y, z = px - dimensions.width, py - dimensions.height, pz - dimensions.depth
+                else:
+                    x, y, z = px, py, pz
+                if not self._fits_inside(x, y, z, dimensions):
+                    continue
+                if front:
+                    key = ((x**2 + y**2 + z**2)**0.5, x, y, z)
+                else:
+                    key = ((
+                        (width - x - dimensions.width)**2 +
+                        (height - y - dimensions.height)**2 +
+                        (depth - z - dimensions.depth)**2
+                    )**0.5, -x, -y, -z)
+                candidates.append((key, x, y, z, from_back))
+        candidates.sort()
+
+        best_position = None
+        for key, x, y, z, from_back in candidates:
+            if best_cost == 0:
+                break
+            # Most extreme points are covered by an item, which is cheaper
+            # to find out than the cost
+            if self._overlaps_any(x, y, z, dimensions):
+                continue
+            cost = self.placement_cost(x, y, z, dimensions, weight, best_cost)
+            if cost >= best_cost:
+                continue
+            if from_back and not self._has_support_behind(x, y, z, dimensions):
+                continue
+            best_cost = cost
+            best_position = Position(x, y, z)
+
+        return best_cost, best_position
+
+    def find_placement(self, dimensions: Dimensions, item_priority: int,
+                       allowed_rotations: Optional[int] = None,
+                       weight: Optional[float] = None) -> Optional[Tuple[Position, int]]:
+        """Find the best (position, rotation) over the allowed orientations.
+
+        Searches like find_position, or like find_position_by_retrieval_cost
+        when the item's `weight` is given. Each orientation only looks for
+        points better than the best one found so far, ties keep the lower
+        rotation, so the declared orientation wins unless turning the item
+        actually helps. Orientations that no empty space can hold (see
+        can_fit) are rejected without a search.
+        """
+        if dimensions.get_volume() > self.dimensions.get_volume() - self.used_volume:
+            return None
+        free_space = self.free_space
+        best_key = None
+        best_cost = math.inf
+        best = None
+        for rotation, oriented in orientations(dimensions, allowed_rotations):
+            # Also covers orientations that do not fit the container
+            if not free_space.fits(oriented):
+                continue
+            if weight is None:
+                key, position = self._search_corner(oriented, item_priority, best_key)
+                if position is not None:
+                    best_key = key
+                    best = (position, rotation)
+            else:
+                cost, position = self._search_retrieval_cost(oriented, item_priority, weight, best_cost)
+                if position is not None:
+                    best_cost = cost
+                    best = (position, rotation)
+                    if cost == 0:
+                        break
+        return best
+
+class LayoutCache:
+    """Values derived from a container's layout, e.g. API views of it.
+
+    Each entry remembers the container object and the version it was built
+    from. Every place, remove and reload bumps the version or replaces the
+    container, so an entry is current exactly when both still match and no
+    caller has to invalidate anything. Callers must hold the optimizer lock.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[Container3D, int, Any]] = {}
+
+    def get(self, container: Container3D, kind: str, build: Callable[[Container3D], Any]) -> Any:
+        """The `kind` view of the container, built with `build` when stale"""
+        key = (container.container_id, kind)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is container and entry[1] == container.version:
+            return entry[2]
+        value = build(container)
+        self._entries[key] = (container, container.version, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+def find_position_grid(dimensions: Dimensions, placed_items: List[Tuple], 
+                 container_width: float, container_height: float, container_depth: float,
+                 item_priority: int) -> Optional[Position]:
+    """Find a position for an item by sweeping every grid cell in the container"""
+    # Start from the front corner (min x,y,z) for high priority items, back corner for low priority
+    best_position = None
+    min_distance = float('inf')
+
+    # Determine search direction based on priority
+    # Higher priority items (lower numbers) start from the front
+    # Lower priority items (higher numbers) start from the back
+    x_range = range(0, int((container_width - dimensions.width) / STEP_SIZE) + 1) if item_priority <= 3 else range(int((container_width - dimensions.width) / STEP_SIZE), -1, -1)
+    y_range = range(0, int((container_height - dimensions.height) / STEP_SIZE) + 1) if item_priority <= 3 else range(int((container_height - dimensions.height) / STEP_SIZE), -1, -1)
+    z_range = range(0, int((container_depth - dimensions.depth) / STEP_SIZE) + 1) if item_priority <= 3 else range(int((container_depth - dimensions.depth) / STEP_SIZE), -1, -1)
+
+    # Try positions
+    for x in x_range:
+        for y in y_range:
+            for z in z_range:
+                # Convert to actual coordinates using new step size
+                actual_x = x * STEP_SIZE
+                actual_y = y * STEP_SIZE
+                actual_z = z * STEP_SIZE
+
+                # Check if position is valid
+                position_valid = True
+                has_support = False
+
+                # Check for overlaps with other items
+                for placed_item in placed_items:
+                    if (actual_x < placed_item[0] + placed_item[3] and
+                        actual_x + dimensions.width > placed_item[0] and
+                        actual_y < placed_item[1] + placed_item[4] and
+                        actual_y + dimensions.height > placed_item[1] and
+                        actual_z < placed_item[2] + placed_item[5] and
+                        actual_z + dimensions.depth > placed_item[2]):
+                        position_valid = False
+                        break
+
+                    # Check for support behind the item
+                    if item_priority > 3:  # Only check support for lower priority items
+                        # Check if there's an item or wall behind
+                        if (abs(actual_z + dimensions.depth - placed_item[2]) < STEP_SIZE and  # Item is right behind
+                            actual_x < placed_item[0] + placed_item[3] and
+                            actual_x + dimensions.width > placed_item[0] and
+                            actual_y < placed_item[1] + placed_item[4] and
+                            actual_y + dimensions.height > placed_item[1]):
+                            has_support = True
+                            break
+
+                # For lower priority items, require support unless at the back wall
+                if item_priority > 3 and not has_support and actual_z + dimensions.depth < container_depth - STEP_SIZE:
+                    position_valid = False
+
+                if position_valid:
+                    # Calculate distance to target (front for high priority, back for low priority)
+                    if item_priority <= 3:
+                        # Distance to front for high priority items
+                        distance = (actual_x**2 + actual_y**2 + actual_z**2)**0.5
+                    else:
+                        # Distance to back for low priority items
+                        distance = (
+                            (container_width - (actual_x + dimensions.width))**2 +
+                            (container_height - (actual_y + dimensions.height))**2 +
+                            (container_depth - (actual_z + dimensions.depth))**2
+                        )**0.5
+
+                    if distance < min_distance:
+                        min_distance = distance
+                        best_position = Position(actual_x, actual_y, actual_z)
+
+    return best_position
+
+def find_position_grid_numpy(dimensions: Dimensions, placed_items: List[Tuple],
+                             container_width: float, container_height: float, container_depth: float,
+                             item_priority: int) -> Optional[Position]:
+    """Vectorized version of find_position_grid.
+
+    Placed items are packed into an (N, 6) array of (x, y, z, w, h, d) and
+    every grid cell is tested against every item with broadcast operations.
+    Candidates are generated in the same order as the Python loop and the
+    first minimum wins, so both backends return the same position.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for the vectorized grid backend")
+
+    high_priority = item_priority <= 3
+    axes = []
+    for container_size, item_size in (
+        (container_width, dimensions.width),
+        (container_height, dimensions.height),
+        (container_depth, dimensions.depth),
+    ):
+        steps = int((container_size - item_size) / STEP_SIZE)
+        if steps < 0:
+            return None
+        axis = np.arange(steps + 1, dtype=np.float64) if high_priority else np.arange(steps, -1, -1, dtype=np.float64)
+        axes.append(axis * STEP_SIZE)
+
+    # x is the outer loop and z the inner loop, as in the Python sweep
+    xs, ys, zs = (a.ravel() for a in np.meshgrid(*axes, indexing='ij'))
+    placed = np.asarray([placed_item[:6] for placed_item in placed_items], dtype=np.float64).reshape(-1, 6)
+    px, py, pz, pw, ph, pd = (placed[:, i] for i in range(6))
+
+    chunk_size = max(1, GRID_CHUNK_PAIRS // max(1, len(placed)))
+    best_distance = float('inf')
+    best_position = None
+
+    for start in range(0, len(xs), chunk_size):
+        x = xs[start:start + chunk_size, None]
+        y = ys[start:start + chunk_size, None]
+        z = zs[start:start + chunk_size, None]
+
+        xy_overlap = ((x < px + pw) & (x + dimensions.width > px) &
+                      (y < py + ph) & (y + dimensions.height > py))
+        overlap = xy_overlap & (z < pz + pd) & (z + dimensions.depth > pz)
+        any_overlap = overlap.any(axis=1)
+
+        if high_priority:
+            valid = ~any_overlap
+        else:
+            # The Python loop stops at the first item that either overlaps
+            # or supports the candidate, so a supporting item only counts
+            # when it comes before every overlapping one
+            support = xy_overlap & (np.abs(z + dimensions.depth - pz) < STEP_SIZE) & ~overlap
+            any_support = support.any(axis=1)
+            if len(placed):
+                first_overlap = np.where(any_overlap, overlap.argmax(axis=1), len(placed))
+                first_support = np.where(any_support, support.argmax(axis=1), len(placed))
+                has_support = any_support & (first_support < first_overlap)
+            else:
+                has_support = any_support
+            at_back = z[:, 0] + dimensions.depth >= container_depth - STEP_SIZE
+            valid = has_support | (~any_overlap & at_back)
+
+        if not valid.any():
+            continue
+
+        x, y, z = x[:, 0], y[:, 0], z[:, 0]
+        if high_priority:
+            distance = (x**2 + y**2 + z**2)**0.5
+        else:
+            distance = (
+                (container_width - (x + dimensions.width))**2 +
+                (container_height - (y + dimensions.height))**2 +
+                (container_depth - (z + dimensions.depth))**2
+            )**0.5
+        distance = np.where(valid, distance, np.inf)
+        idx = int(distance.argmin())
+        if distance[idx] < best_distance:
+            best_distance = float(distance[idx])
+            best_position = Position(float(x[idx]), float(y[idx]), float(z[idx]))
+
+    return best_position
+
+def find_position_in_container(container: Container3D, dimensions: Dimensions, item_priority: int,
+                               engine: str = "extreme_points", grid_backend: str = "python",
+                               retrieval_weight: float = 1.0,
+                               allowed_rotations: Optional[int] = None) -> Optional[Tuple[Position, int]]:
+    """Find a (position, rotation) for an item in a container with the selected search engine"""
+    if engine == "grid":
+        data = container.items.data
+        placed_items = [
+            (data[offset + MIN_X], data[offset + MIN_Y], data[offset + MIN_Z],
+             data[offset + WIDTH], data[offset + HEIGHT], data[offset + DEPTH])
+            for offset in container.items.offsets.values()
+        ]
+        grid_search = find_position_grid_numpy if grid_backend == "numpy" else find_position_grid
+        # The sweep has no common score across orientations, the first
+        # orientation that fits anywhere is used
+        for rotation, oriented in orientations(dimensions, allowed_rotations):
+            if (oriented.width > container.dimensions.width or
+                oriented.height > container.dimensions.height or
+                oriented.depth > container.dimensions.depth):
+                continue
+            position = grid_search(oriented, placed_items, container.dimensions.width,
+                                   container.dimensions.height, container.dimensions.depth, item_priority)
+            if position is not None:
+                return position, rotation
+        return None
+
+    # Only the extreme points kept by the container are tested, instead of
+    # every grid cell in the container
+    return container.find_placement(dimensions, item_priority, allowed_rotations,
+                                    retrieval_weight if engine == "retrieval_cost" else None)
+
+def find_position_in_snapshot(snapshot: bytes, dimensions: Dimensions, item_priority: int,
+                              engine: str = "extreme_points", grid_backend: str = "python",
+                              retrieval_weight: float = 1.0) -> Optional[Tuple[Position, int]]:
+    """Search a pickled Container3D.search_state, so the search can run in a worker process"""
+    container, rotations = Container3D.from_search_state(pickle.loads(snapshot))
+    return find_position_in_container(container, dimensions, item_priority, engine,
+                                      grid_backend, retrieval_weight, rotations)
+
+@dataclass(slots=True)
+class ContainerFit:
+    """Where an item would go in one container and what it would cost"""
+    container_id: str
+    position: Position
+    rotation: int
+    # Items that would have to come out first to retrieve it, directly or not
+    retrieval_steps: int
+    # Retrieval cost the placement adds, see Container3D.placement_cost
+    retrieval_cost: float
+    # Empty volume left in the container afterwards
+    free_volume: float
+
+def evaluate_container(container: Container3D, dimensions: Dimensions, item_priority: int,
+                       engine: str = "extreme_points", grid_backend: str = "python",
+                       retrieval_weight: float = 1.0,
+                       allowed_rotations: Optional[int] = None) -> Optional[ContainerFit]:
+    """Search a position for an item in a container without placing it"""
+    found = find_position_in_container(container, dimensions, item_priority, engine,
+                                       grid_backend, retrieval_weight, allowed_rotations)
+    if found is None:
+        return None
+    position, rotation = found
+    oriented = rotate(dimensions, rotation)
+    x, y, z = position.x, position.y, position.z
+
+    # Everything between the proposed box and the open face, and whatever
+    # blocks those in turn
+    blockers = set()
+    stack = container.index.query_box((x, y, 0.0, x + oriented.width, y + oriented.height, z))
+    while stack:
+        other_id = stack.pop()
+        if other_id not in blockers:
+            blockers.add(other_id)
+            stack.extend(container.blockers_of(other_id))
+
+    return ContainerFit(
+        container_id=container.container_id,
+        position=position,
+        rotation=rotation,
+        retrieval_steps=len(blockers),
+        retrieval_cost=container.placement_cost(x, y, z, oriented, retrieval_weight),
+        free_volume=container.dimensions.get_volume() - container.used_volume - oriented.get_volume()
+    )
+
+def evaluate_containers_in_snapshot(snapshot: bytes, dimensions: Dimensions, item_priority: int,
+                                    engine: str = "extreme_points", grid_backend: str = "python",
+                                    retrieval_weight: float = 1.0) -> List[ContainerFit]:
+    """Evaluate an item against a pickled list of search states, in a worker process"""
+    fits = []
+    for state in pickle.loads(snapshot):
+        container, rotations = Container3D.from_search_state(state)
+        fit = evaluate_container(container, dimensions, item_priority, engine, grid_backend,
+                                 retrieval_weight, rotations)
+        if fit is not None:
+            fits.append(fit)
+    return fits
+
+class ExpiryQueue:
+    """Min-heap of (expiry_date, item_id) for items that can still expire.
+
+    Dates are ISO strings, so they order correctly as plain strings.
+    Entries are invalidated lazily: `dates` holds the live expiry of every
+    queued item and heap entries that disagree with it are skipped.
+    """
+
+    def __init__(self):
+        self.heap: List[Tuple[str, str]] = []
+        self.dates: Dict[str, str] = {}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def clear(self):
+        self.heap.clear()
+        self.dates.clear()
+
+    def load(self, dates: Dict[str, str]):
+        """Replace the queue with `dates` (item_id -> expiry_date) in one heapify"""
+        self.dates = dict(dates)
+        self.heap = [(date, item_id) for item_id, date in self.dates.items()]
+        heapq.heapify(self.heap)
+
+    def push(self, item_id: str, expiry_date: Optional[str]):
+        """Queue an item, replacing any previous expiry date it had"""
+        if not expiry_date:
+            self.discard(item_id)
+            return
+        if self.dates.get(item_id) == expiry_date:
+            return
+        self.dates[item_id] = expiry_date
+        heapq.heappush(self.heap, (expiry_date, item_id))
+        self._compact()
+
+    def discard(self, item_id: str):
+        if self.dates.pop(item_id, None) is not None:
+            self._compact()
+
+    def pop_expired(self, current_date: str) -> List[str]:
+        """Remove and return every item whose expiry date is before `current_date`"""
+        expired = []
+        while self.heap and self.heap[0][0] < current_date:
+            expiry_date, item_id = heapq.heappop(self.heap)
+            if self.dates.get(item_id) == expiry_date:
+                del self.dates[item_id]
+                expired.append(item_id)
+        return expired
+
+    def peek(self, count: int) -> List[Tuple[str, str]]:
+        """The next `count` (expiry_date, item_id) pairs, soonest first.
+
+        Walks the heap in order through its children instead of sorting
+        it, so the cost depends on `count` rather than the queue size.
+        """
+        result = []
+        frontier = [(self.heap[0], 0)] if self.heap else []
+        while frontier and len(result) < count:
+            entry, index = heapq.heappop(frontier)
+            if self.dates.get(entry[1]) == entry[0]:
+                result.append(entry)
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self.heap):
+                    heapq.heappush(frontier, (self.heap[child], child))
+        return result
+
+    def _compact(self):
+        # Rebuild once stale entries outnumber the live ones
+        if len(self.heap) > 2 * len(self.dates) + 64:
+            self.heap = [(date, item_id) for item_id, date in self.dates.items()]
+            heapq.heapify(self.heap)
+
+# Snapshot file layout: a header, then length-prefixed sections holding the
+# container strings, container floats, item strings, item floats and item
+# integers (priority, uses left, rotation and allowed rotations). Strings are NUL separated with SNAPSHOT_NULL standing for None,
+# numbers are packed arrays in native byte order.
+SNAPSHOT_MAGIC = b'ISSCARGO'
+SNAPSHOT_FORMAT = 3
+SNAPSHOT_HEADER = struct.Struct('<8sIIIqII')
+SNAPSHOT_SECTION = struct.Struct('<Q')
+SNAPSHOT_NULL = '\x01'
+SNAPSHOT_NULL_INT = -2**63
+
+def _pack_strings(strings: List[Optional[str]]) -> Optional[bytes]:
+    """Encode strings for a snapshot, None if one of them cannot be stored"""
+    nulls = 0
+    values = []
+    for value in strings:
+        if value is None:
+            nulls += 1
+            values.append(SNAPSHOT_NULL)
+        else:
+            values.append(str(value))
+    joined = '\0'.join(values)
+    # Strings containing the separator or the None marker cannot round-trip
+    if joined.count('\0') != max(len(values) - 1, 0) or joined.count(SNAPSHOT_NULL) != nulls:
+        return None
+    return joined.encode('utf-8')
+
+def _unpack_strings(data) -> List[Optional[str]]:
+    """Decode strings packed by _pack_strings from bytes or a memoryview"""
+    if not data:
+        return []
+    return [None if value == SNAPSHOT_NULL else value for value in str(data, 'utf-8').split('\0')]
+
+@dataclass(slots=True)
+class ItemInfo:
+    """Inventory data the optimizer keeps for every item"""
+    name: str
+    dimensions: Dimensions
+    status: str
+    priority: int
+    weight: float
+    preferred_zone: Optional[str] = None
+    container_id: Optional[str] = None
+    expiry_date: Optional[str] = None
+    # Retrievals left before the usage limit, None for items without one
+    uses_left: Optional[int] = None
+    # Bit mask of the ROTATIONS the item may be placed in, None for all
+    allowed_rotations: Optional[int] = None
+
+def retrieval_weight(priority: Optional[int], uses_left: Optional[int]) -> float:
+    """How costly it is to have an item blocked.
+
+    The retrievals it has left, scaled up for high priority (low number)
+    items. Items without a usage limit count as one more retrieval and used
+    up items cost nothing.
+    """
+    # Spelled out instead of max(), this runs for every item on startup
+    uses = 1 if uses_left is None else uses_left if uses_left > 0 else 0
+    return uses / (priority if priority and priority > 1 else 1)
 
 class SpaceOptimizer:
+    """In-memory model of all containers, items and placements.
+
+    It is loaded once from the database and then kept up to date by the
+    API on every write, so read paths never have to go back to SQLite.
+    """
+
     def __init__(self):
         self.containers: Dict[str, Container3D] = {}
-        self.items: Dict[str, Tuple[Dimensions, str]] = {}
+        self.items: Dict[str, ItemInfo] = {}
+        # Items that are not waste yet, ordered by expiry date
+        self.expiry = ExpiryQueue()
+        # Views of container layouts, valid while the container's version is
+        self.layouts = LayoutCache()
+        # Requests run in a thread pool, every access to the model that
+        # can race with a write must hold this lock
+        self.lock = threading.RLock()
 
     def initialize_from_db(self, conn):
-        """Initialize the space optimizer with data from the database"""
-        cursor = conn.cursor()
-        
-        # Clear existing data
-        self.containers.clear()
-        self.items.clear()
-        
-        # Load containers
-        cursor.execute("""
-            SELECT container_id, width_cm, height_cm, depth_cm
-            FROM containers
-        """)
-        for row in cursor.fetchall():
-            container_id, width, height, depth = row
-            dimensions = Dimensions(float(width), float(height), float(depth))
-            self.containers[container_id] = Container3D(container_id, dimensions)
-
-        # Load items with their dimensions and status
-        cursor.execute("""
-            SELECT id, width, height, depth, status
-            FROM items
-        """)
-        for row in cursor.fetchall():
-            item_id, width, height, depth, status = row
-            dimensions = Dimensions(float(width), float(height), float(depth))
-            self.items[item_id] = (dimensions, status)
+        """Initialize the space optimizer with data from the database.
+
+        Runs on startup whenever there is no usable snapshot, so the load is
+        kept to one pass over the rows: the spatial indexes and extreme
+        points are built lazily per container and the expiry queue is
+        heapified once.
+        """
+        with self.lock:
+            cursor = conn.cursor()
+            # Plain tuples are a lot cheaper to build than sqlite3.Row
+            cursor.row_factory = None
+            cursor.execute("""
+                SELECT container_id, width_cm, height_cm, depth_cm, zone, name, current_load
+                FROM containers
+            """)
+            container_rows = cursor.fetchall()
+
+            # The REAL columns already come back as floats
+            cursor.execute("""
+                SELECT CAST(id AS TEXT), name, width, height, depth, weight, priority,
+                       preferred_zone, status, container_id, x, y, z, expiry_date,
+                       usage_limit - COALESCE(usage_count, 0), rotation, allowed_rotations
+                FROM items
+            """)
+            self._load_rows(container_rows, cursor)
+
+    def _load_rows(self, container_rows: Iterable[tuple], item_rows: Iterable[tuple]):
+        """Replace the model with the given container and item rows.
+
+        Rows have the column order of the SELECTs in initialize_from_db,
+        placed items must come in the order they were put in their container.
+        """
+        with self.lock:
+            # Clear existing data
+            self.containers.clear()
+            self.items.clear()
+            self.expiry.clear()
+            self.layouts.clear()
+
+            # Hundreds of thousands of long-lived objects are created below,
+            # collecting while they are built only wastes time
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                for container_id, width, height, depth, zone, name, current_load in container_rows:
+                    dimensions = Dimensions(float(width), float(height), float(depth))
+                    container = Container3D(container_id, dimensions, zone)
+                    container.name = name
+                    container.current_load = float(current_load or 0)
+                    self.containers[container_id] = container
+
+                items = self.items
+                containers = self.containers
+                # What the loop needs of each container, in one lookup
+                targets = {
+                    container_id: (container.dimensions.width, container.dimensions.height,
+                                   container.dimensions.depth, [], container.retrieval_weights)
+                    for container_id, container in containers.items()
+                }
+                expiry_dates: Dict[str, str] = {}
+                for (item_id, name, width, height, depth, weight, priority, preferred_zone,
+                     status, container_id, x, y, z, expiry_date, uses_left, rotation,
+                     allowed_rotations) in item_rows:
+                    dimensions = Dimensions(width, height, depth)
+                    info = ItemInfo(name, dimensions, status, priority, weight or 0.0,
+                                    preferred_zone, None, expiry_date, uses_left, allowed_rotations)
+                    items[item_id] = info
+                    if status != 'waste' and expiry_date:
+                        expiry_dates[item_id] = expiry_date
+
+                    if status == 'placed' and x is not None:
+                        target = targets.get(container_id)
+                        if target is None:
+                            continue
+                        if rotation:
+                            placed = rotate(dimensions, rotation)
+                            width, height, depth = placed.width, placed.height, placed.depth
+                        else:
+                            rotation = 0
+                        # Container3D._fits_inside, inlined as it runs for
+                        # every placed item
+                        max_x, max_y, max_z, placements, weights = target
+                        if (x >= 0 and y >= 0 and z >= 0 and x + width <= max_x and
+                                y + height <= max_y and z + depth <= max_z):
+                            placements.append((item_id, x, y, z, width, height, depth, rotation))
+                            weights[item_id] = retrieval_weight(priority, uses_left)
+                            info.container_id = container_id
+
+                for container_id, (_, _, _, placements, _) in targets.items():
+                    if placements:
+                        containers[container_id].load_items(placements)
+                self.expiry.load(expiry_dates)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+
+    def save_snapshot(self, path: str, state_version: int, schema_version: int) -> bool:
+        """Write the model to a binary snapshot file.
+
+        `state_version` is the database change counter the model matches,
+        the snapshot is only loaded again while the database still has it.
+        Returns False if the model cannot be represented in a snapshot.
+        """
+        with self.lock:
+            container_strings = []
+            container_floats = array('d')
+            for container in self.containers.values():
+                container_strings += (container.container_id, container.name, container.zone)
+                container_floats.extend((container.dimensions.width, container.dimensions.height,
+                                         container.dimensions.depth, container.current_load))
+
+            # Placed items first, in the order they went into their container,
+            # so extreme points are rebuilt exactly as they were
+            ordered = [item_id for container in self.containers.values()
+                       for item_id in container.items if item_id in self.items]
+            placed = set(ordered)
+            ordered += [item_id for item_id in self.items if item_id not in placed]
+
+            item_strings = []
+            item_floats = array('d')
+            item_ints = array('q')
+            for item_id in ordered:
+                info = self.items[item_id]
+                x = y = z = 0.0
+                rotation = 0
+                container_id = info.container_id
+                if container_id is not None:
+                    store = self.containers[container_id].items
+                    offset = store.offsets.get(item_id)
+                    if offset is None:
+                        container_id = None
+                    else:
+                        x, y, z = store.data[offset + MIN_X], store.data[offset + MIN_Y], store.data[offset + MIN_Z]
+                        rotation = store.rotations[offset // PLACEMENT_ROW]
+                dimensions = info.dimensions
+                item_strings += (item_id, info.name, info.status, info.preferred_zone,
+                                 container_id, info.expiry_date)
+                item_floats.extend((dimensions.width, dimensions.height, dimensions.depth,
+                                    info.weight, x, y, z))
+                item_ints.extend((SNAPSHOT_NULL_INT if info.priority is None else info.priority,
+                                  SNAPSHOT_NULL_INT if info.uses_left is None else info.uses_left,
+                                  rotation,
+                                  SNAPSHOT_NULL_INT if info.allowed_rotations is None else info.allowed_rotations))
+            container_count = len(self.containers)
+
+        sections = [_pack_strings(container_strings), container_floats.tobytes(),
+                    _pack_strings(item_strings), item_floats.tobytes(), item_ints.tobytes()]
+        if None in sections:
+            return False
+
+        # Write next to the target and rename, readers never see a partial file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as snapshot_file:
+            snapshot_file.write(SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, sys.byteorder == 'little', schema_version,
+                state_version, container_count, len(ordered)))
+            for section in sections:
+                snapshot_file.write(SNAPSHOT_SECTION.pack(len(section)))
+                snapshot_file.write(section)
+        os.replace(temp_path, path)
+        return True
+
+    def load_snapshot(self, path: str, state_version: int, schema_version: int) -> bool:
+        """Load the model from a snapshot written by save_snapshot.
+
+        Returns False, leaving the model untouched, when there is no
+        snapshot or it does not match the current schema and database
+        state; the caller then falls back to initialize_from_db.
+        """
+        try:
+            with open(path, 'rb') as snapshot_file:
+                snapshot = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        # The sections are decoded straight from the mapping, each is
+        # copied once into the strings and arrays of the model. The model
+        # changes with every placement, so it is not kept on the mapping.
+        view = memoryview(snapshot)
+        sections = []
+        try:
+            if len(view) < SNAPSHOT_HEADER.size:
+                return False
+            (magic, file_format, little_endian, file_schema, file_state,
+             container_count, item_count) = SNAPSHOT_HEADER.unpack_from(view, 0)
+            if (magic != SNAPSHOT_MAGIC or file_format != SNAPSHOT_FORMAT or
+                    bool(little_endian) != (sys.byteorder == 'little') or
+                    file_schema != schema_version or file_state != state_version):
+                return False
+
+            offset = SNAPSHOT_HEADER.size
+            for _ in range(5):
+                (length,) = SNAPSHOT_SECTION.unpack_from(view, offset)
+                offset += SNAPSHOT_SECTION.size
+                sections.append(view[offset:offset + length])
+                offset += length
+
+            container_strings = _unpack_strings(sections[0])
+            container_floats = array('d')
+            container_floats.frombytes(sections[1])
+            item_strings = _unpack_strings(sections[2])
+            item_floats = array('d')
+            item_floats.frombytes(sections[3])
+            item_ints = array('q')
+            item_ints.frombytes(sections[4])
+        except (struct.error, ValueError):
+            # Truncated or corrupt sections, UnicodeDecodeError included
+            return False
+        finally:
+            # The mapping cannot be closed while views of it are alive
+            for section in sections:
+                section.release()
+            view.release()
+            snapshot.close()
+
+        if (len(container_strings) != 3 * container_count or len(container_floats) != 4 * container_count or
+                len(item_strings) != 6 * item_count or len(item_floats) != 7 * item_count or
+                len(item_ints) != 4 * item_count):
+            return False
+
+        container_floats = container_floats.tolist()
+        container_rows = zip(
+            container_strings[0::3],
+            container_floats[0::4], container_floats[1::4], container_floats[2::4],
+            container_strings[2::3], container_strings[1::3],
+            container_floats[3::4]
+        )
+        item_ints = item_ints.tolist()
+        if SNAPSHOT_NULL_INT in item_ints:
+            item_ints = [None if value == SNAPSHOT_NULL_INT else value for value in item_ints]
+        item_floats = item_floats.tolist()
+        item_rows = zip(
+            item_strings[0::6], item_strings[1::6],
+            item_floats[0::7], item_floats[1::7], item_floats[2::7], item_floats[3::7],
+            item_ints[0::4], item_strings[3::6], item_strings[2::6], item_strings[4::6],
+            item_floats[4::7], item_floats[5::7], item_floats[6::7],
+            item_strings[5::6], item_ints[1::4], item_ints[2::4], item_ints[3::4]
+        )
+        self._load_rows(container_rows, item_rows)
+        return True
+
+    def pack_items(self, items: List[Tuple[str, Dimensions, int, Optional[str]]],
+                   engine: str = "extreme_points") -> Tuple[List[Tuple[str, str, Position, int]], List[str]]:
+        """Pack many items into the containers in one pass.
+
+        `items` holds (item_id, dimensions, priority, preferred_zone) tuples.
+        High priority and then large items go first, and each item tries
+        the containers of its preferred zone before all the others, in
+        every orientation it allows. With the "retrieval_cost" engine
+        positions are scored by retrieval cost, otherwise as in
+        find_position. Returns the (item_id, container_id, position,
+        rotation) placements and the ids of the items that did not fit
+        anywhere.
+        """
+        with self.lock:
+            zones: Dict[Optional[str], List[Container3D]] = defaultdict(list)
+            for container in self.containers.values():
+                zones[container.zone].append(container)
+
+            placements = []
+            unplaced = []
+            ordered = sorted(items, key=lambda item: (item[2], -item[1].get_volume()))
+            for item_id, dimensions, priority, preferred_zone in ordered:
+                preferred = zones.get(preferred_zone, []) if preferred_zone else []
+                others = [c for c in self.containers.values() if c.zone != preferred_zone or not preferred_zone]
+                info = self.items.get(item_id)
+                allowed_rotations = info.allowed_rotations if info else None
+                weight = None
+                if engine == "retrieval_cost":
+                    weight = retrieval_weight(priority, info.uses_left if info else None)
+                for container in preferred + others:
+                    found = container.find_placement(dimensions, priority, allowed_rotations, weight)
+                    if found is not None:
+                        position, rotation = found
+                        self.place_item(item_id, container.container_id, position, dimensions, rotation)
+                        placements.append((item_id, container.container_id, position, rotation))
+                        break
+                else:
+                    unplaced.append(item_id)
+            return placements, unplaced
+
+    def place_item(self, item_id: str, container_id: str, position: Position,
+                   dimensions: Optional[Dimensions] = None, rotation: int = 0) -> bool:
+        """Record an item placed in a container.
+
+        `dimensions` are the item's own (unrotated) dimensions, taken from
+        the model when not given, and `rotation` the orientation it was
+        placed in.
+        """
+        with self.lock:
+            container = self.containers.get(container_id)
+            info = self.items.get(item_id)
+            if container is None:
+                return False
+            if dimensions is None:
+                if info is None:
+                    return False
+                dimensions = info.dimensions
+            placement = ItemPlacement(item_id, position, rotate(dimensions, rotation), rotation)
+            # Checked before the item leaves its old container, a placement
+            # that does not fit leaves the model as it was
+            if not container.can_place_item(placement):
+                return False
+            self.remove_item(item_id)
+            if not container.place_item(placement):
+                return False
+            if info is not None:
+                container.set_retrieval_weight(item_id, retrieval_weight(info.priority, info.uses_left))
+                info.status = 'placed'
+                info.container_id = container_id
+                container.current_load += info.weight
+                self.expiry.push(item_id, info.expiry_date)
+            return True
+
+    def set_uses_left(self, item_id: str, uses_left: Optional[int]):
+        """Record the retrievals an item has left, e.g. after it was used"""
+        with self.lock:
+            info = self.items.get(item_id)
+            if info is None:
+                return
+            info.uses_left = uses_left
+            container = self.containers.get(info.container_id)
+            if container is not None and item_id in container.items:
+                container.set_retrieval_weight(item_id, retrieval_weight(info.priority, uses_left))
+
+    def remove_item(self, item_id: str, status: Optional[str] = None) -> Optional[str]:
+        """Remove an item from its container, returning the container id.
+
+        When `status` is given the item's status is updated as well, e.g.
+        'available' after a retrieval or 'waste' when it is discarded.
+        """
+        with self.lock:
+            info = self.items.get(item_id)
+            if info is not None and status is not None:
+                info.status = status
+                if status == 'waste':
+                    self.expiry.discard(item_id)
+                else:
+                    self.expiry.push(item_id, info.expiry_date)
+
+            container_id = info.container_id if info is not None else None
+            if container_id is None:
+                # Fall back to a scan for items the model has no record of
+                for other_id, container in self.containers.items():
+                    if item_id in container.items:
+                        container_id = other_id
+                        break
+            container = self.containers.get(container_id)
+            if container is None or container.remove_item(item_id) is None:
+                return None
+            if info is not None:
+                info.container_id = None
+                container.current_load -= info.weight
+            return container_id
+
+    def snapshot_container(self, container_id: str, dimensions: Dimensions,
+                           allowed_rotations: Optional[int] = None) -> Optional[bytes]:
+        """Pickle what an out-of-process search for an item needs of a
+        container, see Container3D.search_state"""
+        with self.lock:
+            container = self.containers.get(container_id)
+            if container is None:
+                return None
+            return pickle.dumps(container.search_state(dimensions, allowed_rotations),
+                                pickle.HIGHEST_PROTOCOL)
+
+    def snapshot_containers(self, container_ids: List[str], dimensions: Dimensions,
+                            allowed_rotations: Optional[int] = None) -> bytes:
+        """Pickle the search states of several containers for one worker"""
+        with self.lock:
+            return pickle.dumps([
+                self.containers[container_id].search_state(dimensions, allowed_rotations)
+                for container_id in container_ids if container_id in self.containers
+            ], pickle.HIGHEST_PROTOCOL)
 
     def find_optimal_placement(self, item_id: str, container_id: str) -> Tuple[Optional[Position], int]:
         """Find a position for an item in a container"""
         if item_id not in self.items or container_id not in self.containers:
             return None, 0
 
-        item_dimensions, _ = self.items[item_id]
+        item_dimensions = self.items[item_id].dimensions
         container = self.containers[container_id]
         
         # Check if item fits in container
@@ -123,4 +1855,4 @@ class SpaceOptimizer:
         if container.can_place_item(placement):
             return position, 0
         
-        return None, 0 
\ No newline at end of file
+        return None, 0
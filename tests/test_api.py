@@ -0,0 +1,118 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# main reads the database and snapshot paths when it is imported, so they
+# point at a scratch directory before that
+DATA_DIR = tempfile.mkdtemp()
+os.environ["DB_PATH"] = os.path.join(DATA_DIR, "iss_cargo.db")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.testclient import TestClient
+
+import main
+
+CONTAINERS_CSV = b"""zone,container_id,width_cm,depth_cm,height_cm
+Crew_Quarters,contA,100,85,200
+Airlock,contB,50,85,200
+"""
+
+ITEMS_CSV = b"""item_id,name,width_cm,depth_cm,height_cm,mass_kg,priority,expiry_date,usage_limit,preferred_zone
+000001,Item1,15,30,10,9,1,2030-01-01,49,Airlock
+000002,Item2,25,30,20,7,1,2030-01-01,2,Airlock
+000003,Item3,20,20,20,3,5,2030-01-01,10,Crew_Quarters
+"""
+
+def import_csv(client, kind: str, data: bytes):
+    response = client.post(f"/api/import/{kind}", files={"file": (f"{kind}.csv", data, "text/csv")})
+    assert response.status_code == 200
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        import_csv(client, "containers", CONTAINERS_CSV)
+        import_csv(client, "items", ITEMS_CSV)
+        yield client
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+def test_read_endpoints_answer_304_while_unchanged(client):
+    for path in ("/api/items", "/api/containers", "/api/items/waste", "/api/logs", "/api/current-date"):
+        first = client.get(path)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert first.headers["X-Change-Version"]
+
+        cached = client.get(path, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["ETag"] == etag
+        assert cached.content == b""
+        # Weak comparison, and any of several tags
+        assert client.get(path, headers={"If-None-Match": f'"other", {etag[2:]}'}).status_code == 304
+        assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_write_changes_the_etag_of_the_tables_it_touched(client):
+    items_etag = client.get("/api/items").headers["ETag"]
+    logs_etag = client.get("/api/logs").headers["ETag"]
+    date_etag = client.get("/api/current-date").headers["ETag"]
+
+    response = client.post("/api/items/place", params={"item_id": "000001", "container_id": "contA"})
+    assert response.status_code == 200
+
+    changed = client.get("/api/items", headers={"If-None-Match": items_etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != items_etag
+    assert client.get("/api/logs", headers={"If-None-Match": logs_etag}).status_code == 200
+    # The date is another table, its tag still matches
+    assert client.get("/api/current-date", headers={"If-None-Match": date_etag}).status_code == 304
+
+def read_changes(client, since: int, epoch: str, limit: int):
+    """Follow the pages of /api/changes from `since`, returning the item
+    ids changed, the number of pages and the last response"""
+    item_ids = []
+    pages = 0
+    while True:
+        body = client.get("/api/changes", params={"since": since, "epoch": epoch, "limit": limit}).json()
+        assert not body["reset"]
+        assert body["epoch"] == epoch
+        item_ids += [item["id"] for item in body["items"]]
+        pages += 1
+        since = body["version"]
+        if not body["more"]:
+            return item_ids, pages, body
+
+def test_changes_pages_through_row_changes(client):
+    # The imports replaced whole tables, a client starting over loads everything
+    start = client.get("/api/changes", params={"since": 0}).json()
+    assert start["reset"]
+    version, epoch = start["version"], start["epoch"]
+    assert client.get("/api/changes", params={"since": version, "epoch": epoch}).json()["items"] == []
+
+    for item_id, container_id in (("000002", "contB"), ("000003", "contA")):
+        response = client.post("/api/items/place", params={"item_id": item_id, "container_id": container_id})
+        assert response.status_code == 200
+
+    item_ids, pages, last = read_changes(client, version, epoch, limit=1)
+    assert set(item_ids) == {"000002", "000003"}
+    assert pages > 1
+    assert last["version"] > version
+    # Nothing more after the last page
+    assert read_changes(client, last["version"], epoch, limit=1)[0] == []
+
+def test_changes_reset(client):
+    current = client.get("/api/changes", params={"since": 0}).json()
+    version, epoch = current["version"], current["epoch"]
+    # A journal that was recreated, or a version it never handed out
+    assert client.get("/api/changes", params={"since": version, "epoch": "other"}).json()["reset"]
+    assert client.get("/api/changes", params={"since": version + 1000, "epoch": epoch}).json()["reset"]
+    assert not client.get("/api/changes", params={"since": version, "epoch": epoch}).json()["reset"]
+
+    # An import replacing a table after `since`
+    import_csv(client, "containers", CONTAINERS_CSV)
+    reset = client.get("/api/changes", params={"since": version, "epoch": epoch}).json()
+    assert reset["reset"]
+    assert reset["version"] > version
+    assert not client.get("/api/changes", params={"since": reset["version"], "epoch": epoch}).json()["reset"]
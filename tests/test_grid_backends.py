@@ -0,0 +1,51 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import space_optimizer
+from space_optimizer import Dimensions, find_position_grid, find_position_grid_numpy
+
+pytestmark = pytest.mark.skipif(space_optimizer.np is None, reason="numpy is not installed")
+
+def random_boxes(rng, count, width, height, depth):
+    """Boxes on the 2 cm grid, overlapping each other like stale rows can"""
+    boxes = []
+    for _ in range(count):
+        w, h, d = (rng.randint(1, 6) * 2.0 for _ in range(3))
+        boxes.append((rng.randint(0, int(width - w) // 2) * 2.0, rng.randint(0, int(height - h) // 2) * 2.0,
+                      rng.randint(0, int(depth - d) // 2) * 2.0, w, h, d))
+    return boxes
+
+def assert_same_position(dimensions, boxes, size, priority):
+    expected = find_position_grid(dimensions, boxes, *size, priority)
+    found = find_position_grid_numpy(dimensions, boxes, *size, priority)
+    assert (found and (found.x, found.y, found.z)) == (expected and (expected.x, expected.y, expected.z))
+
+def test_numpy_grid_matches_python_grid():
+    rng = random.Random(1)
+    size = (30.0, 20.0, 30.0)
+    for _ in range(25):
+        boxes = random_boxes(rng, rng.randint(0, 12), *size)
+        dimensions = Dimensions(rng.uniform(1, 14), rng.uniform(1, 14), rng.uniform(1, 14))
+        # High priority items search from the front, low priority ones
+        # from the back and need support
+        for priority in (1, 5):
+            assert_same_position(dimensions, boxes, size, priority)
+
+def test_numpy_grid_matches_across_chunks(monkeypatch):
+    # Chunks of a few cells, so the best position is compared across them
+    monkeypatch.setattr(space_optimizer, "GRID_CHUNK_PAIRS", 50)
+    rng = random.Random(2)
+    size = (20.0, 20.0, 20.0)
+    for _ in range(10):
+        boxes = random_boxes(rng, 8, *size)
+        for priority in (1, 5):
+            assert_same_position(Dimensions(4.0, 4.0, 4.0), boxes, size, priority)
+
+def test_numpy_grid_item_larger_than_container():
+    assert find_position_grid_numpy(Dimensions(40.0, 1.0, 1.0), [], 30.0, 30.0, 30.0, 1) is None
+    assert find_position_grid(Dimensions(40.0, 1.0, 1.0), [], 30.0, 30.0, 30.0, 1) is None
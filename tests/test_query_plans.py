@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import queries
+from migrations import SCHEMA_VERSION, find_full_scans, get_schema_version, migrate
+
+def migrated_db():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    return conn
+
+def test_migrate_reaches_schema_version():
+    conn = migrated_db()
+    try:
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        # A second run has nothing left to do
+        assert migrate(conn) == SCHEMA_VERSION
+    finally:
+        conn.close()
+
+def test_hot_queries_use_indexes():
+    conn = migrated_db()
+    try:
+        assert find_full_scans(conn) == []
+    finally:
+        conn.close()
+
+def test_log_range_uses_timestamp_index():
+    conn = migrated_db()
+    try:
+        query = queries.logs_page_query([queries.LOGS_FROM, queries.LOGS_UNTIL])
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", ("2025-04-06", "2025-04-07", 51))]
+        assert any("idx_logs_timestamp" in detail for detail in plan)
+    finally:
+        conn.close()
@@ -0,0 +1,77 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from retrieval_planner import RetrievalPlanner
+from space_optimizer import Container3D, Dimensions, ItemPlacement, Position, rotate
+
+def place(container, item_id, x, y, z, width, height, depth):
+    assert container.place_item(ItemPlacement(item_id, Position(x, y, z), Dimensions(width, height, depth)))
+
+def blocks(container, blocker_id, item_id):
+    """Whether `blocker_id` lies on the way of `item_id` out of the open face"""
+    item = container.items.get(item_id)
+    blocker = container.items.get(blocker_id)
+    return (blocker.position.x < item.position.x + item.dimensions.width and
+            blocker.position.x + blocker.dimensions.width > item.position.x and
+            blocker.position.y < item.position.y + item.dimensions.height and
+            blocker.position.y + blocker.dimensions.height > item.position.y and
+            blocker.position.z < item.position.z)
+
+def test_removal_order_front_to_back():
+    container = Container3D("c", Dimensions(100.0, 100.0, 100.0))
+    place(container, "target", 0.0, 0.0, 60.0, 20.0, 20.0, 20.0)
+    # In front of the target, and itself behind "front"
+    place(container, "middle", 10.0, 0.0, 30.0, 20.0, 20.0, 20.0)
+    # Only blocks "middle", not the target
+    place(container, "front", 25.0, 0.0, 0.0, 20.0, 20.0, 20.0)
+    place(container, "aside", 60.0, 0.0, 0.0, 20.0, 20.0, 20.0)
+
+    plan = RetrievalPlanner().plan(container, "target")
+    assert plan.removals == ["front", "middle"]
+    assert plan.retrieval_steps == 2
+    assert plan.steps() == [("remove", "front"), ("remove", "middle"), ("retrieve", "target"),
+                            ("place_back", "middle"), ("place_back", "front")]
+    assert RetrievalPlanner().plan(container, "front").removals == []
+
+def test_plan_follows_container_changes():
+    container = Container3D("c", Dimensions(100.0, 100.0, 100.0))
+    place(container, "target", 0.0, 0.0, 50.0, 20.0, 20.0, 20.0)
+    place(container, "front", 0.0, 0.0, 0.0, 20.0, 20.0, 20.0)
+    planner = RetrievalPlanner()
+    assert planner.plan(container, "target").removals == ["front"]
+    container.remove_item("front")
+    assert planner.plan(container, "target").removals == []
+
+def test_removal_order_matches_brute_force():
+    rng = random.Random(3)
+    container = Container3D("c", Dimensions(100.0, 60.0, 100.0))
+    for index in range(80):
+        dimensions = Dimensions(rng.uniform(5, 25), rng.uniform(5, 25), rng.uniform(5, 25))
+        found = container.find_placement(dimensions, rng.randint(1, 10))
+        if found is not None:
+            position, rotation = found
+            container.place_item(ItemPlacement(str(index), position, rotate(dimensions, rotation), rotation))
+
+    planner = RetrievalPlanner()
+    item_ids = list(container.items.keys())
+    for item_id in item_ids:
+        # Everything blocking the item, directly or through other items
+        expected = set()
+        stack = [item_id]
+        while stack:
+            current = stack.pop()
+            for other_id in item_ids:
+                if other_id not in expected and blocks(container, other_id, current):
+                    expected.add(other_id)
+                    stack.append(other_id)
+
+        removals = planner.plan(container, item_id).removals
+        assert len(removals) == len(expected) and set(removals) == expected
+        # Each item is free by the time it is taken out
+        removed = set()
+        for other_id in removals:
+            assert all(blocker_id in removed for blocker_id in item_ids if blocks(container, blocker_id, other_id))
+            removed.add(other_id)
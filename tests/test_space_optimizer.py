@@ -0,0 +1,126 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from space_optimizer import Container3D, Dimensions, FreeSpaceMap, ItemPlacement, Position, SpaceOptimizer, rotate
+
+def loaded_optimizer():
+    """Two containers, item 1 placed in the large one, item 2 not placed"""
+    optimizer = SpaceOptimizer()
+    optimizer._load_rows(
+        [("large", 100.0, 100.0, 100.0, "A", "Large", 0.0),
+         ("small", 10.0, 10.0, 10.0, "B", "Small", 0.0)],
+        [("1", "Box", 20.0, 20.0, 20.0, 5.0, 1, "A", "placed", "large", 0.0, 0.0, 0.0, None, None, 0, None),
+         ("2", "Bag", 5.0, 5.0, 5.0, 1.0, 1, "B", "available", None, None, None, None, None, None, None, None)],
+    )
+    optimizer.containers["large"].current_load = 5.0
+    return optimizer
+
+def test_place_item_moves_between_containers():
+    optimizer = loaded_optimizer()
+    assert optimizer.place_item("1", "large", Position(50.0, 0.0, 0.0))
+    assert optimizer.containers["large"].items.get("1").position.x == 50.0
+    assert optimizer.place_item("2", "small", Position(0.0, 0.0, 0.0))
+    assert optimizer.items["2"].container_id == "small"
+    assert optimizer.containers["small"].current_load == 1.0
+
+def test_place_item_that_does_not_fit_keeps_old_placement():
+    optimizer = loaded_optimizer()
+    assert not optimizer.place_item("1", "small", Position(0.0, 0.0, 0.0))
+    assert not optimizer.place_item("1", "large", Position(90.0, 0.0, 0.0), Dimensions(20.0, 20.0, 20.0))
+    large = optimizer.containers["large"]
+    assert "1" in large.items
+    assert large.items.get("1").position.x == 0.0
+    assert optimizer.items["1"].container_id == "large"
+    assert large.current_load == 5.0
+    assert "1" not in optimizer.containers["small"].items
+
+def rebuilt_free_space(container):
+    free_space = FreeSpaceMap(container.dimensions.width, container.dimensions.height, container.dimensions.depth)
+    for offset in container.items.offsets.values():
+        free_space.add_box(container.items.box(offset))
+    return free_space
+
+def test_incremental_state_matches_full_rebuild():
+    rng = random.Random(5)
+    container = Container3D("c", Dimensions(100.0, 80.0, 100.0))
+    # Built up front, so every change below updates them in place
+    container.free_space
+    container.refresh_extreme_points()
+    container.refresh_blocking()
+    placed = []
+    for index in range(150):
+        if placed and rng.random() < 0.3:
+            container.remove_item(placed.pop(rng.randrange(len(placed))))
+        else:
+            dimensions = Dimensions(rng.uniform(5, 30), rng.uniform(5, 30), rng.uniform(5, 30))
+            # Every other item is placed by retrieval cost
+            found = container.find_placement(dimensions, rng.randint(1, 10), weight=1.0 if index % 2 else None)
+            if found is not None:
+                position, rotation = found
+                container.place_item(ItemPlacement(str(index), position, rotate(dimensions, rotation), rotation))
+                placed.append(str(index))
+
+        rebuilt = rebuilt_free_space(container)
+        assert sorted(container.free_space.spaces) == sorted(rebuilt.spaces)
+        assert container.free_space.max_sides == rebuilt.max_sides
+
+        if not container.points_stale:
+            points = (set(container.front_points), set(container.back_points))
+            container.points_stale = True
+            container.refresh_extreme_points()
+            assert points == (container.front_points, container.back_points)
+
+    # A container loaded from the same rows builds everything from scratch
+    fresh = Container3D("c", Dimensions(100.0, 80.0, 100.0))
+    fresh.load_items(
+        (item_id, placement.position.x, placement.position.y, placement.position.z,
+         placement.dimensions.width, placement.dimensions.height, placement.dimensions.depth, placement.rotation)
+        for item_id, placement in container.items.items()
+    )
+    for _ in range(30):
+        dimensions = Dimensions(rng.uniform(2, 40), rng.uniform(2, 40), rng.uniform(2, 40))
+        priority = rng.randint(1, 10)
+        for weight in (None, 1.0):
+            assert (container.find_placement(dimensions, priority, weight=weight) ==
+                    fresh.find_placement(dimensions, priority, weight=weight))
+        assert container.can_fit(dimensions) == fresh.can_fit(dimensions)
+    fresh.refresh_blocking()
+    assert container.blocker_counts == fresh.blocker_counts
+    assert container.retrieval_cost == fresh.retrieval_cost
+
+def container_state(container):
+    return (container.container_id, container.name, container.zone, container.dimensions,
+            container.current_load, container.used_volume, dict(container.retrieval_weights),
+            {item_id: (placement.position, placement.dimensions, placement.rotation)
+             for item_id, placement in container.items.items()})
+
+def test_snapshot_round_trip(tmp_path):
+    optimizer = SpaceOptimizer()
+    optimizer._load_rows(
+        [("large", 100.0, 100.0, 100.0, "A", "Large", 12.5),
+         ("empty", 50.0, 40.0, 30.0, None, None, 0.0)],
+        [("1", "Box", 20.0, 10.0, 30.0, 5.0, 1, "A", "placed", "large", 0.0, 0.0, 0.0, "2030-01-01", 3, 0, None),
+         ("2", "Kit", 10.0, 20.0, 5.0, 7.5, 4, None, "placed", "large", 20.0, 0.0, 0.0, None, None, 2, 0b101),
+         ("3", "Bag", 5.0, 5.0, 5.0, 1.0, 2, "B", "available", None, None, None, None, "2029-06-01", 0, None, None),
+         ("4", "Food", 5.0, 5.0, 5.0, 1.0, 9, None, "waste", None, None, None, None, "2020-01-01", None, None, None)],
+    )
+    path = str(tmp_path / "optimizer.snapshot")
+    assert optimizer.save_snapshot(path, 7, 12)
+
+    loaded = SpaceOptimizer()
+    # Another database state or schema leaves the model as it is
+    assert not loaded.load_snapshot(path, 8, 12)
+    assert not loaded.load_snapshot(path, 7, 11)
+    assert not loaded.items
+    assert loaded.load_snapshot(path, 7, 12)
+
+    assert loaded.items == optimizer.items
+    assert ([container_state(container) for container in loaded.containers.values()] ==
+            [container_state(container) for container in optimizer.containers.values()])
+    assert loaded.expiry.peek(10) == optimizer.expiry.peek(10)
+    dimensions = Dimensions(30.0, 30.0, 30.0)
+    assert (loaded.containers["large"].find_placement(dimensions, 1) ==
+            optimizer.containers["large"].find_placement(dimensions, 1))